@@ -0,0 +1,98 @@
+"""
+Compares the write throughput of the single and bulk movie endpoints.
+
+Usage:
+    python benchmarks/bench_bulk_writes.py [rows] [batch size]
+
+Adds and then deletes ``rows`` movies (5,000 by default) through the API,
+once with one request per movie and once in batches of ``batch size``
+(1,000 by default), and prints the rows written per second.
+
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+
+def timed(label, rows, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<14} {rows / elapsed:10.0f} rows/s")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "movies.sqlite3")
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ["MOVIE_BULK_LIMIT"] = str(batch_size)
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import select
+
+    from brite import create_app, db
+    from brite.models.movie import Movie
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        token = create_access_token(
+            identity="admin", additional_claims={"role": "admin"}
+        )
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def add_one_by_one():
+        for number in range(rows):
+            client.post("/api/v1/movies", json={"title": f"Single {number}"})
+
+    def add_in_batches():
+        for first in range(0, rows, batch_size):
+            titles = [f"Bulk {number}" for number in range(first, first + batch_size)]
+            client.post("/api/v1/movies/bulk", json={"titles": titles[: rows - first]})
+
+    def movie_ids(prefix):
+        with app.app_context():
+            query = select(Movie.id).where(Movie.title.startswith(prefix))
+            return db.session.scalars(query).all()
+
+    print(f"Writing {rows} movies to {path}")
+    print("Single requests")
+    timed("POST", rows, add_one_by_one)
+    ids = movie_ids("Single")
+    timed(
+        "DELETE",
+        rows,
+        lambda: [client.delete(f"/api/v1/movies/{i}", headers=headers) for i in ids],
+    )
+
+    print(f"Bulk requests of {batch_size}")
+    timed("POST", rows, add_in_batches)
+    ids = movie_ids("Bulk")
+    timed(
+        "DELETE",
+        rows,
+        lambda: [
+            client.delete(
+                "/api/v1/movies/bulk",
+                json={"ids": ids[first : first + batch_size]},
+                headers=headers,
+            )
+            for first in range(0, rows, batch_size)
+        ],
+    )
+
+    os.remove(path)
+    os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
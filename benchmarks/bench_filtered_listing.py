@@ -0,0 +1,123 @@
+"""
+Times the filtered movie listings with and without the composite indexes.
+
+Usage:
+    python benchmarks/bench_filtered_listing.py [rows]
+
+Fills a SQLite file with ``rows`` movies (1,000,000 by default), then runs
+each listing through `fetch_movies` and prints its query plan and timing,
+first with the indexes of the movie model and then with them dropped.
+
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+LISTINGS = {
+    "year range": {"year_from": 1990, "year_to": 1991},
+    "type": {"movie_type": "episode"},
+    "type and year": {"movie_type": "series", "year_from": 2001, "year_to": 2001},
+    "title prefix": {"prefix": "Movie 4242"},
+    "year sorted": {"sort": "-year", "movie_type": "game"},
+}
+
+INDEXES = ["ix_movie_year_title", "ix_movie_type_title", "ix_movie_type_year_title"]
+
+TYPES = ["movie", "series", "episode", "game"]
+
+
+def fill(path, rows):
+    """
+    Inserts ``rows`` random movies into the movie table of ``path``.
+
+    """
+    connection = sqlite3.connect(path)
+    connection.executemany(
+        "INSERT INTO movie (id, title, year, type) VALUES (?, ?, ?, ?)",
+        (
+            (
+                f"tt{number:08d}",
+                f"Movie {number}",
+                random.randint(1920, 2024),
+                random.choice(TYPES),
+            )
+            for number in range(rows)
+        ),
+    )
+    connection.commit()
+    connection.execute("ANALYZE")
+    connection.close()
+
+
+def run(label):
+    """
+    Prints the plan and average time of every listing.
+
+    """
+    from sqlalchemy import text
+
+    from brite import db
+    from brite.models.movie import Movie
+    from brite.services.movie_service import SORTS, fetch_movies, filter_movies
+
+    print(f"\n{label}")
+    for name, filters in LISTINGS.items():
+        sort = filters.get("sort", "title")
+        criteria = {key: value for key, value in filters.items() if key != "sort"}
+
+        query = filter_movies(Movie.query, **criteria).order_by(*SORTS[sort]).limit(20)
+        statement = query.statement.compile(
+            db.engine, compile_kwargs={"literal_binds": True}
+        )
+        plan = db.session.execute(text(f"EXPLAIN QUERY PLAN {statement}")).all()
+
+        start = time.perf_counter()
+        for page in range(1, 11):
+            fetch_movies(page, 20, **filters)
+        elapsed = (time.perf_counter() - start) / 10
+
+        print(f"  {name:<14} {elapsed * 1000:9.2f} ms/page")
+        for row in plan:
+            print(f"    {row[-1]}")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "movies.sqlite3")
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+    from brite import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+
+    print(f"Inserting {rows} movies into {path}")
+    fill(path, rows)
+
+    with app.app_context():
+        run("With indexes")
+
+        for name in INDEXES:
+            db.session.execute(db.text(f"DROP INDEX {name}"))
+        db.session.commit()
+        db.session.remove()
+        db.engine.dispose()
+
+        run("Without indexes")
+
+    os.remove(path)
+    os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
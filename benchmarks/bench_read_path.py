@@ -0,0 +1,88 @@
+"""
+Compares the per-row cost of reading movies as ORM instances and as rows.
+
+Usage:
+    python benchmarks/bench_read_path.py [rows]
+
+Reads ``rows`` movies (10,000 by default) from an in-memory SQLite database
+the way the listing did before, loading Movie instances, calling json() and
+encoding with the standard json module, and the way it does now, selecting
+the columns as rows and encoding with `dumps`. Prints the time and the peak
+memory allocated per row for each.
+
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROUNDS = 5
+
+
+def measure(label, rows, fn):
+    best = min(timed(fn) for _ in range(ROUNDS))
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<24} {best / rows * 1e6:8.2f} us/row {peak / rows:8.0f} B/row")
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+
+    os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+    from sqlalchemy import insert, select
+
+    from brite import create_app, db
+    from brite.models.movie import MOVIE_COLUMNS, Movie, movie_dict
+    from brite.utils import json_output
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.execute(
+            insert(Movie),
+            [
+                {
+                    "id": f"tt{number:08d}",
+                    "title": f"Movie {number}",
+                    "year": 1900 + number % 125,
+                    "type": "movie",
+                    "poster": f"https://img.example.com/{number}.jpg",
+                }
+                for number in range(rows)
+            ],
+        )
+        db.session.commit()
+
+        def orm_read():
+            movies = Movie.query.order_by(Movie.title).limit(rows).all()
+            json.dumps({"movies": [movie.json() for movie in movies]})
+            db.session.expunge_all()
+
+        def row_read():
+            query = select(*MOVIE_COLUMNS).order_by(Movie.title).limit(rows)
+            movies = [movie_dict(row) for row in db.session.execute(query)]
+            json_output.dumps({"movies": movies})
+
+        encoder = "orjson" if json_output.orjson is not None else "json"
+        print(f"Reading {rows} movies")
+        measure("ORM instances, json", rows, orm_read)
+        measure(f"column rows, {encoder}", rows, row_read)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,19 @@ from dotenv import load_dotenv
 from flask import Flask
 from flask_jwt_extended import JWTManager
 
+from .commands import import_command, seed_command
 from .resources.auth import auth_bp
+from .resources.health import health_bp
+from .resources.metrics import metrics_bp
 from .resources.movie import main_bp
-from .services.get_movies import get_movies
+from .services.movie_service import movie_cache
+from .services.search_service import reset_indexes
+from .services.seed_service import SeedJob
+from .utils.cache import create_cache
 from .utils.database_setup import db, migrate
-from .utils.set_users import set_users
+from .utils.passwords import password_hasher
+from .utils.pool import engine_options, track_engines
+from .utils.replicas import init_replicas
 
 load_dotenv()
 
@@ -16,6 +24,7 @@ load_dotenv()
 def create_app():
     app = Flask(__name__)
     app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL")
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(os.getenv("DATABASE_URL"))
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY")
 
@@ -23,6 +32,9 @@ def create_app():
 
     db.init_app(app)
     migrate.init_app(app, db)
+    with app.app_context():
+        track_engines(db.engines.values())
+    init_replicas(app, db)
 
     @jwt.invalid_token_loader
     def invalid_token_callback(invalid_token):
@@ -32,12 +44,31 @@ def create_app():
     def missing_token_callback(error):
         return {"message": "Missing token!"}, 401
 
-    with app.app_context():
-        db.create_all()
-        get_movies()
-        set_users()
+    movie_cache.configure(
+        create_cache(
+            os.getenv("MOVIE_CACHE_BACKEND", "memory"),
+            maxsize=int(os.getenv("MOVIE_CACHE_SIZE", 1024)),
+            ttl=float(os.getenv("MOVIE_CACHE_TTL", 300)),
+            path=os.getenv("MOVIE_CACHE_PATH"),
+        )
+    )
+
+    reset_indexes()
+
+    password_hasher.configure(
+        method=os.getenv("PASSWORD_HASH_METHOD", "scrypt"),
+        workers=int(os.getenv("PASSWORD_HASH_WORKERS", 2)),
+    )
+
+    app.cli.add_command(seed_command)
+    app.cli.add_command(import_command)
+
+    if os.getenv("SEED_ON_STARTUP", "").lower() in ("1", "true", "yes"):
+        app.extensions["brite_seed"] = SeedJob(app).start()
 
     app.register_blueprint(auth_bp, url_prefix="/api/v1")
+    app.register_blueprint(health_bp, url_prefix="/api/v1")
     app.register_blueprint(main_bp, url_prefix="/api/v1")
+    app.register_blueprint(metrics_bp, url_prefix="/api/v1")
 
     return app
@@ -0,0 +1,156 @@
+"""
+
+ASGI deployment mode.
+
+The hot read endpoints are served by async handlers on an async SQLAlchemy
+engine, so one worker can keep many slow queries in flight without a
+thread per request. Every other route is passed to the Flask app, which
+keeps running on its thread pool. Run it with:
+
+    uvicorn --factory brite.asgi:create_asgi_app
+
+The dependencies are listed in async-requirements.txt.
+
+"""
+
+from contextlib import asynccontextmanager
+
+try:
+    from a2wsgi import WSGIMiddleware
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from starlette.applications import Starlette
+    from starlette.responses import Response
+    from starlette.routing import Mount, Route
+except ImportError as error:
+    raise ImportError(
+        "The ASGI mode needs the packages of async-requirements.txt"
+    ) from error
+
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_date, parse_etags
+
+from brite import create_app
+from brite.resources.movie import LIST_MOVIES
+from brite.services import async_movie_service
+from brite.utils.conditional import not_modified, version_headers
+from brite.utils.database_setup import db
+from brite.utils.json_output import dumps
+from brite.utils.pool import engine_options, track_engines
+from brite.utils.replicas import STICKY_COOKIE
+
+
+def json_response(data, status=200, headers=None):
+    return Response(dumps(data), status, headers, media_type="application/json")
+
+
+def is_current(request, seq, changed_at):
+    """
+    Returns whether the client's copy of the (seq, changed_at) version is
+    current, from the conditional headers of ``request``.
+
+    """
+    return not_modified(
+        parse_etags(request.headers.get("if-none-match")),
+        parse_date(request.headers.get("if-modified-since")),
+        seq,
+        changed_at,
+    )
+
+
+def create_asgi_app(flask_app=None, **options):
+    """
+    Returns the ASGI app serving ``flask_app``, created with `create_app`
+    by default.
+
+    The async engine opens the database of the Flask app's engine, after
+    Flask-SQLAlchemy resolved relative SQLite paths, with the pool options
+    of `engine_options`. Its pool is reported by /metrics.
+
+    Parameters:
+        flask_app: the Flask app serving the routes without async handlers
+        options: passed to the async engine, over the `engine_options`
+
+    """
+    flask_app = flask_app or create_app()
+    with flask_app.app_context():
+        url = db.engine.url
+    engine = async_movie_service.create_engine(
+        url, **{**engine_options(url, use_async=True), **options}
+    )
+    track_engines([engine.sync_engine])
+    flask_app.extensions["brite_async_engine"] = engine
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def respond(request, version, fetch):
+        async with sessions() as session:
+            seq, changed_at = await version(session)
+            headers = version_headers(seq, changed_at)
+            if is_current(request, seq, changed_at):
+                return Response(status_code=304, headers=headers)
+            try:
+                result = await fetch(session)
+            except HTTPException as error:
+                return json_response(error.data, error.code)
+
+        data, status = result if isinstance(result, tuple) else (result, 200)
+        return json_response(data, status, headers if status == 200 else None)
+
+    async def list_movies(request):
+        async def fetch(session):
+            args = LIST_MOVIES.parse(request.query_params)
+            return await async_movie_service.fetch_movies(
+                session,
+                args["page"],
+                args["limit"],
+                args["cursor"],
+                sort=args["sort"],
+                year_from=args["year_from"],
+                year_to=args["year_to"],
+                movie_type=args["type"],
+                prefix=args["prefix"],
+            )
+
+        return await respond(request, async_movie_service.catalog_version, fetch)
+
+    async def movie_by_id(request):
+        movie_id = request.path_params["movie_id"]
+
+        async def version(session):
+            return await async_movie_service.movie_version(session, movie_id=movie_id)
+
+        async def fetch(session):
+            return await async_movie_service.fetch_movie_by_id(
+                session, movie_id, pinned=STICKY_COOKIE in request.cookies
+            )
+
+        return await respond(request, version, fetch)
+
+    async def movie_by_title(request):
+        movie_title = request.path_params["movie_title"]
+
+        async def version(session):
+            return await async_movie_service.movie_version(
+                session, movie_title=movie_title
+            )
+
+        async def fetch(session):
+            return await async_movie_service.fetch_movie_by_title(
+                session, movie_title, pinned=STICKY_COOKIE in request.cookies
+            )
+
+        return await respond(request, version, fetch)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await engine.dispose()
+
+    return Starlette(
+        routes=[
+            Route("/api/v1/movies", list_movies, methods=["GET"]),
+            Route("/api/v1/movies/id/{movie_id}", movie_by_id, methods=["GET"]),
+            Route("/api/v1/movies/title/{movie_title}", movie_by_title, methods=["GET"]),
+            Mount("/", WSGIMiddleware(flask_app)),
+        ],
+        lifespan=lifespan,
+    )
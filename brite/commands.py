@@ -0,0 +1,50 @@
+import click
+from flask.cli import with_appcontext
+
+from .services.import_service import FORMATS, import_movies
+from .services.seed_service import seed
+
+
+@click.command("seed")
+@click.option("--refresh", is_flag=True, help="Re-check synced OMDb pages.")
+@click.option("--skip-movies", is_flag=True, help="Only create tables and users.")
+@with_appcontext
+def seed_command(refresh, skip_movies):
+    """
+    Creates the tables, the default users and syncs movies from OMDb.
+
+    """
+    seed(refresh=refresh, movies=not skip_movies)
+    click.echo("Database seeded.")
+
+
+@click.command("import-movies")
+@click.argument("path", type=click.File("rb"))
+@click.option(
+    "--format",
+    "file_format",
+    type=click.Choice(FORMATS),
+    help="Format of the file, guessed from its extension by default.",
+)
+@click.option("--overwrite", is_flag=True, help="Update stored movies.")
+@click.option("--batch-size", type=int, help="Rows written per transaction.")
+@with_appcontext
+def import_command(path, file_format, overwrite, batch_size):
+    """
+    Imports the movies of a CSV or NDJSON file, or of standard input with -.
+
+    """
+    if file_format is None:
+        file_format = "csv" if path.name.endswith(".csv") else "ndjson"
+
+    progress = None
+    for progress in import_movies(path, file_format, overwrite, batch_size):
+        click.echo(
+            "{rows} rows: {inserted} inserted, {updated} updated, "
+            "{skipped} skipped, {invalid} invalid".format(**progress)
+        )
+        for number in progress["invalid_lines"]:
+            click.echo(f"Invalid row on line {number}", err=True)
+
+    if progress is None:
+        click.echo("Nothing to import.")
@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import JSON, DateTime, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..utils.database_setup import db
+
+
+class MovieChange(db.Model):
+    """
+
+    This is the model class for an entry of the movie change log
+
+    Parameters:
+        seq: the position of the change in the log, never reused
+        op: "upsert" when the movie was stored, "delete" when it was removed
+        movie_id: the id of the movie
+        data: the movie fields after an upsert, None for a delete
+        changed_at: when the change was committed
+
+    """
+
+    __table_args__ = (
+        Index("ix_movie_change_movie_id_seq", "movie_id", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    op: Mapped[str] = mapped_column(String(10), nullable=False)
+    movie_id: Mapped[str] = mapped_column(String(10), nullable=False)
+    data: Mapped[dict] = mapped_column(JSON, nullable=True)
+    changed_at: Mapped[datetime] = mapped_column(
+        DateTime, default=lambda: datetime.now(timezone.utc)
+    )
+
+    def __repr__(self):
+        """
+        Returns a string representation of the MovieChange object.
+
+        """
+        return "<MovieChange %r %r %r>" % (self.seq, self.op, self.movie_id)
+
+    def json(self):
+        """
+        Returns a dictionary representation of the object.
+
+        """
+        return {
+            "seq": self.seq,
+            "op": self.op,
+            "id": self.movie_id,
+            "movie": self.data,
+        }
@@ -0,0 +1,28 @@
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..utils.database_setup import db
+
+
+class MovieFacet(db.Model):
+    """
+
+    This is the model class for the number of movies in a facet bucket
+
+    Parameters:
+        facet: the movie field counted, "year" or "type"
+        bucket: the value of the field, empty when the movie has none
+        count: the number of movies with that value
+
+    """
+
+    facet: Mapped[str] = mapped_column(String(10), primary_key=True)
+    bucket: Mapped[str] = mapped_column(String(20), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        """
+        Returns a string representation of the MovieFacet object.
+
+        """
+        return "<MovieFacet %r=%r>" % (self.facet, self.bucket)
@@ -0,0 +1,34 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..utils.database_setup import db
+
+
+class SyncCheckpoint(db.Model):
+    """
+
+    This is the model class for an OMDb search page that has been synced
+
+    Parameters:
+        term: the OMDb search term
+        page: the page number of the search
+        digest: hash of the page content when it was last stored
+        synced_at: when the page was last stored
+
+    """
+
+    term: Mapped[str] = mapped_column(String(100), primary_key=True)
+    page: Mapped[int] = mapped_column(Integer, primary_key=True)
+    digest: Mapped[str] = mapped_column(String(64), nullable=False)
+    synced_at: Mapped[datetime] = mapped_column(
+        DateTime, default=lambda: datetime.now(timezone.utc)
+    )
+
+    def __repr__(self):
+        """
+        Returns a string representation of the SyncCheckpoint object.
+
+        """
+        return "<SyncCheckpoint %r page %r>" % (self.term, self.page)
@@ -1,18 +1,29 @@
-from flask import Blueprint, request
+from flask import Blueprint
 from flask_restful import Api, Resource
 
 from brite.services.auth_service import login_user
+from brite.utils.validation import Field, Schema
 
 auth_bp = Blueprint("auth", __name__)
 auth = Api(auth_bp)
 
+LOGIN = Schema(
+    "json",
+    Field("username", required=True, max_length=80, help="Username"),
+    Field(
+        "password",
+        required=True,
+        max_length=1024,
+        help="Password of at most 1024 characters",
+    ),
+)
+
 
 class Login(Resource):
     def post(self):
-        username = request.json.get("username", None)
-        password = request.json.get("password", None)
+        args = LOGIN.parse()
 
-        return login_user(username, password)
+        return login_user(args["username"], args["password"])
 
 
 auth.add_resource(Login, "/login")
@@ -0,0 +1,15 @@
+from flask import Blueprint, current_app
+from flask_restful import Api, Resource
+
+from brite.services.seed_service import readiness
+
+health_bp = Blueprint("health", __name__)
+health = Api(health_bp)
+
+
+class Ready(Resource):
+    def get(self):
+        return readiness(current_app.extensions.get("brite_seed"))
+
+
+health.add_resource(Ready, "/health/ready")
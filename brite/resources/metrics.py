@@ -0,0 +1,28 @@
+from flask import Blueprint, current_app
+from flask_restful import Api, Resource
+
+from brite.services.movie_service import movie_cache
+from brite.utils.database_setup import db
+from brite.utils.passwords import password_hasher
+from brite.utils.pool import pool_stats
+
+metrics_bp = Blueprint("metrics", __name__)
+metrics = Api(metrics_bp)
+
+
+class Metrics(Resource):
+    def get(self):
+        replicas = current_app.extensions.get("brite_replicas")
+        engines = dict(db.engines)
+        async_engine = current_app.extensions.get("brite_async_engine")
+        if async_engine is not None:
+            engines["async"] = async_engine.sync_engine
+        return {
+            "movie_cache": movie_cache.stats(),
+            "password_hashing": password_hasher.stats(),
+            "database_pools": pool_stats(engines),
+            "replicas": replicas.stats() if replicas is not None else [],
+        }
+
+
+metrics.add_resource(Metrics, "/metrics")
@@ -1,59 +1,207 @@
-from flask import Blueprint
+import json
+
+from flask import Blueprint, Response, request, stream_with_context
 from flask_jwt_extended import jwt_required
-from flask_restful import Api, Resource, reqparse
+from flask_restful import Api, Resource
 
+from brite.services.change_service import catalog_version, fetch_changes, movie_version
+from brite.services.export_service import export_movies
+from brite.services.facet_service import fetch_facets
+from brite.services.import_service import FORMATS, import_movies
 from brite.services.movie_service import (
+    SORTS,
     add_movie,
+    add_movies,
     delete_movie,
+    delete_movies,
     fetch_movie_by_id,
     fetch_movie_by_title,
     fetch_movies,
+    fetch_movies_by_ids,
 )
+from brite.services.search_service import autocomplete, search_movies
+from brite.utils.conditional import conditional
 from brite.utils.decorators import admin_required
+from brite.utils.json_output import output_json
+from brite.utils.validation import Field, Schema
 
 main_bp = Blueprint("main", __name__)
 main = Api(main_bp)
+main.representation("application/json")(output_json)
+
+# Largest page of movies a single request can ask for
+MAX_LIMIT = 100
+MAX_PAGE = 10000
+
+LIMIT = Field(
+    "limit",
+    type=int,
+    default=10,
+    minimum=1,
+    maximum=MAX_LIMIT,
+    help=f"Number of records to return, between 1 and {MAX_LIMIT}",
+)
+
+LIST_MOVIES = Schema(
+    "args",
+    LIMIT,
+    Field(
+        "page",
+        type=int,
+        default=1,
+        minimum=1,
+        maximum=MAX_PAGE,
+        help=f"Page number, between 1 and {MAX_PAGE}, use a cursor to go further",
+    ),
+    Field("cursor", help="Cursor returned by the previous page"),
+    Field(
+        "sort",
+        default="title",
+        choices=SORTS,
+        help="Sort key, one of title, -title, year and -year",
+    ),
+    Field("year_from", type=int, help="Earliest release year"),
+    Field("year_to", type=int, help="Latest release year"),
+    Field("type", help="Movie type"),
+    Field("prefix", help="Start of the movie title"),
+)
+
+SEARCH_MOVIES = Schema("args", Field("q", required=True, help="Search query"), LIMIT)
+
+AUTOCOMPLETE_MOVIES = Schema(
+    "args", Field("q", required=True, help="Title prefix"), LIMIT
+)
+
+BATCH_MOVIES = Schema(
+    "args", Field("ids", required=True, help="Comma separated movie ids")
+)
+
+LIST_CHANGES = Schema(
+    "args",
+    Field(
+        "since",
+        type=int,
+        default=0,
+        minimum=0,
+        help="Sequence number of the last change already seen",
+    ),
+    Field(
+        "limit",
+        type=int,
+        default=100,
+        minimum=1,
+        help="Number of changes to return",
+    ),
+)
+
+ADD_MOVIE = Schema(
+    "json",
+    Field(
+        "title",
+        required=True,
+        max_length=100,
+        help="Movie title of at most 100 characters",
+    ),
+)
+
+ADD_MOVIES = Schema(
+    "json", Field("titles", type=list, required=True, help="List of movie titles")
+)
+
+DELETE_MOVIES = Schema(
+    "json",
+    Field("ids", type=list, items=str, required=True, help="List of movie ids"),
+)
+
+IMPORT_MOVIES = Schema(
+    "args",
+    Field("format", choices=FORMATS, help="Format of the upload, csv or ndjson"),
+    Field(
+        "overwrite",
+        type=bool,
+        default=False,
+        help="Update the movies that are already stored",
+    ),
+)
+
+EXPORT_MOVIES = Schema(
+    "args",
+    Field(
+        "format",
+        default="ndjson",
+        choices=FORMATS,
+        help="Format of the export, csv or ndjson",
+    ),
+    Field("gzip", type=bool, default=False, help="Compress the export with gzip"),
+)
 
 
 class GetMovies(Resource):
+    @conditional(catalog_version)
     def get(self):
-        parser = reqparse.RequestParser()
-        parser.add_argument(
-            "limit",
-            type=int,
-            help="Number of records to return",
-            default=10,
-            location="args",
-        )
-        parser.add_argument(
-            "page", type=int, help="Page number", default=1, location="args"
+        args = LIST_MOVIES.parse()
+
+        return fetch_movies(
+            args["page"],
+            args["limit"],
+            args["cursor"],
+            sort=args["sort"],
+            year_from=args["year_from"],
+            year_to=args["year_to"],
+            movie_type=args["type"],
+            prefix=args["prefix"],
         )
-        args = parser.parse_args()
 
-        return fetch_movies(args["page"], args["limit"])
+
+class SearchMovies(Resource):
+    def get(self):
+        args = SEARCH_MOVIES.parse()
+
+        return search_movies(args["q"], args["limit"])
+
+
+class AutocompleteMovies(Resource):
+    def get(self):
+        args = AUTOCOMPLETE_MOVIES.parse()
+
+        return autocomplete(args["q"], args["limit"])
+
+
+class MovieFacets(Resource):
+    def get(self):
+        return fetch_facets()
+
+
+class GetMoviesByIds(Resource):
+    def get(self):
+        args = BATCH_MOVIES.parse()
+
+        movie_ids = [movie_id.strip() for movie_id in args["ids"].split(",")]
+        return fetch_movies_by_ids([movie_id for movie_id in movie_ids if movie_id])
+
+
+class MovieChanges(Resource):
+    def get(self):
+        args = LIST_CHANGES.parse()
+
+        return fetch_changes(args["since"], args["limit"])
 
 
 class GetMovieByTitle(Resource):
+    @conditional(movie_version)
     def get(self, movie_title):
         return fetch_movie_by_title(movie_title)
 
 
 class GetMovieById(Resource):
+    @conditional(movie_version)
     def get(self, movie_id):
         return fetch_movie_by_id(movie_id)
 
 
 class AddMovie(Resource):
     def post(self):
-        parser = reqparse.RequestParser()
-        parser.add_argument(
-            "title",
-            type=str,
-            required=True,
-            help="Movie title provided",
-            location="json",
-        )
-        args = parser.parse_args()
+        args = ADD_MOVIE.parse()
 
         return add_movie(args["title"])
 
@@ -65,8 +213,67 @@ class DeleteMovie(Resource):
         return delete_movie(movie_id)
 
 
+class BulkMovies(Resource):
+    def post(self):
+        args = ADD_MOVIES.parse()
+
+        return add_movies(args["titles"])
+
+    @jwt_required()
+    @admin_required
+    def delete(self):
+        args = DELETE_MOVIES.parse()
+
+        return delete_movies(args["ids"])
+
+
+class ImportMovies(Resource):
+    @jwt_required()
+    @admin_required
+    def post(self):
+        args = IMPORT_MOVIES.parse()
+
+        upload = request.files.get("file")
+        stream = upload.stream if upload is not None else request.stream
+        file_format = args["format"]
+        if file_format is None:
+            name = upload.filename if upload is not None else ""
+            is_csv = name.endswith(".csv") or request.mimetype == "text/csv"
+            file_format = "csv" if is_csv else "ndjson"
+
+        progress = import_movies(stream, file_format, overwrite=args["overwrite"])
+        lines = (json.dumps(batch) + "\n" for batch in progress)
+        return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+
+
+class ExportMovies(Resource):
+    def get(self):
+        args = EXPORT_MOVIES.parse()
+
+        file_format = args["format"]
+        mimetype = "text/csv" if file_format == "csv" else "application/x-ndjson"
+        response = Response(
+            stream_with_context(export_movies(file_format, compress=args["gzip"])),
+            mimetype=mimetype,
+        )
+        response.headers[
+            "Content-Disposition"
+        ] = f"attachment; filename=movies.{file_format}"
+        if args["gzip"]:
+            response.headers["Content-Encoding"] = "gzip"
+        return response
+
+
 main.add_resource(GetMovies, "/movies")
+main.add_resource(SearchMovies, "/movies/search")
+main.add_resource(AutocompleteMovies, "/movies/autocomplete")
+main.add_resource(MovieFacets, "/movies/facets")
+main.add_resource(GetMoviesByIds, "/movies/batch")
+main.add_resource(MovieChanges, "/movies/changes")
 main.add_resource(GetMovieByTitle, "/movies/title/<string:movie_title>")
 main.add_resource(GetMovieById, "/movies/id/<string:movie_id>")
 main.add_resource(AddMovie, "/movies")
+main.add_resource(BulkMovies, "/movies/bulk")
+main.add_resource(ImportMovies, "/movies/import")
+main.add_resource(ExportMovies, "/movies/export")
 main.add_resource(DeleteMovie, "/movies/<string:movie_id>")
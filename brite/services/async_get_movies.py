@@ -0,0 +1,141 @@
+import asyncio
+import os
+import threading
+from collections import deque
+from contextlib import aclosing
+from itertools import islice
+
+import httpx
+
+from brite.services.get_movies import OMDB_URL, check_page
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def create_client(max_workers):
+    """
+    Returns an OMDb HTTP client keeping up to ``max_workers`` connections
+    open and retrying failed connections OMDB_RETRIES times.
+
+    """
+    transport = httpx.AsyncHTTPTransport(
+        retries=int(os.getenv("OMDB_RETRIES", 3)),
+        limits=httpx.Limits(
+            max_connections=max_workers, max_keepalive_connections=max_workers
+        ),
+    )
+    timeout = float(os.getenv("OMDB_TIMEOUT", 10))
+    return httpx.AsyncClient(transport=transport, timeout=timeout)
+
+
+async def fetch_movies(client, page, api_key, term="movie"):
+    """
+    Fetches one OMDb search page, retrying the responses in
+    `RETRY_STATUSES` with exponential backoff like the sync session does,
+    and raising on errors like the sync `fetch_movies`.
+
+    """
+    params = {"s": term, "page": page, "apikey": api_key}
+    retries = int(os.getenv("OMDB_RETRIES", 3))
+    backoff = float(os.getenv("OMDB_BACKOFF", 0.5))
+
+    for attempt in range(retries + 1):
+        response = await client.get(OMDB_URL, params=params)
+        if response.status_code not in RETRY_STATUSES or attempt == retries:
+            break
+        await asyncio.sleep(backoff * 2**attempt)
+    response.raise_for_status()
+    return check_page(response.json())
+
+
+async def fetch_pages(jobs, api_key, max_workers=None):
+    """
+    Fetches OMDb search pages concurrently on one event loop and yields
+    them in order.
+
+    At most ``max_workers`` requests are in flight at any time, without a
+    thread per request, like the thread pool of `get_movies.fetch_pages`.
+
+    Parameters:
+        jobs: iterable of (term, page) pairs to fetch
+        api_key: OMDb API key
+        max_workers: number of pages in flight, defaults to OMDB_MAX_WORKERS
+
+    Returns:
+        An async iterator of ((term, page), payload) pairs, in the order of
+        ``jobs``.
+
+    """
+    max_workers = max_workers or int(os.getenv("OMDB_MAX_WORKERS", 10))
+    jobs = iter(jobs)
+
+    async with create_client(max_workers) as client:
+
+        def start(job):
+            term, page = job
+            return job, asyncio.ensure_future(fetch_movies(client, page, api_key, term))
+
+        in_flight = deque(start(job) for job in islice(jobs, max_workers))
+        try:
+            while in_flight:
+                job, task = in_flight[0]
+                data = await task
+                in_flight.popleft()
+                for next_job in islice(jobs, 1):
+                    in_flight.append(start(next_job))
+                yield job, data
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+            await asyncio.gather(
+                *(task for _, task in in_flight), return_exceptions=True
+            )
+
+
+def iter_pages(jobs, api_key, max_workers=None):
+    """
+    Iterates over `fetch_pages` from synchronous code.
+
+    The event loop runs in a producer thread and hands the pages over
+    through a queue of ``max_workers`` pages, so the fetches go on while
+    the caller stores a page, and no more than ``max_workers`` pages wait
+    in the queue. Closing the iterator stops the producer.
+
+    """
+    max_workers = max_workers or int(os.getenv("OMDB_MAX_WORKERS", 10))
+    loop = asyncio.new_event_loop()
+    pages = asyncio.Queue(maxsize=max_workers)
+
+    async def produce():
+        try:
+            async with aclosing(fetch_pages(jobs, api_key, max_workers)) as stream:
+                async for item in stream:
+                    await pages.put((item, None))
+        except Exception as error:
+            await pages.put((None, error))
+        else:
+            await pages.put((None, None))
+
+    async def start():
+        return asyncio.create_task(produce())
+
+    async def stop(producer):
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+    thread = threading.Thread(target=loop.run_forever, name="omdb-fetch", daemon=True)
+    thread.start()
+    producer = asyncio.run_coroutine_threadsafe(start(), loop).result()
+    try:
+        while True:
+            item, error = asyncio.run_coroutine_threadsafe(pages.get(), loop).result()
+            if error is not None:
+                raise error
+            if item is None:
+                return
+            yield item
+    finally:
+        asyncio.run_coroutine_threadsafe(stop(producer), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
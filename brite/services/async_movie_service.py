@@ -0,0 +1,96 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from brite.models.movie import Movie, movie_dict
+from brite.services.change_service import (
+    catalog_version_query,
+    movie_version_query,
+    version,
+)
+from brite.services.movie_service import (
+    cache_movie,
+    movie_cache,
+    movie_query,
+    movies_page,
+    movies_query,
+)
+from brite.utils.singleflight import AsyncSingleFlight
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+lookups = AsyncSingleFlight()
+
+
+def async_database_url(url):
+    """
+    Returns ``url`` with the async driver of its database, aiosqlite for
+    SQLite and asyncpg for Postgres.
+
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for {backend} databases")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def create_engine(url, **options):
+    """
+    Returns an async engine for ``url``, with the async driver of its
+    database.
+
+    """
+    return create_async_engine(async_database_url(url), **options)
+
+
+async def fetch_movies(session, page, limit, cursor=None, sort="title", **filters):
+    query = movies_query(page, limit, cursor, sort, **filters)
+    if isinstance(query, tuple):
+        return query
+    rows = (await session.execute(query)).all()
+    return movies_page(rows, limit, cursor)
+
+
+async def load_movie(session, key, criterion):
+    guard = (key, movie_cache.generation(key))
+    row = (await session.execute(movie_query(criterion))).first()
+    if row is None:
+        return None
+    movie = movie_dict(row)
+    cache_movie(movie, guard)
+    return movie
+
+
+async def lookup_movie(session, key, criterion, pinned=False):
+    # Like movie_service.lookup_movie, pinned requests skip the cache
+    if pinned:
+        return await load_movie(session, key, criterion)
+    movie = movie_cache.get(key)
+    if movie is None:
+        movie = await lookups.do(key, load_movie, session, key, criterion)
+    return movie
+
+
+async def fetch_movie_by_title(session, movie_title, pinned=False):
+    key = ("title", movie_title)
+    movie = await lookup_movie(session, key, Movie.title == movie_title, pinned)
+    if movie is None:
+        return {"message": "Movie with this title does not exist"}, 404
+    return {"movie": movie}
+
+
+async def fetch_movie_by_id(session, movie_id, pinned=False):
+    key = ("id", movie_id)
+    movie = await lookup_movie(session, key, Movie.id == movie_id, pinned)
+    if movie is None:
+        return {"message": "Movie with this id does not exist"}, 404
+    return {"movie": movie}
+
+
+async def catalog_version(session):
+    return version((await session.execute(catalog_version_query())).first())
+
+
+async def movie_version(session, movie_id=None, movie_title=None):
+    query = movie_version_query(movie_id, movie_title)
+    return version((await session.execute(query)).first())
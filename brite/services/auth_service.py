@@ -1,14 +1,22 @@
 from flask_jwt_extended import create_access_token
-from werkzeug.security import check_password_hash
 
 from brite.models.user import User
+from brite.utils.database_setup import db
+from brite.utils.passwords import password_hasher
 
 
 def login_user(username, password):
     user = User.query.filter_by(username=username).first()
 
-    if not user or not check_password_hash(user.password_hash, password):
+    if not user or not password_hasher.verify(user.password_hash, password):
         return {"msg": "Bad username or password"}, 401
 
-    access_token = create_access_token(identity=username)
+    if password_hasher.needs_rehash(user.password_hash):
+        user.password_hash = password_hasher.hash(password)
+        db.session.commit()
+
+    # The role travels in the token so authorization needs no user query
+    access_token = create_access_token(
+        identity=username, additional_claims={"role": user.role}
+    )
     return {"access_token": access_token}, 200
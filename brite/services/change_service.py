@@ -0,0 +1,123 @@
+import os
+from datetime import datetime, timezone
+
+from sqlalchemy import insert, select, text
+
+from brite.models.movie import Movie
+from brite.models.movie_change import MovieChange
+from brite.utils.database_setup import db
+
+# Postgres writers hold this lock while logging changes, so sequence numbers
+# become visible in order and a reader never skips a change
+CHANGE_LOCK = text("SELECT pg_advisory_xact_lock(727118)")
+
+
+def record_changes(upserted=(), deleted=()):
+    """
+    Appends changes to the movie change log in the current transaction, so
+    they are committed together with the movies.
+
+    Parameters:
+        upserted: the fields of the movies stored
+        deleted: the ids of the movies removed
+
+    """
+    now = datetime.now(timezone.utc)
+    rows = [
+        {"op": "upsert", "movie_id": values["id"], "data": values, "changed_at": now}
+        for values in upserted
+    ]
+    rows += [
+        {"op": "delete", "movie_id": movie_id, "data": None, "changed_at": now}
+        for movie_id in deleted
+    ]
+    if not rows:
+        return
+
+    if db.session.get_bind().dialect.name == "postgresql":
+        db.session.execute(CHANGE_LOCK)
+    db.session.execute(insert(MovieChange), rows)
+
+
+def fetch_changes(since, limit):
+    """
+    Returns the changes logged after sequence number ``since``, oldest first.
+
+    Clients keep the returned ``next_since`` and pass it on their next call,
+    until ``has_more`` is False. A delete is logged as a tombstone without
+    movie fields. At most CHANGES_LIMIT (1000) changes are returned per call.
+
+    """
+    if since < 0 or limit < 1:
+        return {"message": "since cannot be negative and limit must be at least 1"}, 400
+    limit = min(limit, int(os.getenv("CHANGES_LIMIT", 1000)))
+
+    changes = db.session.scalars(
+        select(MovieChange)
+        .where(MovieChange.seq > since)
+        .order_by(MovieChange.seq)
+        .limit(limit + 1)
+    ).all()
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    return {
+        "changes": [change.json() for change in changes],
+        "next_since": changes[-1].seq if changes else since,
+        "has_more": has_more,
+    }
+
+
+def changes_after(seq):
+    """
+    Returns the query of the (seq, op, movie_id, data) of the changes logged
+    after ``seq``, oldest first.
+
+    """
+    return (
+        select(MovieChange.seq, MovieChange.op, MovieChange.movie_id, MovieChange.data)
+        .where(MovieChange.seq > seq)
+        .order_by(MovieChange.seq)
+    )
+
+
+def version(row):
+    """
+    Returns the (seq, changed_at) of a row fetched by a version query, or
+    (0, None) when there is no change yet.
+
+    """
+    return tuple(row) if row is not None else (0, None)
+
+
+def latest_change(query):
+    return query.order_by(MovieChange.seq.desc()).limit(1)
+
+
+def catalog_version_query():
+    return latest_change(select(MovieChange.seq, MovieChange.changed_at))
+
+
+def movie_version_query(movie_id=None, movie_title=None):
+    query = select(MovieChange.seq, MovieChange.changed_at)
+    if movie_title is not None:
+        ids = select(Movie.id).where(Movie.title == movie_title)
+        return latest_change(query.where(MovieChange.movie_id.in_(ids)))
+    return latest_change(query.where(MovieChange.movie_id == movie_id))
+
+
+def catalog_version():
+    """
+    Returns the version of the whole catalog, bumped by every write.
+
+    """
+    return version(db.session.execute(catalog_version_query()).first())
+
+
+def movie_version(movie_id=None, movie_title=None):
+    """
+    Returns the version of one movie, bumped by the writes to that movie.
+
+    """
+    query = movie_version_query(movie_id, movie_title)
+    return version(db.session.execute(query).first())
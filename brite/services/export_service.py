@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+import os
+import zlib
+
+from sqlalchemy import select
+
+from brite.models.movie import MOVIE_COLUMNS, MOVIE_FIELDS, Movie, movie_dict
+from brite.utils.database_setup import db
+
+CHUNK_SIZE = 64 * 1024
+
+
+def export_rows(batch_size=None):
+    """
+    Yields every movie as a row of `MOVIE_FIELDS`, in id order.
+
+    The rows are fetched from a server-side cursor ``batch_size`` at a time
+    (EXPORT_BATCH_SIZE, 1000 by default), so the catalog is never loaded
+    at once.
+
+    """
+    batch_size = batch_size or int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+    query = (
+        select(*MOVIE_COLUMNS).order_by(Movie.id).execution_options(yield_per=batch_size)
+    )
+    yield from db.session.execute(query)
+
+
+def encode_ndjson(rows):
+    for row in rows:
+        yield json.dumps(movie_dict(row)) + "\n"
+
+
+def encode_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(MOVIE_FIELDS)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def chunked(lines, size=None):
+    """
+    Joins ``lines`` into chunks of about ``size`` bytes, `CHUNK_SIZE` by
+    default, encoded as UTF-8.
+
+    """
+    size = size or CHUNK_SIZE
+    chunk, length = [], 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(chunk).encode()
+            chunk, length = [], 0
+    if chunk:
+        yield "".join(chunk).encode()
+
+
+def gzipped(chunks):
+    """
+    Compresses ``chunks`` into a gzip stream, flushing after every chunk so
+    the client can decompress the data as it arrives.
+
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def export_movies(file_format, compress=False, batch_size=None):
+    """
+    Yields the whole catalog as an NDJSON or CSV byte stream.
+
+    Parameters:
+        file_format: "csv" or "ndjson"
+        compress: gzip the stream
+        batch_size: the number of rows fetched at a time
+
+    """
+    rows = export_rows(batch_size)
+    lines = encode_csv(rows) if file_format == "csv" else encode_ndjson(rows)
+    chunks = chunked(lines)
+    return gzipped(chunks) if compress else chunks
@@ -0,0 +1,118 @@
+from collections import Counter
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from brite.models.movie import Movie
+from brite.models.movie_facet import MovieFacet
+from brite.utils.database_setup import db
+
+FACETS = ("year", "type")
+
+UPSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def facet_buckets(values):
+    """
+    Returns the (facet, bucket) pairs a movie is counted in.
+
+    Parameters:
+        values: the movie fields, as a dict
+
+    """
+    buckets = []
+    for facet in FACETS:
+        value = values.get(facet)
+        buckets.append((facet, "" if value is None else str(value)))
+    return buckets
+
+
+def count_movies(added=(), removed=()):
+    """
+    Updates the facet counts in the current transaction, so they are
+    committed together with the movies they count.
+
+    Parameters:
+        added: the fields of the movies stored
+        removed: the fields the movies had before they were deleted or
+            updated
+
+    """
+    deltas = Counter()
+    for values in added:
+        deltas.update(facet_buckets(values))
+    for values in removed:
+        deltas.subtract(facet_buckets(values))
+
+    rows = [
+        {"facet": facet, "bucket": bucket, "count": count}
+        for (facet, bucket), count in deltas.items()
+        if count
+    ]
+    if not rows:
+        return
+
+    upsert = UPSERTS.get(db.session.get_bind().dialect.name)
+    if upsert is not None:
+        statement = upsert(MovieFacet).values(rows)
+        db.session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[MovieFacet.facet, MovieFacet.bucket],
+                set_={"count": MovieFacet.count + statement.excluded["count"]},
+            )
+        )
+        return
+
+    for row in rows:
+        result = db.session.execute(
+            update(MovieFacet)
+            .where(MovieFacet.facet == row["facet"], MovieFacet.bucket == row["bucket"])
+            .values(count=MovieFacet.count + row["count"])
+        )
+        if result.rowcount == 0:
+            db.session.execute(insert(MovieFacet).values(row))
+
+
+def rebuild_facets():
+    """
+    Recounts every facet from the movie table and commits.
+
+    The counts are kept up to date by the writes, this is only needed for a
+    catalog stored before the facets existed or changed behind the app.
+
+    """
+    db.session.execute(delete(MovieFacet))
+    for facet in FACETS:
+        column = getattr(Movie, facet)
+        counts = db.session.execute(select(column, func.count()).group_by(column))
+        rows = [
+            {
+                "facet": facet,
+                "bucket": "" if value is None else str(value),
+                "count": count,
+            }
+            for value, count in counts
+        ]
+        if rows:
+            db.session.execute(insert(MovieFacet), rows)
+    db.session.commit()
+
+
+def fetch_facets():
+    """
+    Returns the number of movies per year and per type.
+
+    Reads the summary table only, so the cost grows with the number of
+    buckets and not with the catalog. Movies without a value are counted
+    under null.
+
+    """
+    facets = {facet: [] for facet in FACETS}
+    rows = db.session.execute(
+        select(MovieFacet.facet, MovieFacet.bucket, MovieFacet.count)
+        .where(MovieFacet.count > 0)
+        .order_by(MovieFacet.facet, MovieFacet.bucket)
+    )
+    for facet, bucket, count in rows:
+        facets.setdefault(facet, []).append({"value": bucket or None, "count": count})
+    return {"facets": facets}
@@ -1,45 +1,332 @@
+import hashlib
+import json
 import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
 
 import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy import insert, select, update
 from sqlalchemy.exc import OperationalError
+from urllib3.util.retry import Retry
 
-from brite.models.movie import Movie
+from brite.models.movie import Movie, movie_year
+from brite.models.sync_checkpoint import SyncCheckpoint
+from brite.services.movie_service import publish_movies, upsert_movies
 from brite.utils.database_setup import db
 
+OMDB_URL = "http://www.omdbapi.com/"
+NOT_FOUND = "Movie not found!"
+YEAR = re.compile(r"\d{4}")
 
-def fetch_movies(page, api_key):
-    url = f"http://www.omdbapi.com/?s=movie&page={page}&apikey={api_key}"
-    response = requests.get(url)
-    return response.json()
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the shared OMDb HTTP session, creating it on first use.
+
+    The session keeps a connection pool sized to the number of in-flight
+    pages and retries failed GETs with exponential backoff.
+    """
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=int(os.getenv("OMDB_RETRIES", 3)),
+                backoff_factor=float(os.getenv("OMDB_BACKOFF", 0.5)),
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET",),
+            )
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=int(os.getenv("OMDB_MAX_WORKERS", 10)),
+                max_retries=retry,
+            )
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+
+    return _session
+
+
+class OMDbError(Exception):
+    """
+
+    Raised when OMDb answers a search with an error, such as an invalid API
+    key or an exhausted quota, so the page is not checkpointed as empty.
+
+    """
+
+
+def check_page(data):
+    """
+    Returns the payload of a search page, raising `OMDbError` when OMDb
+    answered with an error. "Movie not found!" is what OMDb answers for
+    the pages past the last one, it is returned as an empty page.
+
+    """
+    if data.get("Response") == "False":
+        if data.get("Error") == NOT_FOUND:
+            return {"Search": []}
+        raise OMDbError(data.get("Error", "Unknown OMDb error"))
+    return data
+
+
+def fetch_movies(page, api_key, term="movie"):
+    params = {"s": term, "page": page, "apikey": api_key}
+    timeout = float(os.getenv("OMDB_TIMEOUT", 10))
+    response = get_session().get(OMDB_URL, params=params, timeout=timeout)
+    response.raise_for_status()
+    return check_page(response.json())
+
+
+def fetch_pages(jobs, api_key, max_workers=None):
+    """
+    Fetches OMDb search pages concurrently and yields them in order.
+
+    At most ``max_workers`` pages are in flight at any time, so the total time
+    is close to the slowest page rather than the sum of all of them.
+
+    Parameters:
+        jobs: iterable of (term, page) pairs to fetch
+        api_key: OMDb API key
+        max_workers: number of pages in flight, defaults to OMDB_MAX_WORKERS
+
+    With OMDB_CLIENT=async the pages are fetched by the httpx client of
+    `async_get_movies` on an event loop instead of a thread pool, with the
+    same bound and order.
+
+    Returns:
+        An iterator of ((term, page), payload) pairs.
+
+    """
+    max_workers = max_workers or int(os.getenv("OMDB_MAX_WORKERS", 10))
+    if os.getenv("OMDB_CLIENT", "threads") == "async":
+        from brite.services import async_get_movies
+
+        yield from async_get_movies.iter_pages(jobs, api_key, max_workers)
+        return
+
+    jobs = iter(jobs)
+
+    def submit(executor, job):
+        term, page = job
+        return job, executor.submit(fetch_movies, page, api_key, term)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque(submit(executor, job) for job in islice(jobs, max_workers))
+        while in_flight:
+            job, future = in_flight.popleft()
+            data = future.result()
+            for next_job in islice(jobs, 1):
+                in_flight.append(submit(executor, next_job))
+            yield job, data
+
+
+def batched(items, size):
+    """
+    Groups ``items`` into lists of at most ``size`` elements.
+
+    """
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+def omdb_year(value):
+    """
+    Returns the year of an OMDb item as it is stored, with the rule of
+    `movie_year`. Series have a range such as "2005–2010" and are stored
+    with their first year, other values that are not a year as None.
+
+    """
+    try:
+        return movie_year(value)
+    except ValueError:
+        match = YEAR.match(value) if isinstance(value, str) else None
+        return int(match.group()) if match else None
+
+
+def movie_values(item):
+    """
+    Returns the movie fields of an OMDb search item, with the values that
+    are stored, so the change log records what the API serves.
+
+    """
+    return {
+        "id": item["imdbID"],
+        "title": item["Title"],
+        "year": omdb_year(item["Year"]),
+        "type": item["Type"],
+        "poster": item["Poster"],
+    }
 
 
 def create_movie(item):
-    return Movie(
-        title=item["Title"],
-        year=item["Year"],
-        id=item["imdbID"],
-        type=item["Type"],
-        poster=item["Poster"],
+    return Movie(**movie_values(item))
+
+
+def page_digest(items):
+    """
+    Returns a stable hash of the items on a search page.
+
+    """
+    payload = json.dumps(items, sort_keys=True).encode()
+    return hashlib.sha256(payload).hexdigest()
+
+
+def load_checkpoints(term):
+    """
+    Returns the stored page digests for ``term`` as a {page: digest} dict.
+
+    """
+    rows = db.session.execute(
+        select(SyncCheckpoint.page, SyncCheckpoint.digest).where(
+            SyncCheckpoint.term == term
+        )
     )
+    return dict(rows.all())
 
 
-def get_movies():
-    try:
-        if Movie.query.first() is not None:
-            print("Movies already exist in the table.")
-            return
+def save_batch(items, checkpoints=()):
+    """
+    Upserts a batch of OMDb items and marks their pages as synced.
 
-        api_key = os.getenv("API_KEY")
-        assert api_key is not None, "Set the API_KEY environment variable"
+    Movies are matched on imdbID by `upsert_movies`. Duplicates are resolved
+    per batch, so no state is kept between batches. The checkpoints are
+    written in the same transaction, so a page is never marked done before
+    its movies are stored.
+
+    Parameters:
+        items: OMDb search items
+        checkpoints: (term, page, digest, exists) tuples for the pages of
+            the batch, ``exists`` telling if the page was synced before
+
+    Returns:
+        The number of movies inserted or updated.
+
+    """
+    written = upsert_movies([movie_values(item) for item in items])
+
+    now = datetime.now(timezone.utc)
+    new_pages, synced_pages = [], []
+    for term, page, digest, exists in checkpoints:
+        values = {"term": term, "page": page, "digest": digest, "synced_at": now}
+        (synced_pages if exists else new_pages).append(values)
+
+    if new_pages:
+        db.session.execute(insert(SyncCheckpoint), new_pages)
+    if synced_pages:
+        db.session.execute(update(SyncCheckpoint), synced_pages)
+
+    db.session.commit()
+    publish_movies(written)
+    return len(written["inserted"]) + len(written["updated"])
+
+
+def sync_term(api_key, term, pages, batch_size, refresh=False):
+    """
+    Syncs the search results of one term into the database.
+
+    Pages that already have a checkpoint are skipped without being fetched,
+    so an interrupted run resumes where it stopped. With ``refresh`` they are
+    fetched again, and only written when their content changed.
+
+    Returns:
+        The number of movies inserted or updated.
+
+    """
+    synced = load_checkpoints(term)
+    jobs = ((term, page) for page in pages if refresh or page not in synced)
+
+    written = 0
+    items, checkpoints = [], []
+    for (_, page), data in fetch_pages(jobs, api_key):
+        page_items = data.get("Search", [])
+        digest = page_digest(page_items)
+        if synced.get(page) == digest:
+            continue
+
+        items += page_items
+        checkpoints.append((term, page, digest, page in synced))
+        if len(items) >= batch_size:
+            written += save_batch(items, checkpoints)
+            items, checkpoints = [], []
+
+    if checkpoints:
+        written += save_batch(items, checkpoints)
+    return written
 
-        movies = []
-        for page in range(1, 11):
-            data = fetch_movies(page, api_key)
 
-            movies += [create_movie(item) for item in data.get("Search", [])]
+def ingest_movies(api_key, terms=None, pages=None, batch_size=None, refresh=False):
+    """
+    Streams OMDb search results into the database in fixed-size batches.
+
+    Only one batch is held in memory at a time, so the footprint stays the
+    same whatever the number of terms and pages. Progress is checkpointed
+    per page, so re-running only does the missing work.
+
+    Parameters:
+        api_key: OMDb API key
+        terms: search terms, defaults to OMDB_SEARCH_TERMS
+        pages: page numbers per term, defaults to OMDB_PAGES
+        batch_size: movies per commit, defaults to INGEST_BATCH_SIZE
+        refresh: re-fetch synced pages and upsert the ones that changed
+
+    Returns:
+        The number of movies inserted or updated.
+
+    """
+    terms = terms or search_terms()
+    pages = pages or page_range()
+    batch_size = batch_size or int(os.getenv("INGEST_BATCH_SIZE", 500))
+
+    return sum(
+        sync_term(api_key, term, pages, batch_size, refresh=refresh) for term in terms
+    )
+
+
+def search_terms():
+    """
+    Returns the OMDb search terms from the comma separated OMDB_SEARCH_TERMS.
+
+    """
+    terms = os.getenv("OMDB_SEARCH_TERMS", "movie").split(",")
+    return [term.strip() for term in terms if term.strip()]
+
+
+def page_range():
+    """
+    Returns the page numbers to fetch from OMDB_PAGES, written as "first-last".
+
+    """
+    first, _, last = os.getenv("OMDB_PAGES", "1-10").partition("-")
+    return range(int(first), int(last or first) + 1)
+
+
+def get_movies(refresh=False):
+    """
+    Syncs the movie catalog from OMDb.
+
+    Pages stored by a previous run are skipped, so this tops up a partial
+    catalog and is a no-op on a complete one. Pass ``refresh`` to re-check
+    every page and update the movies that changed.
+
+    """
+    try:
+        api_key = os.getenv("API_KEY")
+        assert api_key is not None, "Set the API_KEY environment variable"
 
-        db.session.bulk_save_objects(movies or [])
-        db.session.commit()
+        written = ingest_movies(api_key, refresh=refresh)
+        print(f"Synced {written} movies from OMDb.")
 
     except OperationalError:
         print("The table does not exist. Please check your database setup.")
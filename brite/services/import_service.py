@@ -0,0 +1,162 @@
+import csv
+import json
+import os
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from brite.models.movie import MOVIE_FIELDS, Movie, movie_year
+from brite.services.get_movies import batched
+from brite.services.movie_service import generate_ids, publish_movies, upsert_movies
+from brite.utils.database_setup import db
+
+FORMATS = ("csv", "ndjson")
+
+
+def decode_lines(stream, bad_lines):
+    """
+    Yields the lines of a binary stream as UTF-8 text, a byte order mark
+    on the first line is dropped. Lines that are not valid UTF-8 are
+    decoded with replacement characters and their numbers are added to
+    the ``bad_lines`` set.
+
+    """
+    for number, line in enumerate(stream, 1):
+        encoding = "utf-8-sig" if number == 1 else "utf-8"
+        try:
+            yield line.decode(encoding)
+        except UnicodeDecodeError:
+            bad_lines.add(number)
+            yield line.decode(encoding, errors="replace")
+
+
+def read_csv(stream):
+    """
+    Yields the (line number, row) pairs of a CSV stream with a header line.
+    Rows that cannot be decoded or parsed are yielded as None.
+
+    """
+    bad_lines = set()
+    reader = csv.DictReader(decode_lines(stream, bad_lines))
+    while True:
+        # The line count of the underlying reader is also kept on errors
+        start = reader.reader.line_num + 1
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error:
+            row = None
+        end = reader.reader.line_num
+        # A quoted field can span lines, the row is bad if one of them is
+        if bad_lines.intersection(range(start, end + 1)):
+            row = None
+        yield end, row
+
+
+def read_ndjson(stream):
+    """
+    Yields the (line number, row) pairs of a stream of JSON objects, one per
+    line. Rows that are not valid UTF-8 or JSON are yielded as None.
+
+    """
+    bad_lines = set()
+    for number, line in enumerate(decode_lines(stream, bad_lines), 1):
+        if not line.strip():
+            continue
+        try:
+            row = None if number in bad_lines else json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row
+
+
+def movie_row(row):
+    """
+    Returns the movie fields of an imported row, or None if one of them
+    does not fit its column: a title of 1 to 100 characters, an optional
+    year, and optional strings that fit the id, type and poster columns.
+
+    """
+    if not isinstance(row, dict):
+        return None
+
+    values = {}
+    for field in MOVIE_FIELDS:
+        value = row.get(field)
+        values[field] = None if value == "" else value
+
+    try:
+        values["year"] = movie_year(values["year"])
+    except ValueError:
+        return None
+
+    title = values["title"]
+    if not isinstance(title, str) or not title.strip() or len(title) > 100:
+        return None
+    for field in ("id", "type", "poster"):
+        value = values[field]
+        length = Movie.__table__.c[field].type.length
+        if value is not None and (not isinstance(value, str) or len(value) > length):
+            return None
+    return values
+
+
+def import_movies(stream, file_format, overwrite=False, batch_size=None):
+    """
+    Imports the movies of a CSV or NDJSON stream.
+
+    The stream is parsed as it is read and written in batches of
+    ``batch_size`` rows (IMPORT_BATCH_SIZE, 1000 by default), each in its
+    own transaction, so memory use does not depend on the size of the
+    upload. A batch the database rejects is rolled back and its rows are
+    reported as invalid. Rows without an id get a new one. Rows whose id is stored are
+    skipped, or updated with ``overwrite``, and rows whose title belongs to
+    another movie are always skipped.
+
+    Parameters:
+        stream: the binary stream to read
+        file_format: "csv" or "ndjson"
+        overwrite: update the stored movies with the imported fields
+        batch_size: the number of rows per transaction
+
+    Yields:
+        The running totals after each batch, with the line numbers of the
+        invalid rows of that batch.
+
+    """
+    batch_size = batch_size or int(os.getenv("IMPORT_BATCH_SIZE", 1000))
+    rows = read_csv(stream) if file_format == "csv" else read_ndjson(stream)
+
+    progress = {"rows": 0, "inserted": 0, "updated": 0, "skipped": 0, "invalid": 0}
+    for batch in batched(rows, batch_size):
+        movies, lines, invalid = [], [], []
+        for number, row in batch:
+            values = movie_row(row)
+            if values is None:
+                invalid.append(number)
+            else:
+                movies.append(values)
+                lines.append(number)
+
+        missing = [values for values in movies if not values["id"]]
+        for values, movie_id in zip(missing, generate_ids(len(missing))):
+            values["id"] = movie_id
+
+        try:
+            written = upsert_movies(movies, overwrite=overwrite) if movies else None
+            db.session.commit()
+        except SQLAlchemyError as error:
+            # The rows of the batch are reported as invalid and the import
+            # goes on with the next batch.
+            db.session.rollback()
+            print(f"Import batch failed: {error}")
+            written = None
+            invalid = sorted(invalid + lines)
+        if written is not None:
+            publish_movies(written)
+            for key in ("inserted", "updated", "skipped"):
+                progress[key] += len(written[key])
+
+        progress["rows"] += len(batch)
+        progress["invalid"] += len(invalid)
+        yield {**progress, "invalid_lines": invalid}
@@ -1,28 +1,262 @@
-from brite.models.movie import Movie
+import os
+import sys
+
+from sqlalchemy import delete, insert, select, tuple_, update
+
+from brite.models.movie import MOVIE_COLUMNS, Movie, movie_dict
+from brite.services.change_service import record_changes
+from brite.services.facet_service import count_movies
+from brite.services.search_service import index_movie, unindex_movie
+from brite.utils.cache import Cache
+from brite.utils.cursor import decode_cursor, encode_cursor
 from brite.utils.database_setup import db
 from brite.utils.generate_id import generate_id
+from brite.utils.replicas import pinned_to_primary
+from brite.utils.singleflight import SingleFlight
 
+movie_cache = Cache()
+
+# Concurrent cache misses for the same movie share a single query
+lookups = SingleFlight()
+
+
+SORTS = {
+    "title": (Movie.title,),
+    "-title": (Movie.title.desc(),),
+    "year": (Movie.year, Movie.title),
+    # Titles descend too within a year, so the (year, title) indexes are
+    # walked backwards instead of sorting each year
+    "-year": (Movie.year.desc(), Movie.title.desc()),
+}
+
+
+def filter_movies(query, year_from=None, year_to=None, movie_type=None, prefix=None):
+    """
+    Narrows ``query`` down to the movies matching the listing filters.
+
+    The year sorts, with or without filters, and the title sorts without a
+    year filter walk one of the indexes of the movie table in order. So do
+    the title sorts of a single year, which is matched as an equality. A
+    title sort of a range of years still sorts the rows of the range: the
+    index seeks on the years, then the matching rows are sorted by title.
+    The title prefix is matched as a range, so it can seek on the title
+    index, and is case sensitive.
+
+    """
+    if movie_type is not None:
+        query = query.filter(Movie.type == movie_type)
+    if year_from is not None and year_from == year_to:
+        query = query.filter(Movie.year == year_from)
+    else:
+        if year_from is not None:
+            query = query.filter(Movie.year >= year_from)
+        if year_to is not None:
+            query = query.filter(Movie.year <= year_to)
+    if prefix:
+        query = query.filter(Movie.title >= prefix)
+        upper = prefix_upper_bound(prefix)
+        if upper is not None:
+            query = query.filter(Movie.title < upper)
+    return query
+
+
+def prefix_upper_bound(prefix):
+    """
+    Returns the smallest string greater than every string starting with
+    ``prefix``, or None when there is none because the prefix only holds
+    U+10FFFF. Surrogates are skipped, they cannot be encoded.
+
+    """
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    code = ord(prefix[-1]) + 1
+    if 0xD800 <= code <= 0xDFFF:
+        code = 0xE000
+    return prefix[:-1] + chr(code)
+
+
+def movies_query(
+    page: int, limit: int, cursor: str = None, sort: str = "title", **filters
+):
+    """
+    Returns the select of a page of movies, or an error response. The sync
+    and the async services both run it and build the page with
+    `movies_page`.
+
+    With a cursor the query seeks on the (title, id) index instead of
+    counting and skipping rows, so every page costs the same, and fetches
+    one extra row to tell whether another page follows. An empty cursor
+    starts from the first movie.
+
+    """
+    query = filter_movies(select(*MOVIE_COLUMNS), **filters)
+    if cursor is None:
+        return (
+            query.order_by(*SORTS[sort]).limit(limit).offset((max(page, 1) - 1) * limit)
+        )
+
+    if sort != "title":
+        return {"message": "Cursors can only be used when sorting by title"}, 400
+
+    query = query.order_by(Movie.title, Movie.id)
+    if cursor:
+        try:
+            title, movie_id = decode_cursor(cursor)
+        except ValueError:
+            return {"message": "Invalid cursor"}, 400
+        query = query.filter(tuple_(Movie.title, Movie.id) > (title, movie_id))
+    return query.limit(limit + 1)
+
+
+def movies_page(rows, limit: int, cursor: str = None):
+    """
+    Returns the response of the rows fetched by `movies_query`. In cursor
+    mode ``next_cursor`` is None on the last page.
+
+    """
+    if cursor is None:
+        return {"movies": [movie_dict(row) for row in rows]}
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last.title, last.id)
+
+    return {
+        "movies": [movie_dict(row) for row in rows[:limit]],
+        "next_cursor": next_cursor,
+    }
 
-def fetch_movies(page: int, limit: int):
-    pagination = Movie.query.order_by(Movie.title).paginate(
-        page=page, per_page=limit, error_out=False
-    )
-    movies = pagination.items
-    return {"movies": [movie.json() for movie in movies]}
+
+def fetch_movies(
+    page: int, limit: int, cursor: str = None, sort: str = "title", **filters
+):
+    query = movies_query(page, limit, cursor, sort, **filters)
+    if isinstance(query, tuple):
+        return query
+    return movies_page(db.session.execute(query).all(), limit, cursor)
+
+
+def cache_movie(movie, guard=None):
+    """
+    Caches the json of a movie under both its id and its title, unless
+    the ``guard`` (key, generation) read before loading it shows that a
+    write invalidated the movie in the meantime.
+
+    """
+    movie_cache.set(("id", movie["id"]), movie, guard)
+    movie_cache.set(("title", movie["title"]), movie, guard)
+
+
+def invalidate_movie(movie_id, movie_title):
+    """
+    Drops a movie from the cache after it was written.
+
+    """
+    movie_cache.delete(("id", movie_id), ("title", movie_title))
+
+
+def movie_query(criterion):
+    return select(*MOVIE_COLUMNS).where(criterion)
+
+
+def load_movie(key, criterion):
+    guard = (key, movie_cache.generation(key))
+    row = db.session.execute(movie_query(criterion)).first()
+    if row is None:
+        return None
+    movie = movie_dict(row)
+    cache_movie(movie, guard)
+    return movie
+
+
+def load_movie_by_title(movie_title):
+    return load_movie(("title", movie_title), Movie.title == movie_title)
+
+
+def load_movie_by_id(movie_id):
+    return load_movie(("id", movie_id), Movie.id == movie_id)
+
+
+def lookup_movie(key, load, value):
+    """
+    Returns the movie cached under ``key``, loading it with ``load`` on a
+    miss.
+
+    Requests pinned to the primary after a write skip the cache and the
+    shared lookups, which can hold a copy read before the write.
+
+    """
+    if pinned_to_primary():
+        return load(value)
+    movie = movie_cache.get(key)
+    if movie is None:
+        movie = lookups.do(key, load, value)
+    return movie
 
 
 def fetch_movie_by_title(movie_title):
-    movie = Movie.query.filter_by(title=movie_title).first()
+    movie = lookup_movie(("title", movie_title), load_movie_by_title, movie_title)
     if movie is None:
         return {"message": "Movie with this title does not exist"}, 404
-    return {"movie": movie.json()}
+    return {"movie": movie}
 
 
 def fetch_movie_by_id(movie_id):
-    movie = Movie.query.get(movie_id)
+    movie = lookup_movie(("id", movie_id), load_movie_by_id, movie_id)
     if movie is None:
         return {"message": "Movie with this id does not exist"}, 404
-    return {"movie": movie.json()}
+    return {"movie": movie}
+
+
+def fetch_movies_by_ids(movie_ids):
+    """
+    Returns the movies with the given ids in the order they were asked for.
+
+    Cached movies are served from the cache and the rest are loaded with a
+    single query. Like `lookup_movie`, requests pinned to the primary skip
+    the cache. At most MOVIE_BATCH_LIMIT ids (100 by default) are accepted
+    per call.
+
+    Parameters:
+        movie_ids: the ids to look up, repeated ids are answered each time
+
+    Returns:
+        The movies, with None in place of each unknown id, and the list of
+        unknown ids.
+
+    """
+    limit = int(os.getenv("MOVIE_BATCH_LIMIT", 100))
+    if not movie_ids:
+        return {"message": "No movie ids given"}, 400
+    if len(movie_ids) > limit:
+        return {"message": f"At most {limit} movie ids can be fetched at once"}, 400
+
+    unique = list(dict.fromkeys(movie_ids))
+    found = {}
+    if not pinned_to_primary():
+        for movie_id in unique:
+            movie = movie_cache.get(("id", movie_id))
+            if movie is not None:
+                found[movie_id] = movie
+
+    misses = [movie_id for movie_id in unique if movie_id not in found]
+    if misses:
+        generations = {
+            movie_id: movie_cache.generation(("id", movie_id)) for movie_id in misses
+        }
+        query = select(*MOVIE_COLUMNS).where(Movie.id.in_(misses))
+        for row in db.session.execute(query):
+            movie = movie_dict(row)
+            key = ("id", movie["id"])
+            cache_movie(movie, (key, generations[movie["id"]]))
+            found[movie["id"]] = movie
+
+    return {
+        "movies": [found.get(movie_id) for movie_id in movie_ids],
+        "missing": [movie_id for movie_id in unique if movie_id not in found],
+    }
 
 
 def add_movie(movie_title):
@@ -34,7 +268,11 @@ def add_movie(movie_title):
     code = generate_id()
     movie = Movie(id=code, title=movie_title)
     db.session.add(movie)
+    count_movies(added=[movie.json()])
+    record_changes(upserted=[movie.json()])
     db.session.commit()
+    invalidate_movie(code, movie_title)
+    index_movie(code, movie_title)
 
     return {"movie": movie.json()}, 201
 
@@ -43,8 +281,226 @@ def delete_movie(movie_id):
     movie = Movie.query.get(movie_id)
 
     if movie:
+        movie_title = movie.title
+        count_movies(removed=[movie.json()])
+        record_changes(deleted=[movie_id])
         db.session.delete(movie)
         db.session.commit()
+        invalidate_movie(movie_id, movie_title)
+        unindex_movie(movie_id)
         return {"message": "Movie deleted."}, 200
     else:
         return {"message": "Movie not found."}, 404
+
+
+def upsert_movies(rows, overwrite=True):
+    """
+    Adds the insert or update of ``rows`` to the current transaction.
+
+    Rows are matched on id: new ones are inserted and stored ones are only
+    updated when a field changed, or never without ``overwrite``. Rows whose
+    title belongs to another movie are skipped, and so are repeated ids
+    after the first. The facet counts and the change log are updated in the
+    same transaction.
+    Pass the result to `publish_movies` once the transaction is committed.
+
+    Parameters:
+        rows: dicts with the id, title, year, type and poster of each movie
+        overwrite: set to False to leave the stored movies untouched
+
+    Returns:
+        A dict with the "inserted", "updated" and "skipped" rows, skipped
+        meaning not written, and the "previous" values of the updated
+        movies by id.
+
+    """
+    unique, skipped = {}, []
+    for values in rows:
+        if unique.setdefault(values["id"], values) is not values:
+            skipped.append(values)
+
+    stored = {
+        row.id: row._asdict()
+        for row in db.session.execute(
+            select(Movie.id, Movie.title, Movie.year, Movie.type, Movie.poster).where(
+                Movie.id.in_(list(unique))
+            )
+        )
+    }
+    owners = dict(
+        db.session.execute(
+            select(Movie.title, Movie.id).where(
+                Movie.title.in_([values["title"] for values in unique.values()])
+            )
+        ).all()
+    )
+
+    inserts, updates = [], []
+    for movie_id, values in unique.items():
+        previous = stored.get(movie_id)
+        if owners.setdefault(values["title"], movie_id) != movie_id:
+            skipped.append(values)
+        elif previous is None:
+            inserts.append(values)
+        elif not overwrite:
+            skipped.append(values)
+        elif any(str(previous[key]) != str(value) for key, value in values.items()):
+            updates.append(values)
+        else:
+            skipped.append(values)
+
+    if inserts:
+        db.session.execute(insert(Movie), inserts)
+    if updates:
+        db.session.execute(update(Movie), updates)
+    previous = {values["id"]: stored[values["id"]] for values in updates}
+    count_movies(added=inserts + updates, removed=previous.values())
+    record_changes(upserted=inserts + updates)
+
+    return {
+        "inserted": inserts,
+        "updated": updates,
+        "skipped": skipped,
+        "previous": previous,
+    }
+
+
+def publish_movies(written):
+    """
+    Updates the cache and the in-memory indexes after `upsert_movies` was
+    committed.
+
+    """
+    for values in written["inserted"]:
+        index_movie(values["id"], values["title"])
+    for values in written["updated"]:
+        old_title = written["previous"][values["id"]]["title"]
+        invalidate_movie(values["id"], old_title)
+        index_movie(values["id"], values["title"])
+
+
+def bulk_limit(items):
+    """
+    Returns an error response when ``items`` is empty or longer than
+    MOVIE_BULK_LIMIT (1000 by default), None otherwise.
+
+    """
+    limit = int(os.getenv("MOVIE_BULK_LIMIT", 1000))
+    if not items:
+        return {"message": "The batch is empty"}, 400
+    if len(items) > limit:
+        return {"message": f"At most {limit} movies can be written at once"}, 400
+    return None
+
+
+def generate_ids(count):
+    """
+    Returns ``count`` new movie ids, distinct from each other and from the
+    stored movies.
+
+    """
+    ids = set()
+    while len(ids) < count:
+        while len(ids) < count:
+            ids.add(generate_id())
+        taken = db.session.scalars(select(Movie.id).where(Movie.id.in_(ids)))
+        ids.difference_update(taken)
+    return list(ids)
+
+
+def add_movies(movie_titles):
+    """
+    Adds a batch of movies in one transaction.
+
+    The whole batch is checked with a single query before anything is
+    written, and only the valid titles are inserted.
+
+    Parameters:
+        movie_titles: the titles to add
+
+    Returns:
+        The result of each title, in order, with its status code and either
+        the stored movie or an error message.
+
+    """
+    error = bulk_limit(movie_titles)
+    if error is not None:
+        return error
+
+    results, valid = [], {}
+    for title in movie_titles:
+        result = {"title": title, "status": 400}
+        if not isinstance(title, str) or not title.strip() or len(title) > 100:
+            result["message"] = "Movie title must be between 1 and 100 characters"
+        elif title in valid:
+            result["message"] = "Movie title appears more than once in the batch"
+        else:
+            valid[title] = result
+        results.append(result)
+
+    taken = db.session.scalars(select(Movie.title).where(Movie.title.in_(list(valid))))
+    for title in taken:
+        valid.pop(title)["message"] = "Movie with this title already exists"
+
+    movies = [
+        {"id": code, "title": title, "year": None, "type": None, "poster": None}
+        for code, title in zip(generate_ids(len(valid)), valid)
+    ]
+    if movies:
+        db.session.execute(insert(Movie), movies)
+        count_movies(added=movies)
+        record_changes(upserted=movies)
+        db.session.commit()
+
+    for movie in movies:
+        invalidate_movie(movie["id"], movie["title"])
+        index_movie(movie["id"], movie["title"])
+        valid[movie["title"]].update(status=201, movie=movie)
+
+    return {"created": len(movies), "results": results}, 200
+
+
+def delete_movies(movie_ids):
+    """
+    Deletes a batch of movies in one transaction.
+
+    Parameters:
+        movie_ids: the ids to delete
+
+    Returns:
+        The result of each id, in order, with its status code and message.
+
+    """
+    error = bulk_limit(movie_ids)
+    if error is not None:
+        return error
+
+    stored = {
+        row.id: row._asdict()
+        for row in db.session.execute(
+            select(Movie.id, Movie.title, Movie.year, Movie.type).where(
+                Movie.id.in_(movie_ids)
+            )
+        )
+    }
+    if stored:
+        db.session.execute(delete(Movie).where(Movie.id.in_(list(stored))))
+        count_movies(removed=stored.values())
+        record_changes(deleted=list(stored))
+        db.session.commit()
+
+    for movie in stored.values():
+        invalidate_movie(movie["id"], movie["title"])
+        unindex_movie(movie["id"])
+
+    results, deleted = [], set()
+    for movie_id in movie_ids:
+        if movie_id in stored and movie_id not in deleted:
+            deleted.add(movie_id)
+            results.append({"id": movie_id, "status": 200, "message": "Movie deleted."})
+        else:
+            results.append(
+                {"id": movie_id, "status": 404, "message": "Movie not found."}
+            )
+
+    return {"deleted": len(deleted), "results": results}, 200
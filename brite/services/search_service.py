@@ -0,0 +1,426 @@
+import heapq
+import os
+import re
+import threading
+import time
+import weakref
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+
+from brite.models.movie import MOVIE_COLUMNS, MOVIE_FIELDS, Movie, movie_dict
+from brite.services.change_service import catalog_version, changes_after
+from brite.utils.database_setup import db
+from brite.utils.title_index import TitleIndex
+
+TOKEN = re.compile(r"\w+")
+
+# The rows of movie_fts are found by the id they store: the rowid of the
+# movie table is implicit, since its primary key is text, and VACUUM can
+# renumber it. Deletes find the row to drop through a phrase match on the
+# old title, so they use the index instead of scanning the id column. A
+# title without tokens, or an empty one, matches nothing: only then is the row
+# found by scanning the ids, which a LIMIT of 0 skips otherwise.
+SQLITE_FTS_TITLE = (
+    "'title : \"' || replace(coalesce(old.title, ''), '\"', '\"\"') || '\"'"
+)
+SQLITE_FTS_DELETE = (
+    "DELETE FROM movie_fts WHERE rowid IN (SELECT rowid FROM movie_fts "
+    "WHERE id = old.id LIMIT CASE WHEN EXISTS (SELECT 1 FROM movie_fts "
+    f"WHERE movie_fts MATCH {SQLITE_FTS_TITLE}) THEN 0 ELSE -1 END); "
+    "DELETE FROM movie_fts WHERE rowid IN (SELECT rowid FROM movie_fts "
+    f"WHERE movie_fts MATCH {SQLITE_FTS_TITLE} AND id = old.id);"
+)
+
+SQLITE_INDEX = [
+    "CREATE VIRTUAL TABLE movie_fts USING fts5("
+    "id UNINDEXED, title, tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER movie_fts_insert AFTER INSERT ON movie BEGIN "
+    "INSERT INTO movie_fts (id, title) VALUES (new.id, new.title); END",
+    f"CREATE TRIGGER movie_fts_delete AFTER DELETE ON movie BEGIN {SQLITE_FTS_DELETE} END",
+    "CREATE TRIGGER movie_fts_update AFTER UPDATE OF id, title ON movie BEGIN "
+    f"{SQLITE_FTS_DELETE} "
+    "INSERT INTO movie_fts (id, title) VALUES (new.id, new.title); END",
+    "INSERT INTO movie_fts (id, title) SELECT id, title FROM movie",
+]
+
+# Drops the index of older versions, which was keyed on the movie rowid or
+# kept the rows of titles without tokens.
+SQLITE_DROP_INDEX = [
+    "DROP TRIGGER IF EXISTS movie_fts_insert",
+    "DROP TRIGGER IF EXISTS movie_fts_delete",
+    "DROP TRIGGER IF EXISTS movie_fts_update",
+    "DROP TABLE IF EXISTS movie_fts",
+]
+
+SQLITE_INDEX_EXISTS = text(
+    "SELECT 1 FROM pragma_table_info('movie_fts') WHERE name = 'id' AND EXISTS "
+    "(SELECT 1 FROM sqlite_master WHERE type = 'trigger' "
+    "AND name = 'movie_fts_delete' AND sql = :sql)"
+).bindparams(sql=SQLITE_INDEX[2])
+
+SEARCH_COLUMNS = [Movie.__table__.c[field] for field in MOVIE_FIELDS]
+
+SQLITE_SEARCH = text(
+    "SELECT movie.id, movie.title, movie.year, movie.type, movie.poster "
+    "FROM movie_fts JOIN movie ON movie.id = movie_fts.id "
+    "WHERE movie_fts MATCH :query ORDER BY bm25(movie_fts), movie.title LIMIT :limit"
+).columns(*SEARCH_COLUMNS)
+
+# Built without locking writes, it has to run outside a transaction. An
+# invalid index left by a failed build is dropped first.
+POSTGRES_INDEX = [
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_movie_title_fts",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_movie_title_fts "
+    "ON movie USING gin (to_tsvector('simple', title))",
+]
+
+POSTGRES_INDEX_EXISTS = text(
+    "SELECT 1 FROM pg_class JOIN pg_index ON pg_index.indexrelid = pg_class.oid "
+    "WHERE pg_class.relname = 'ix_movie_title_fts' AND pg_index.indisvalid"
+)
+
+POSTGRES_SEARCH = text(
+    "SELECT id, title, year, type, poster FROM movie "
+    "WHERE to_tsvector('simple', title) @@ to_tsquery('simple', :query) "
+    "ORDER BY ts_rank(to_tsvector('simple', title), to_tsquery('simple', :query)) "
+    "DESC, title LIMIT :limit"
+).columns(*SEARCH_COLUMNS)
+
+INDEX_EXISTS = {"sqlite": SQLITE_INDEX_EXISTS, "postgresql": POSTGRES_INDEX_EXISTS}
+
+
+def tokenize(value):
+    """
+    Splits ``value`` into lower-case word tokens.
+
+    """
+    return TOKEN.findall(value.lower())
+
+
+class InvertedIndex:
+    """
+
+    In-memory title index used when the database has no full-text search.
+
+    Every token of the query must match, the last one as a prefix so
+    results show up while typing. Shorter titles rank first. The tokens
+    are also kept in a sorted list, so the tokens starting with a prefix
+    are found with bisect, like in `TitleIndex`.
+
+    """
+
+    def __init__(self):
+        self.built = False
+        self.seq = 0
+        self.synced_at = 0.0
+        self._postings = defaultdict(set)
+        self._tokens = []
+        self._titles = {}
+        self._lock = threading.Lock()
+
+    def build(self, movies, seq=0):
+        """
+        Fills the index from (id, title) pairs, read at change log position
+        ``seq``.
+
+        """
+        postings, titles = defaultdict(set), {}
+        for movie_id, title in movies:
+            titles[movie_id] = title
+        for movie_id, title in titles.items():
+            for token in tokenize(title):
+                postings[token].add(movie_id)
+
+        with self._lock:
+            self._postings = postings
+            self._tokens = sorted(postings)
+            self._titles = titles
+            self.seq = seq
+            self.synced_at = time.monotonic()
+            self.built = True
+
+    def reset(self):
+        """
+        Empties the index until it is built again.
+
+        """
+        with self._lock:
+            self._postings.clear()
+            self._tokens.clear()
+            self._titles.clear()
+            self.seq = 0
+            self.built = False
+
+    def _add(self, movie_id, title):
+        self._titles[movie_id] = title
+        for token in tokenize(title):
+            if token not in self._postings:
+                insort(self._tokens, token)
+            self._postings[token].add(movie_id)
+
+    def _remove(self, movie_id):
+        title = self._titles.pop(movie_id, None)
+        for token in set(tokenize(title or "")):
+            ids = self._postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(movie_id)
+            if not ids:
+                del self._postings[token]
+                del self._tokens[bisect_left(self._tokens, token)]
+
+    def add(self, movie_id, title):
+        """
+        Indexes a movie, replacing its previous title. Ignored until built.
+
+        """
+        with self._lock:
+            if self.built:
+                self._remove(movie_id)
+                self._add(movie_id, title)
+
+    def remove(self, movie_id):
+        """
+        Drops a movie from the index. Ignored until built.
+
+        """
+        with self._lock:
+            if self.built:
+                self._remove(movie_id)
+
+    def search(self, query, limit):
+        """
+        Returns the ids of the best ``limit`` matches for ``query``.
+
+        """
+        *words, prefix = tokenize(query) or [""]
+        if not prefix:
+            return []
+
+        with self._lock:
+            matches = set()
+            position = bisect_left(self._tokens, prefix)
+            while position < len(self._tokens) and self._tokens[position].startswith(
+                prefix
+            ):
+                matches |= self._postings[self._tokens[position]]
+                position += 1
+            for word in words:
+                matches &= self._postings.get(word, set())
+            titles = self._titles
+
+        # Ranked outside the lock, a movie removed meanwhile ranks last and
+        # is dropped when its row is not found.
+        def rank(movie_id):
+            title = titles.get(movie_id)
+            return (len(title) if title is not None else float("inf"), movie_id)
+
+        return heapq.nsmallest(limit, matches, key=rank)
+
+
+search_index = InvertedIndex()
+
+_engine_backends = weakref.WeakKeyDictionary()
+_backend_lock = threading.Lock()
+_sync_lock = threading.Lock()
+
+_title_index = None
+
+
+def create_search_index():
+    """
+    Creates the full-text index of the current database unless it already
+    exists. It is run by `seed`, never by a request.
+
+    The SQLite index is kept in sync with the movie table by triggers and
+    the Postgres one is an expression index, built concurrently so writes
+    are not blocked meanwhile. Other databases, and SQLite builds without
+    FTS5, use `search_index`.
+
+    Returns:
+        The backend to search with: "sqlite", "postgresql" or "python".
+
+    """
+    dialect = db.engine.dialect.name
+    db.session.commit()
+    try:
+        if dialect == "sqlite":
+            if db.session.execute(SQLITE_INDEX_EXISTS).first() is None:
+                for statement in SQLITE_DROP_INDEX + SQLITE_INDEX:
+                    db.session.execute(text(statement))
+                db.session.commit()
+
+        elif dialect == "postgresql":
+            with db.engine.connect() as connection:
+                connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+                if connection.execute(POSTGRES_INDEX_EXISTS).first() is None:
+                    for statement in POSTGRES_INDEX:
+                        connection.execute(text(statement))
+
+    except OperationalError:
+        db.session.rollback()
+        print(f"No full-text search in {dialect}, using the in-memory index.")
+
+    with _backend_lock:
+        _engine_backends.pop(db.engine, None)
+    return search_backend()
+
+
+def search_backend():
+    """
+    Returns the full-text backend of the current database: "sqlite" or
+    "postgresql" once `create_search_index` created the index, "python"
+    otherwise. Only the full-text backends are remembered, so the index is
+    picked up as soon as it exists.
+
+    """
+    with _backend_lock:
+        backend = _engine_backends.get(db.engine)
+        if backend is None:
+            dialect = db.engine.dialect.name
+            exists = INDEX_EXISTS.get(dialect)
+            if exists is None:
+                backend = _engine_backends[db.engine] = "python"
+            elif db.session.execute(exists).first() is not None:
+                backend = _engine_backends[db.engine] = dialect
+            else:
+                backend = "python"
+
+        if backend == "python" and not search_index.built:
+            seq = catalog_version()[0]
+            search_index.build(db.session.execute(select(Movie.id, Movie.title)), seq)
+
+    if backend == "python":
+        sync_index(search_index)
+    return backend
+
+
+def match_movies(backend, query, limit):
+    """
+    Returns the movies matching ``query``, best match first.
+
+    The full-text queries return the ids and the rows together, so both
+    come from the same database when reads go to a replica.
+
+    """
+    words = tokenize(query)
+    if not words:
+        return []
+
+    if backend == "sqlite":
+        match = " ".join(f'"{word}"' for word in words) + "*"
+        rows = db.session.execute(SQLITE_SEARCH, {"query": match, "limit": limit})
+        return [movie_dict(row) for row in rows]
+    if backend == "postgresql":
+        match = " & ".join(words) + ":*"
+        rows = db.session.execute(POSTGRES_SEARCH, {"query": match, "limit": limit})
+        return [movie_dict(row) for row in rows]
+
+    ids = search_index.search(query, limit)
+    rows = db.session.execute(select(*MOVIE_COLUMNS).where(Movie.id.in_(ids)))
+    movies = {row.id: movie_dict(row) for row in rows}
+    return [movies[movie_id] for movie_id in ids if movie_id in movies]
+
+
+def search_movies(query, limit):
+    """
+    Returns the movies whose title matches ``query``, best match first.
+
+    """
+    return {"movies": match_movies(search_backend(), query, limit)}
+
+
+def title_index():
+    """
+    Returns the autocomplete index, loading it from the movie table on
+    first use and bringing it up to date with `sync_index`.
+
+    """
+    global _title_index
+
+    with _backend_lock:
+        if _title_index is None:
+            seq = catalog_version()[0]
+            movies = db.session.execute(select(Movie.id, Movie.title))
+            _title_index = TitleIndex(movies, seq)
+            _title_index.synced_at = time.monotonic()
+    sync_index(_title_index)
+    return _title_index
+
+
+def sync_index(index):
+    """
+    Applies the changes logged after ``index.seq`` to an in-memory index,
+    so it picks up the writes of the other workers and of the flask
+    commands, not only the ones `index_movie` sees in this process.
+
+    The log is read at most every INDEX_SYNC_INTERVAL seconds (1 by
+    default) and by one thread at a time, the others keep answering from
+    the index meanwhile. The index is read before the log position it was
+    loaded at, so a change can be applied twice, which changes nothing.
+
+    """
+    interval = float(os.getenv("INDEX_SYNC_INTERVAL", 1))
+    now = time.monotonic()
+    if now - index.synced_at < interval or not _sync_lock.acquire(blocking=False):
+        return
+    try:
+        index.synced_at = now
+        for seq, op, movie_id, data in db.session.execute(changes_after(index.seq)):
+            if op == "delete":
+                index.remove(movie_id)
+            elif data and data.get("title"):
+                index.add(movie_id, data["title"])
+            index.seq = seq
+    finally:
+        _sync_lock.release()
+
+
+def reset_indexes():
+    """
+    Drops the in-memory indexes, they are reloaded from the database on
+    next use.
+
+    """
+    global _title_index
+
+    with _backend_lock:
+        _title_index = None
+    search_index.reset()
+
+
+def autocomplete(prefix, limit):
+    """
+    Returns the movies whose title starts with ``prefix``, ignoring case
+    and accents.
+
+    """
+    return {"movies": title_index().complete(prefix, limit)}
+
+
+def index_movie(movie_id, title):
+    """
+    Adds a stored or renamed movie to the in-memory indexes that are loaded,
+    replacing its previous title.
+
+    """
+    search_index.add(movie_id, title)
+
+    index = _title_index
+    if index is not None:
+        index.add(movie_id, title)
+
+
+def unindex_movie(movie_id):
+    """
+    Removes a deleted movie from the in-memory indexes that are loaded.
+
+    """
+    search_index.remove(movie_id)
+
+    index = _title_index
+    if index is not None:
+        index.remove(movie_id)
@@ -0,0 +1,151 @@
+import fcntl
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from brite.models.user import User
+from brite.services.facet_service import rebuild_facets
+from brite.services.get_movies import get_movies
+from brite.services.search_service import create_search_index
+from brite.utils.database_setup import db
+from brite.utils.set_users import set_users
+
+# Key of the Postgres advisory lock held while seeding
+SEED_LOCK_KEY = 4_212_024
+
+
+@contextmanager
+def seed_lock():
+    """
+    Holds a database-wide lock while seeding, so several processes seeding
+    the same database run one after the other.
+
+    Postgres takes a session advisory lock, polled so that the wait is not
+    cut by a statement timeout. File SQLite databases lock a file next to
+    the database. Other databases, and in-memory ones, are not locked.
+
+    """
+    url = db.engine.url
+    backend = url.get_backend_name()
+
+    if backend == "postgresql":
+        params = {"key": SEED_LOCK_KEY}
+        with db.engine.connect() as connection:
+            connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+            lock = text("SELECT pg_try_advisory_lock(:key)")
+            while not connection.execute(lock, params).scalar():
+                time.sleep(1)
+            try:
+                yield
+            finally:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), params)
+    elif backend == "sqlite" and url.database not in (None, "", ":memory:"):
+        with open(f"{url.database}.seed-lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    else:
+        yield
+
+
+def seed(refresh=False, movies=True):
+    """
+    Creates the tables, the default users and syncs the catalog from OMDb.
+
+    The facet counts are rebuilt at the end, which picks up movies stored
+    before the counts existed, and the full-text index is created if it
+    does not exist yet.
+
+    Everything runs under `seed_lock`, a process that waited for the lock
+    finds the tables, users and checkpoints of the one before it and only
+    syncs the pages that are still missing.
+
+    Parameters:
+        refresh: re-check OMDb pages that were already synced
+        movies: set to False to skip the OMDb sync
+
+    """
+    with seed_lock():
+        db.create_all()
+        set_users()
+        if movies:
+            get_movies(refresh=refresh)
+        rebuild_facets()
+        create_search_index()
+
+
+class SeedJob:
+    """
+
+    Runs the seeding in a background thread so the app can serve requests
+    while the catalog is loaded.
+
+    Parameters:
+        app: the Flask app to seed
+        refresh: re-check OMDb pages that were already synced
+
+    """
+
+    def __init__(self, app, refresh=False):
+        self.app = app
+        self.refresh = refresh
+        self.state = "pending"
+        self.error = None
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="brite-seed", daemon=True)
+
+    def start(self):
+        """
+        Starts the job and returns it.
+
+        """
+        self.thread.start()
+        return self
+
+    def run(self):
+        """
+        Seeds the database, recording whether it succeeded.
+
+        """
+        self.state = "running"
+        try:
+            with self.app.app_context():
+                seed(refresh=self.refresh)
+        except Exception as error:
+            self.state = "failed"
+            self.error = str(error)
+            print(f"Seeding failed: {error}")
+        else:
+            self.state = "ready"
+        finally:
+            self.done.set()
+
+
+def readiness(job=None):
+    """
+    Reports whether the app can serve the catalog.
+
+    The app is not ready while the background seed job, if there is one,
+    is running. Once it finished, readiness only depends on the database
+    holding the seeded users: a job that failed after another process
+    seeded the database does not keep the app out of rotation.
+
+    """
+    if job is not None and not job.done.is_set():
+        return {"status": job.state, "error": job.error}, 503
+
+    try:
+        seeded = User.query.first() is not None
+    except OperationalError:
+        seeded = False
+
+    if not seeded:
+        if job is not None and job.state == "failed":
+            return {"status": job.state, "error": job.error}, 503
+        return {"status": "not seeded"}, 503
+    return {"status": "ready"}, 200
@@ -0,0 +1,145 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from brite import create_app, db
+from brite.services.movie_service import add_movie, movie_cache
+from brite.utils.pool import InstrumentedAsyncQueuePool
+from brite.utils.replicas import STICKY_COOKIE
+
+try:
+    from starlette.testclient import TestClient
+
+    from brite.asgi import create_asgi_app
+    from brite.services.async_movie_service import async_database_url
+except ImportError:
+    create_asgi_app = None
+
+
+@unittest.skipIf(create_asgi_app is None, "async-requirements.txt is not installed")
+class TestAsgi(unittest.TestCase):
+    def setUp(self):
+        # A file database, so the sync and the async engines share the data
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+
+        with patch.dict(os.environ, {"DATABASE_URL": f"sqlite:///{self.path}"}):
+            self.app = create_app()
+        self.app.config["TESTING"] = True
+
+        with self.app.app_context():
+            db.create_all()
+            self.movie = add_movie("Alien")[0]["movie"]
+            add_movie("Brazil")
+        movie_cache.clear()
+
+        self.client = TestClient(create_asgi_app(self.app))
+        self.client.__enter__()
+
+    def tearDown(self):
+        self.client.__exit__(None, None, None)
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.engine.dispose()
+        os.remove(self.path)
+
+    def test_async_database_url(self):
+        self.assertEqual(
+            async_database_url("sqlite:///movies.db").render_as_string(),
+            "sqlite+aiosqlite:///movies.db",
+        )
+        self.assertEqual(
+            async_database_url("postgresql://user@db/movies").drivername,
+            "postgresql+asyncpg",
+        )
+        with self.assertRaises(ValueError):
+            async_database_url("mysql://user@db/movies")
+
+    def test_async_engine_opens_the_flask_database(self):
+        with patch.dict(os.environ, {"DATABASE_URL": "sqlite:///movies.db"}):
+            app = create_app()
+        create_asgi_app(app)
+        async_engine = app.extensions["brite_async_engine"]
+
+        # Relative SQLite paths are resolved in the instance folder
+        with app.app_context():
+            self.assertEqual(async_engine.url.database, db.engine.url.database)
+            self.assertTrue(os.path.isabs(db.engine.url.database))
+
+    def test_metrics_report_the_async_pool(self):
+        create_asgi_app(self.app, poolclass=InstrumentedAsyncQueuePool)
+
+        response = self.app.test_client().get("/api/v1/metrics")
+
+        self.assertIn("async", response.get_json()["database_pools"])
+
+    def test_list_movies(self):
+        response = self.client.get("/api/v1/movies?limit=1&cursor=")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["movies"][0]["title"], "Alien")
+        self.assertIsNotNone(response.json()["next_cursor"])
+
+    def test_list_movies_matches_the_flask_app(self):
+        flask_response = self.app.test_client().get("/api/v1/movies?sort=-title")
+        response = self.client.get("/api/v1/movies?sort=-title")
+
+        self.assertEqual(response.json(), flask_response.get_json())
+        self.assertEqual(response.headers["ETag"], flask_response.headers["ETag"])
+
+    def test_list_movies_rejects_invalid_arguments(self):
+        response = self.client.get("/api/v1/movies?limit=0")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("limit", response.json()["message"])
+
+    def test_movie_by_id_and_title(self):
+        by_id = self.client.get(f"/api/v1/movies/id/{self.movie['id']}")
+        by_title = self.client.get("/api/v1/movies/title/Alien")
+
+        self.assertEqual(by_id.json(), {"movie": self.movie})
+        self.assertEqual(by_title.json(), {"movie": self.movie})
+
+    def test_pinned_requests_skip_the_cache(self):
+        stale = {**self.movie, "year": "1900"}
+        movie_cache.set(("id", self.movie["id"]), stale)
+
+        self.client.cookies.set(STICKY_COOKIE, "1")
+        response = self.client.get(f"/api/v1/movies/id/{self.movie['id']}")
+
+        self.assertEqual(response.json(), {"movie": self.movie})
+
+    def test_missing_movie(self):
+        response = self.client.get("/api/v1/movies/id/tt0")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("ETag", response.headers)
+
+        response = self.client.get(
+            "/api/v1/movies/id/tt0", headers={"If-None-Match": '"v0"'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_not_modified(self):
+        etag = self.client.get("/api/v1/movies").headers["ETag"]
+
+        response = self.client.get("/api/v1/movies", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+
+    def test_writes_are_served_by_flask(self):
+        etag = self.client.get("/api/v1/movies/title/Heat").headers.get("ETag")
+
+        response = self.client.post("/api/v1/movies", json={"title": "Heat"})
+        movie = self.client.get("/api/v1/movies/title/Heat")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(movie.status_code, 200)
+        self.assertNotEqual(movie.headers["ETag"], etag)
+
+
+if __name__ == "__main__":
+    unittest.main()
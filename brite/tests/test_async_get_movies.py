@@ -0,0 +1,101 @@
+import asyncio
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from brite.services.get_movies import fetch_pages
+
+try:
+    import httpx
+
+    from brite.services import async_get_movies
+except ImportError:
+    httpx = None
+
+
+@unittest.skipIf(httpx is None, "async-requirements.txt is not installed")
+class TestAsyncGetMovies(unittest.TestCase):
+    def setUp(self):
+        self.state = {"active": 0, "peak": 0, "calls": 0}
+
+    def collect(self, jobs, max_workers=None):
+        async def collect():
+            stream = async_get_movies.fetch_pages(jobs, "key", max_workers)
+            return [item async for item in stream]
+
+        return asyncio.run(collect())
+
+    def client(self, handler):
+        def create_client(max_workers):
+            return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        return patch.object(async_get_movies, "create_client", create_client)
+
+    async def slow_page(self, request):
+        page = int(request.url.params["page"])
+        self.state["active"] += 1
+        self.state["peak"] = max(self.state["peak"], self.state["active"])
+        # Later pages finish first, results must still come back in page order
+        await asyncio.sleep(0.01 * (10 - page))
+        self.state["active"] -= 1
+        return httpx.Response(200, json={"page": page})
+
+    def test_fetch_pages_keeps_order_and_bounds_in_flight(self):
+        jobs = [("movie", page) for page in range(1, 10)]
+
+        with self.client(self.slow_page):
+            result = self.collect(jobs, 3)
+
+        self.assertEqual([job for job, _ in result], jobs)
+        self.assertEqual([data["page"] for _, data in result], list(range(1, 10)))
+        self.assertLessEqual(self.state["peak"], 3)
+
+    def test_fetch_movies_retries_server_errors(self):
+        def flaky(request):
+            self.state["calls"] += 1
+            if self.state["calls"] < 3:
+                return httpx.Response(503)
+            return httpx.Response(200, json={"Search": []})
+
+        with patch.dict(os.environ, {"OMDB_BACKOFF": "0"}), self.client(flaky):
+            result = self.collect([("movie", 1)])
+
+        self.assertEqual(result, [(("movie", 1), {"Search": []})])
+        self.assertEqual(self.state["calls"], 3)
+
+    def test_sync_fetch_pages_uses_the_async_client(self):
+        jobs = [("movie", page) for page in range(1, 4)]
+
+        with patch.dict(os.environ, {"OMDB_CLIENT": "async"}):
+            with self.client(self.slow_page):
+                result = list(fetch_pages(jobs, "key", max_workers=2))
+
+        self.assertEqual([data["page"] for _, data in result], [1, 2, 3])
+
+    def test_iter_pages_streams_a_bounded_window(self):
+        def page(request):
+            self.state["calls"] += 1
+            return httpx.Response(200, json={"page": int(request.url.params["page"])})
+
+        jobs = [("movie", page) for page in range(1, 101)]
+        with self.client(page):
+            pages = async_get_movies.iter_pages(jobs, "key", max_workers=2)
+            self.assertEqual(next(pages), (("movie", 1), {"page": 1}))
+            time.sleep(0.1)
+            pages.close()
+
+        # The window in flight and the queue, not the whole term
+        self.assertLessEqual(self.state["calls"], 6)
+
+    def test_iter_pages_raises_errors(self):
+        def failing(request):
+            return httpx.Response(500)
+
+        with patch.dict(os.environ, {"OMDB_RETRIES": "0"}), self.client(failing):
+            with self.assertRaises(httpx.HTTPStatusError):
+                list(async_get_movies.iter_pages([("movie", 1)], "key"))
+
+
+if __name__ == "__main__":
+    unittest.main()
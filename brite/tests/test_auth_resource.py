@@ -1,6 +1,7 @@
 import unittest
 
 from brite import create_app, db
+from brite.utils.set_users import set_users
 
 
 class TestYourResource(unittest.TestCase):
@@ -13,6 +14,7 @@ class TestYourResource(unittest.TestCase):
 
         with self.app.app_context():
             db.create_all()
+            set_users()
 
     def tearDown(self):
         with self.app.app_context():
@@ -41,6 +43,17 @@ class TestYourResource(unittest.TestCase):
         # Check that the status code is 401 (Unauthorized)
         self.assertEqual(response.status_code, 401)
 
+    def test_login_without_password(self):
+        response = self.client.post("/api/v1/login", json={"username": "user"})
+
+        # Check that the status code is 400 (Bad Request)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("password", response.json["message"])
+
+    def test_login_without_json_body(self):
+        response = self.client.post("/api/v1/login", data="username=user")
+        self.assertEqual(response.status_code, 400)
+
 
 if __name__ == "__main__":
     unittest.main()
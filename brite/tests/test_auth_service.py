@@ -1,7 +1,7 @@
 import unittest
 from unittest.mock import MagicMock, patch
 
-from flask_jwt_extended import JWTManager
+from flask_jwt_extended import JWTManager, decode_token
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from brite import create_app, db
@@ -48,6 +48,29 @@ class TestAuthService(unittest.TestCase):
             json_data = response.get_json()
             self.assertIn("access_token", json_data)
 
+            # Check that the role is embedded in the token
+            claims = decode_token(json_data["access_token"])
+            self.assertEqual(claims["role"], role)
+
+    def test_login_user_rehashes_outdated_password(self):
+        with self.app.app_context():
+            # Create a user whose hash was made with older parameters
+            password_hash = generate_password_hash("testpassword", "pbkdf2:sha256:1000")
+            user = User(username="testuser", password_hash=password_hash, role="user")
+            db.session.add(user)
+            db.session.commit()
+
+            response = self.client.post(
+                "/api/v1/login",
+                json={"username": "testuser", "password": "testpassword"},
+            )
+            self.assertEqual(response.status_code, 200)
+
+            # Check that the hash was upgraded to the configured method
+            user = User.query.filter_by(username="testuser").first()
+            self.assertTrue(user.password_hash.startswith("scrypt:"))
+            self.assertTrue(check_password_hash(user.password_hash, "testpassword"))
+
     def test_login_user_bad_credentials(self):
         with self.app.app_context():
             # Create a test user
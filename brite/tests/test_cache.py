@@ -0,0 +1,150 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from brite.utils.cache import Cache, LRUCache, SharedCache, create_cache
+
+
+class TestLRUCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = LRUCache(maxsize=2, ttl=60)
+
+    def test_get_and_set(self):
+        self.assertIsNone(self.cache.get("a"))
+
+        self.cache.set("a", {"id": "a"})
+
+        self.assertEqual(self.cache.get("a"), {"id": "a"})
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+
+        # Reading "a" makes "b" the least recently used entry
+        self.cache.get("a")
+        self.cache.set("c", 3)
+
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_expires_entries(self):
+        with patch("brite.utils.cache.time.monotonic", return_value=100):
+            self.cache.set("a", 1)
+
+        with patch("brite.utils.cache.time.monotonic", return_value=161):
+            self.assertIsNone(self.cache.get("a"))
+
+        self.assertEqual(self.cache.stats()["expired"], 1)
+
+    def test_delete(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+
+        self.cache.delete("a", "b", "missing")
+
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+
+class TestCache(unittest.TestCase):
+    def test_configure_switches_backend(self):
+        cache = Cache()
+        cache.set("a", 1)
+
+        cache.configure(LRUCache(maxsize=10, ttl=5))
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["maxsize"], 10)
+
+    def test_guarded_set_skips_invalidated_keys(self):
+        cache = Cache()
+        guard = ("a", cache.generation("a"))
+
+        cache.delete("a")
+        cache.set("a", 1, guard)
+        cache.set("b", 2, guard)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+
+    def test_guarded_set_caches_current_keys(self):
+        cache = Cache()
+
+        cache.set("a", 1, ("a", cache.generation("a")))
+
+        self.assertEqual(cache.get("a"), 1)
+
+    def test_create_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite3")
+            self.assertIsInstance(create_cache("memory", 10, 5), LRUCache)
+            self.assertIsInstance(create_cache("shared", 10, 5, path), SharedCache)
+            with self.assertRaises(ValueError):
+                create_cache("redis", 10, 5)
+
+
+class TestSharedCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, "cache.sqlite3")
+
+        # Two caches on the same file stand in for two gunicorn workers
+        self.worker = SharedCache(path, maxsize=2, ttl=60)
+        self.other_worker = SharedCache(path, maxsize=2, ttl=60)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_fill_is_shared(self):
+        self.worker.set(["id", "tt1"], {"id": "tt1"})
+
+        self.assertEqual(self.other_worker.get(["id", "tt1"]), {"id": "tt1"})
+        self.assertEqual(self.other_worker.stats()["hits"], 1)
+
+    def test_delete_invalidates_every_worker(self):
+        self.worker.set(["id", "tt1"], {"id": "tt1"})
+        self.other_worker.get(["id", "tt1"])
+
+        self.worker.delete(["id", "tt1"])
+
+        self.assertIsNone(self.other_worker.get(["id", "tt1"]))
+
+    def test_delete_in_another_worker_blocks_guarded_set(self):
+        worker, other_worker = Cache(self.worker), Cache(self.other_worker)
+        key = ("id", "tt1")
+        guard = (key, other_worker.generation(key))
+
+        # The other worker loaded the movie before this worker deleted it
+        worker.delete(key)
+        other_worker.set(key, {"id": "tt1"}, guard)
+
+        self.assertIsNone(worker.get(key))
+        self.assertIsNone(other_worker.get(key))
+
+    def test_expires_entries(self):
+        with patch("brite.utils.cache.time.time", return_value=100):
+            self.worker.set("a", 1)
+
+        with patch("brite.utils.cache.time.time", return_value=161):
+            self.assertIsNone(self.other_worker.get("a"))
+
+        self.assertEqual(self.other_worker.stats()["expired"], 1)
+
+    def test_evicts_oldest_entries(self):
+        now = time.time()
+        for number, key in enumerate(["a", "b", "c"]):
+            with patch("brite.utils.cache.time.time", return_value=now + number):
+                self.worker.set(key, number)
+
+        self.assertIsNone(self.other_worker.get("a"))
+        self.assertEqual(self.other_worker.get("c"), 2)
+        self.assertEqual(self.worker.stats()["evictions"], 1)
+        self.assertEqual(self.worker.stats()["size"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
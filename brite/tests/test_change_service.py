@@ -0,0 +1,113 @@
+import io
+import unittest
+from unittest.mock import patch
+
+from brite import create_app, db
+from brite.services.change_service import catalog_version, fetch_changes, movie_version
+from brite.services.get_movies import save_batch
+from brite.services.import_service import import_movies
+from brite.services.movie_service import add_movie, add_movies, delete_movie
+
+
+class TestChangeService(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+        self.app.config["TESTING"] = True
+
+        with self.app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_writes_are_logged_in_order(self):
+        with self.app.app_context():
+            movie_id = add_movie("Alien")[0]["movie"]["id"]
+            add_movies(["Aliens", "Alien"])
+            save_batch(
+                [
+                    {
+                        "imdbID": "tt0000001",
+                        "Title": "Brazil",
+                        "Year": "1985",
+                        "Type": "movie",
+                        "Poster": "N/A",
+                    }
+                ]
+            )
+            list(import_movies(io.BytesIO(b'{"title": "Heat"}\n'), "ndjson"))
+            delete_movie(movie_id)
+
+            changes = fetch_changes(0, 10)
+
+        self.assertEqual(
+            [
+                (change["op"], change["movie"] and change["movie"]["title"])
+                for change in changes["changes"]
+            ],
+            [
+                ("upsert", "Alien"),
+                ("upsert", "Aliens"),
+                ("upsert", "Brazil"),
+                ("upsert", "Heat"),
+                ("delete", None),
+            ],
+        )
+        self.assertEqual(changes["changes"][-1]["id"], movie_id)
+        seqs = [change["seq"] for change in changes["changes"]]
+        self.assertEqual(seqs, sorted(seqs))
+        self.assertFalse(changes["has_more"])
+
+    def test_changes_are_paged(self):
+        with self.app.app_context():
+            add_movies([f"Movie {number}" for number in range(5)])
+
+            first = fetch_changes(0, 3)
+            second = fetch_changes(first["next_since"], 3)
+            empty = fetch_changes(second["next_since"], 3)
+
+        self.assertTrue(first["has_more"])
+        self.assertEqual(len(second["changes"]), 2)
+        self.assertFalse(second["has_more"])
+        self.assertEqual(empty["changes"], [])
+        self.assertEqual(empty["next_since"], second["next_since"])
+
+    @patch.dict("os.environ", {"CHANGES_LIMIT": "2"})
+    def test_changes_limit(self):
+        with self.app.app_context():
+            add_movies(["Alien", "Aliens", "Brazil"])
+
+            self.assertEqual(len(fetch_changes(0, 100)["changes"]), 2)
+            self.assertEqual(fetch_changes(-1, 10)[1], 400)
+
+    def test_sequence_numbers_are_not_reused(self):
+        with self.app.app_context():
+            add_movie("Alien")
+            last = fetch_changes(0, 10)["next_since"]
+            db.session.execute(db.text("DELETE FROM movie_change"))
+            db.session.commit()
+
+            add_movie("Aliens")
+            changes = fetch_changes(0, 10)["changes"]
+
+        self.assertGreater(changes[0]["seq"], last)
+
+    def test_versions(self):
+        with self.app.app_context():
+            self.assertEqual(catalog_version(), (0, None))
+
+            movie_id = add_movie("Alien")[0]["movie"]["id"]
+            add_movie("Aliens")
+            catalog, _ = catalog_version()
+            by_id, _ = movie_version(movie_id=movie_id)
+            by_title, _ = movie_version(movie_title="Alien")
+
+        self.assertEqual(catalog, by_id + 1)
+        self.assertEqual(by_title, by_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import csv
+import gzip
+import io
+import json
+import unittest
+from unittest.mock import patch
+
+from brite import create_app, db
+from brite.models.movie import Movie
+from brite.services.export_service import export_movies
+from brite.services.import_service import import_movies
+
+
+class TestExportService(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+        self.app.config["TESTING"] = True
+
+        with self.app.app_context():
+            db.create_all()
+            for number in range(5):
+                db.session.add(
+                    Movie(id=f"tt000000{number}", title=f"Movie {number}", year=2000)
+                )
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_export_ndjson(self):
+        with self.app.app_context():
+            data = b"".join(export_movies("ndjson", batch_size=2))
+
+        movies = [json.loads(line) for line in data.splitlines()]
+        self.assertEqual(
+            [movie["id"] for movie in movies][:2], ["tt0000000", "tt0000001"]
+        )
+        self.assertEqual(len(movies), 5)
+        self.assertEqual(movies[0]["year"], 2000)
+
+    def test_export_csv_gzip(self):
+        with self.app.app_context():
+            data = b"".join(export_movies("csv", compress=True))
+
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(data).decode())))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(
+            rows[4],
+            {
+                "id": "tt0000004",
+                "title": "Movie 4",
+                "year": "2000",
+                "type": "",
+                "poster": "",
+            },
+        )
+
+    @patch("brite.services.export_service.CHUNK_SIZE", 1)
+    def test_export_streams_chunks(self):
+        with self.app.app_context():
+            chunks = export_movies("ndjson")
+            first = next(chunks)
+            remaining = list(chunks)
+
+        self.assertEqual(json.loads(first)["title"], "Movie 0")
+        self.assertEqual(len(remaining), 4)
+
+    def test_export_reimports(self):
+        with self.app.app_context():
+            data = b"".join(export_movies("csv"))
+            db.session.execute(db.delete(Movie))
+            db.session.commit()
+
+            progress = list(import_movies(io.BytesIO(data), "csv"))[-1]
+
+        self.assertEqual(progress["inserted"], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
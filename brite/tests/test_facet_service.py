@@ -0,0 +1,98 @@
+import unittest
+
+from brite import create_app, db
+from brite.models.movie import Movie
+from brite.services.facet_service import fetch_facets, rebuild_facets
+from brite.services.get_movies import save_batch
+from brite.services.movie_service import add_movie, delete_movie
+
+
+def omdb_item(imdb_id, title, year, movie_type):
+    return {
+        "imdbID": imdb_id,
+        "Title": title,
+        "Year": year,
+        "Type": movie_type,
+        "Poster": "N/A",
+    }
+
+
+class TestFacetService(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+        self.app.config["TESTING"] = True
+
+        with self.app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_writes_update_the_counts(self):
+        with self.app.app_context():
+            save_batch(
+                [
+                    omdb_item("tt0000001", "Alien", "1979", "movie"),
+                    omdb_item("tt0000002", "Aliens", "1986", "movie"),
+                    omdb_item("tt0000003", "Alf", "1986", "series"),
+                ]
+            )
+            # A refreshed page moves Alf to another year
+            save_batch([omdb_item("tt0000003", "Alf", "1987", "series")])
+            movie_id = add_movie("Brazil")[0]["movie"]["id"]
+            delete_movie("tt0000001")
+
+            facets = fetch_facets()["facets"]
+            delete_movie(movie_id)
+            after_delete = fetch_facets()["facets"]
+
+        self.assertEqual(
+            facets["year"],
+            [
+                {"value": None, "count": 1},
+                {"value": "1986", "count": 1},
+                {"value": "1987", "count": 1},
+            ],
+        )
+        self.assertEqual(
+            facets["type"],
+            [
+                {"value": None, "count": 1},
+                {"value": "movie", "count": 1},
+                {"value": "series", "count": 1},
+            ],
+        )
+        self.assertNotIn(None, [bucket["value"] for bucket in after_delete["year"]])
+
+    def test_rebuild_matches_incremental_counts(self):
+        with self.app.app_context():
+            save_batch(
+                [
+                    omdb_item("tt0000001", "Alien", "1979", "movie"),
+                    omdb_item("tt0000002", "Aliens", "1986", "movie"),
+                ]
+            )
+            add_movie("Brazil")
+            incremental = fetch_facets()
+
+            rebuild_facets()
+            self.assertEqual(fetch_facets(), incremental)
+
+    def test_rebuild_counts_existing_movies(self):
+        with self.app.app_context():
+            db.session.add(Movie(id="tt0000001", title="Alien", year=1979, type="movie"))
+            db.session.commit()
+            self.assertEqual(fetch_facets(), {"facets": {"year": [], "type": []}})
+
+            rebuild_facets()
+            facets = fetch_facets()["facets"]
+
+        self.assertEqual(facets["year"], [{"value": "1979", "count": 1}])
+        self.assertEqual(facets["type"], [{"value": "movie", "count": 1}])
+
+
+if __name__ == "__main__":
+    unittest.main()
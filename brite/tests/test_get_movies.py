@@ -1,4 +1,6 @@
 import os
+import threading
+import time
 import unittest
 from unittest.mock import MagicMock, patch
 
@@ -7,7 +9,19 @@ from sqlalchemy.exc import OperationalError
 
 from brite import create_app, db
 from brite.models.movie import Movie
-from brite.services.get_movies import create_movie, fetch_movies, get_movies
+from brite.models.sync_checkpoint import SyncCheckpoint
+from brite.services.change_service import fetch_changes
+from brite.services.get_movies import (
+    OMDbError,
+    batched,
+    create_movie,
+    fetch_movies,
+    fetch_pages,
+    get_movies,
+    ingest_movies,
+    load_checkpoints,
+    save_batch,
+)
 
 
 class TestGetMovies(unittest.TestCase):
@@ -26,13 +40,9 @@ class TestGetMovies(unittest.TestCase):
             db.session.remove()
             db.drop_all()
 
-    @patch("requests.get")
-    @patch("brite.models.movie.Movie.query")
-    @patch("brite.db.session")
-    def test_get_movies(self, mock_db, mock_query, mock_get):
-        # Mock the first() method to return None
-        mock_query.first.return_value = None
-
+    @patch.dict(os.environ, {"OMDB_SEARCH_TERMS": "test", "OMDB_PAGES": "1-3"})
+    @patch("requests.Session.get")
+    def test_get_movies(self, mock_get):
         # Mock the API response
         mock_get.return_value.json.return_value = {
             "Search": [
@@ -46,16 +56,16 @@ class TestGetMovies(unittest.TestCase):
             ]
         }
 
-        # Call the function
-        get_movies()
+        with self.app.app_context():
+            # Call the function
+            get_movies()
 
-        # Assert that bulk_save_objects was called with a list of Movie objects
-        self.assertEqual(mock_db.bulk_save_objects.call_count, 1)
-        args, _ = mock_db.bulk_save_objects.call_args
-        self.assertIsInstance(args[0], list)
-        self.assertIsInstance(args[0][0], Movie)
+            # Assert that the movie was stored and every page checkpointed
+            movie = db.session.get(Movie, "tt1234567")
+            self.assertEqual(movie.title, "Test Movie")
+            self.assertEqual(SyncCheckpoint.query.filter_by(term="test").count(), 3)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_fetch_movies(self, mock_get):
         mock_response = MagicMock()
         mock_response.json.return_value = {"Search": []}
@@ -64,7 +74,7 @@ class TestGetMovies(unittest.TestCase):
         result = fetch_movies(1, "api_key")
         self.assertEqual(result, {"Search": []})
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_fetch_movies_empty_api_key(self, mock_get):
         mock_response = MagicMock()
         mock_response.json.return_value = {"Search": []}
@@ -73,6 +83,148 @@ class TestGetMovies(unittest.TestCase):
         result = fetch_movies(1, "")
         self.assertEqual(result, {"Search": []})
 
+    @patch("requests.Session.get")
+    def test_fetch_movies_raises_http_errors(self, mock_get):
+        mock_get.return_value.raise_for_status.side_effect = requests.HTTPError("401")
+
+        with self.assertRaises(requests.HTTPError):
+            fetch_movies(1, "api_key")
+
+    @patch("requests.Session.get")
+    def test_fetch_movies_raises_omdb_errors(self, mock_get):
+        mock_get.return_value.json.return_value = {
+            "Response": "False",
+            "Error": "Request limit reached!",
+        }
+
+        with self.assertRaises(OMDbError):
+            fetch_movies(1, "api_key")
+
+    @patch("requests.Session.get")
+    def test_fetch_movies_past_the_last_page(self, mock_get):
+        mock_get.return_value.json.return_value = {
+            "Response": "False",
+            "Error": "Movie not found!",
+        }
+
+        self.assertEqual(fetch_movies(99, "api_key"), {"Search": []})
+
+    @patch.dict(os.environ, {"OMDB_SEARCH_TERMS": "test", "OMDB_PAGES": "1-3"})
+    @patch("requests.Session.get")
+    def test_failed_pages_are_not_checkpointed(self, mock_get):
+        mock_get.return_value.json.return_value = {
+            "Response": "False",
+            "Error": "Invalid API key!",
+        }
+
+        with self.app.app_context():
+            with self.assertRaises(OMDbError):
+                ingest_movies("api_key")
+
+            self.assertEqual(SyncCheckpoint.query.count(), 0)
+
+    @patch("requests.Session.get")
+    def test_fetch_movies_sets_timeout(self, mock_get):
+        mock_get.return_value.json.return_value = {"Search": []}
+
+        fetch_movies(1, "api_key")
+
+        _, kwargs = mock_get.call_args
+        self.assertIsNotNone(kwargs["timeout"])
+        self.assertEqual(kwargs["params"]["page"], 1)
+
+    @patch("brite.services.get_movies.fetch_movies")
+    def test_fetch_pages_keeps_page_order(self, mock_fetch):
+        # Later pages finish first, results must still come back in page order
+        def slow_fetch(page, api_key, term):
+            time.sleep(0.01 * (5 - page))
+            return {"page": page}
+
+        mock_fetch.side_effect = slow_fetch
+
+        jobs = [("movie", page) for page in range(1, 6)]
+        result = list(fetch_pages(jobs, "api_key", max_workers=5))
+
+        self.assertEqual([job for job, _ in result], jobs)
+        self.assertEqual([data["page"] for _, data in result], [1, 2, 3, 4, 5])
+
+    @patch("brite.services.get_movies.fetch_movies")
+    def test_fetch_pages_bounds_in_flight(self, mock_fetch):
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def tracking_fetch(page, api_key, term):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.01)
+            with lock:
+                state["active"] -= 1
+            return {"page": page}
+
+        mock_fetch.side_effect = tracking_fetch
+
+        jobs = [("movie", page) for page in range(1, 11)]
+        result = list(fetch_pages(jobs, "api_key", max_workers=3))
+
+        self.assertEqual(len(result), 10)
+        self.assertLessEqual(state["peak"], 3)
+
+    def test_batched(self):
+        result = list(batched(range(7), 3))
+        self.assertEqual(result, [[0, 1, 2], [3, 4, 5], [6]])
+
+    def test_save_batch_skips_duplicates(self):
+        with self.app.app_context():
+            db.session.add(create_movie(self.make_item("tt0000001", "Stored Movie")))
+            db.session.commit()
+            count = Movie.query.count()
+
+            items = [
+                self.make_item("tt0000001", "Stored Movie"),
+                self.make_item("tt0000002", "New Movie"),
+                self.make_item("tt0000002", "New Movie"),
+                self.make_item("tt0000003", "Stored Movie"),
+            ]
+            inserted = save_batch(items)
+
+            self.assertEqual(inserted, 1)
+            self.assertEqual(Movie.query.count(), count + 1)
+
+    @patch("brite.services.get_movies.fetch_movies")
+    def test_ingest_movies_flushes_batches(self, mock_fetch):
+        # Each term returns the same two movies per page, so only the first
+        # term inserts. Every term flushes two batches: pages 1-2, then page 3
+        mock_fetch.side_effect = lambda page, api_key, term: {
+            "Search": [
+                self.make_item(f"tt000{page}1", f"Movie {page}A"),
+                self.make_item(f"tt000{page}2", f"Movie {page}B"),
+            ]
+        }
+
+        with self.app.app_context():
+            count = Movie.query.count()
+            with patch.object(
+                db.session, "commit", wraps=db.session.commit
+            ) as mock_commit:
+                inserted = ingest_movies(
+                    "api_key", terms=["a", "b"], pages=range(1, 4), batch_size=4
+                )
+
+            self.assertEqual(inserted, 6)
+            self.assertEqual(Movie.query.count(), count + 6)
+            self.assertEqual(mock_commit.call_count, 4)
+            self.assertEqual(mock_fetch.call_count, 6)
+
+    def make_item(self, imdb_id, title):
+        return {
+            "Title": title,
+            "Year": "2023",
+            "imdbID": imdb_id,
+            "Type": "movie",
+            "Poster": "N/A",
+        }
+
     def test_create_movie(self):
         item = {
             "Title": "Test Movie",
@@ -83,33 +235,113 @@ class TestGetMovies(unittest.TestCase):
         }
         movie = create_movie(item)
         self.assertEqual(movie.title, "Test Movie")
-        self.assertEqual(movie.year, "2023")
+        self.assertEqual(movie.year, 2023)
         self.assertEqual(movie.id, "tt1234567")
         self.assertEqual(movie.type, "movie")
         self.assertEqual(movie.poster, "https://example.com/poster.jpg")
 
-    @patch("brite.models.movie.Movie.query")
-    @patch("brite.db.session")
-    @patch("requests.get")
-    def test_get_movies_no_table(self, mock_get, mock_db, mock_query):
-        # Mock the first() method to raise an OperationalError
-        mock_query.first.side_effect = OperationalError(
-            None, None, "The table does not exist. Please check your database setup."
-        )
+    def test_change_log_records_stored_years(self):
+        items = [
+            {**self.make_item("tt0000001", "Movie"), "Year": "1999"},
+            {**self.make_item("tt0000002", "Series"), "Year": "2005–2010"},
+            {**self.make_item("tt0000003", "Unknown"), "Year": "N/A"},
+        ]
 
+        with self.app.app_context():
+            save_batch(items)
+            changes = fetch_changes(0, 10)["changes"]
+            stored = [movie.year for movie in Movie.query.order_by(Movie.id)]
+
+        self.assertEqual([change["movie"]["year"] for change in changes], stored)
+        self.assertEqual(stored, [1999, 2005, None])
+
+    @patch("requests.Session.get")
+    def test_get_movies_no_table(self, mock_get):
         # Mock the get() method to return a successful response
         mock_get.return_value.status_code = 200
         mock_get.return_value.json.return_value = {"Search": []}
 
-        # Call the function and capture the output
-        with patch("builtins.print") as mock_print:
-            get_movies()
+        with self.app.app_context():
+            # Drop the tables so the checkpoint lookup raises an OperationalError
+            db.drop_all()
+
+            # Call the function and capture the output
+            with patch("builtins.print") as mock_print:
+                get_movies()
 
         # Assert that a message was printed about the missing table
         mock_print.assert_called_once_with(
             "The table does not exist. Please check your database setup."
         )
 
+    @patch("brite.services.get_movies.fetch_movies")
+    def test_ingest_movies_resumes_after_failure(self, mock_fetch):
+        def failing_fetch(page, api_key, term):
+            if page == 3:
+                raise requests.ConnectionError("OMDb is down")
+            return {"Search": [self.make_item(f"tt000{page}", f"Movie {page}")]}
+
+        mock_fetch.side_effect = failing_fetch
+
+        with self.app.app_context():
+            with self.assertRaises(requests.ConnectionError):
+                ingest_movies(
+                    "api_key",
+                    terms=["resume"],
+                    pages=range(1, 5),
+                    batch_size=1,
+                )
+
+            # Pages before the failure are stored and checkpointed
+            self.assertEqual(load_checkpoints("resume").keys(), {1, 2})
+
+            mock_fetch.reset_mock()
+            mock_fetch.side_effect = lambda page, api_key, term: {
+                "Search": [self.make_item(f"tt000{page}", f"Movie {page}")]
+            }
+            written = ingest_movies(
+                "api_key", terms=["resume"], pages=range(1, 5), batch_size=1
+            )
+
+            # Only the missing pages are fetched again
+            self.assertEqual(written, 2)
+            fetched = sorted(call.args[0] for call in mock_fetch.call_args_list)
+            self.assertEqual(fetched, [3, 4])
+            self.assertEqual(load_checkpoints("resume").keys(), {1, 2, 3, 4})
+
+    @patch("brite.services.get_movies.fetch_movies")
+    def test_ingest_movies_refresh_upserts_changed_pages(self, mock_fetch):
+        pages = {
+            1: [self.make_item("tt0000001", "Movie 1")],
+            2: [self.make_item("tt0000002", "Movie 2")],
+        }
+        mock_fetch.side_effect = lambda page, api_key, term: {"Search": pages[page]}
+
+        with self.app.app_context():
+            ingest_movies("api_key", terms=["refresh"], pages=range(1, 3))
+
+            # A plain re-run has nothing left to fetch
+            mock_fetch.reset_mock()
+            written = ingest_movies("api_key", terms=["refresh"], pages=range(1, 3))
+            self.assertEqual(written, 0)
+            mock_fetch.assert_not_called()
+
+            # A refresh re-checks every page but only writes the changed one
+            pages[2] = [self.make_item("tt0000002", "Movie 2 (Remastered)")]
+            with patch(
+                "brite.services.get_movies.save_batch", wraps=save_batch
+            ) as mock_save:
+                written = ingest_movies(
+                    "api_key", terms=["refresh"], pages=range(1, 3), refresh=True
+                )
+
+            self.assertEqual(written, 1)
+            self.assertEqual(mock_fetch.call_count, 2)
+            _, checkpoints = mock_save.call_args.args
+            self.assertEqual([page for _, page, _, _ in checkpoints], [2])
+            movie = db.session.get(Movie, "tt0000002")
+            self.assertEqual(movie.title, "Movie 2 (Remastered)")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,177 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy.exc import OperationalError
+
+from brite import create_app, db
+from brite.models.movie import Movie
+from brite.services.facet_service import fetch_facets
+from brite.services.import_service import import_movies
+from brite.services.movie_service import upsert_movies
+
+CSV = b"""id,title,year,type,poster
+tt0000001,Alien,1979,movie,
+tt0000002,Aliens,1986,movie,
+,Brazil,1985,movie,
+tt0000003,,1990,movie,
+tt0000004,Alien,1980,movie,
+"""
+
+
+def ndjson(*rows):
+    return io.BytesIO("\n".join(json.dumps(row) for row in rows).encode())
+
+
+class TestImportService(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+        self.app.config["TESTING"] = True
+
+        with self.app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_import_csv_in_batches(self):
+        with self.app.app_context():
+            progress = list(import_movies(io.BytesIO(CSV), "csv", batch_size=2))
+
+            titles = db.session.scalars(db.select(Movie.title).order_by(Movie.title))
+            self.assertEqual(list(titles), ["Alien", "Aliens", "Brazil"])
+            self.assertEqual(fetch_facets()["facets"]["type"][0]["count"], 3)
+
+        # One report per batch of two rows, the last one with the totals
+        self.assertEqual([batch["rows"] for batch in progress], [2, 4, 5])
+        self.assertEqual(progress[1]["invalid_lines"], [5])
+        self.assertEqual(
+            progress[-1],
+            {
+                "rows": 5,
+                "inserted": 3,
+                "updated": 0,
+                "skipped": 1,
+                "invalid": 1,
+                "invalid_lines": [],
+            },
+        )
+
+    def test_import_ndjson_conflicts(self):
+        with self.app.app_context():
+            db.session.add(Movie(id="tt0000001", title="Alien", year=1979))
+            db.session.commit()
+            rows = (
+                {"id": "tt0000001", "title": "Alien", "year": 1980},
+                {"id": "tt0000002", "title": "Aliens"},
+                {"id": "tt0000002", "title": "Aliens again"},
+            )
+
+            skipped = list(import_movies(ndjson(*rows), "ndjson"))[-1]
+            updated = list(import_movies(ndjson(*rows), "ndjson", overwrite=True))[-1]
+
+            self.assertEqual(db.session.get(Movie, "tt0000001").year, 1980)
+
+        self.assertEqual((skipped["inserted"], skipped["skipped"]), (1, 2))
+        self.assertEqual((updated["updated"], updated["skipped"]), (1, 2))
+
+    def test_import_ndjson_invalid_lines(self):
+        stream = io.BytesIO(b'{"title": "Alien"}\n\nnot json\n[1, 2]\n')
+        with self.app.app_context():
+            progress = list(import_movies(stream, "ndjson"))
+
+        self.assertEqual(progress[-1]["inserted"], 1)
+        self.assertEqual(progress[-1]["invalid_lines"], [3, 4])
+
+    def test_import_reports_lines_that_are_not_utf8(self):
+        stream = io.BytesIO(b'{"title":"A"}\n\xff\n{"title":"B\xff"}\n')
+        with self.app.app_context():
+            progress = list(import_movies(stream, "ndjson"))
+            titles = [movie.title for movie in Movie.query.all()]
+
+        self.assertEqual(progress[-1]["invalid_lines"], [2, 3])
+        self.assertEqual(titles, ["A"])
+
+    def test_import_csv_reports_rows_that_cannot_be_read(self):
+        stream = io.BytesIO(
+            b"\xef\xbb\xbftitle,year\nAlien,1979\nBra\xffzil,1985\n"
+            b'"%s",1995\n"Long\nQ\xff",1990\nAliens,1986\n' % (b"x" * 200000)
+        )
+        with self.app.app_context():
+            progress = list(import_movies(stream, "csv"))
+            titles = sorted(movie.title for movie in Movie.query.all())
+
+        self.assertEqual(progress[-1]["invalid_lines"], [3, 4, 6])
+        self.assertEqual(titles, ["Alien", "Aliens"])
+
+    def test_import_rejects_fields_that_do_not_fit(self):
+        rows = (
+            {"title": "Alien", "year": {"a": 1}},
+            {"title": "Aliens", "year": "1986a"},
+            {"title": "Brazil", "poster": "x" * 251},
+            {"title": "Heat", "type": ["movie"]},
+            {"title": "Ran", "year": True},
+            {"title": "Up", "year": "2009", "type": "movie"},
+        )
+        with self.app.app_context():
+            progress = list(import_movies(ndjson(*rows), "ndjson"))
+
+            movies = db.session.scalars(db.select(Movie)).all()
+            self.assertEqual(
+                [(movie.title, movie.year) for movie in movies], [("Up", 2009)]
+            )
+
+        self.assertEqual(progress[-1]["inserted"], 1)
+        self.assertEqual(progress[-1]["invalid_lines"], [1, 2, 3, 4, 5])
+
+    def test_import_rolls_back_a_failed_batch(self):
+        rows = ({"title": "Alien"}, {"title": "Aliens"}, {"title": "Brazil"})
+        error = OperationalError("INSERT", {}, Exception("disk I/O error"))
+        calls = []
+
+        def failing_first_batch(movies, overwrite=False):
+            calls.append(movies)
+            if len(calls) == 1:
+                # Part of the batch is written before the database fails
+                db.session.add(Movie(id="tt9", title="Partial"))
+                db.session.flush()
+                raise error
+            return upsert_movies(movies, overwrite=overwrite)
+
+        with self.app.app_context():
+            with patch(
+                "brite.services.import_service.upsert_movies",
+                side_effect=failing_first_batch,
+            ), patch("builtins.print"):
+                progress = list(import_movies(ndjson(*rows), "ndjson", batch_size=2))
+
+            titles = db.session.scalars(db.select(Movie.title))
+            self.assertEqual(list(titles), ["Brazil"])
+
+        self.assertEqual(progress[0]["invalid_lines"], [1, 2])
+        self.assertEqual(progress[-1]["inserted"], 1)
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as upload:
+            upload.write(CSV)
+        self.addCleanup(os.remove, upload.name)
+
+        runner = self.app.test_cli_runner()
+        result = runner.invoke(args=["import-movies", upload.name, "--batch-size", "10"])
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn(
+            "5 rows: 3 inserted, 0 updated, 1 skipped, 1 invalid", result.output
+        )
+        with self.app.app_context():
+            self.assertEqual(Movie.query.count(), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from brite import create_app, db
+from brite.models.movie import Movie
+from brite.utils.json_output import dumps
+
+
+class TestJsonOutput(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+        self.app.config["TESTING"] = True
+
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(Movie(id="tt0000001", title="Amélie", year=2001))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_dumps(self):
+        data = {"movies": [{"title": "Amélie", "year": 2001, "poster": None}]}
+
+        self.assertEqual(json.loads(dumps(data)), data)
+        with patch("brite.utils.json_output.orjson", None):
+            self.assertEqual(json.loads(dumps(data)), data)
+
+    def test_movie_responses(self):
+        response = self.client.get("/api/v1/movies/id/tt0000001")
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertEqual(response.json["movie"]["title"], "Amélie")
+
+        with patch("brite.utils.json_output.orjson", None):
+            fallback = self.client.get("/api/v1/movies/id/tt0000001")
+        self.assertEqual(fallback.json, response.json)
+
+        response = self.client.get("/api/v1/movies/id/tt0000002")
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("message", response.json)
+
+
+if __name__ == "__main__":
+    unittest.main()
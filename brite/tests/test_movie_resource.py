@@ -1,9 +1,15 @@
+import gzip
+import io
+import json
 import unittest
 from unittest.mock import MagicMock, patch
 
+from flask_jwt_extended import create_access_token
 from flask_restful import reqparse
 
 from brite import create_app, db
+from brite.models.movie import Movie
+from brite.utils.set_users import set_users
 
 
 class TestMovieResource(unittest.TestCase):
@@ -16,6 +22,12 @@ class TestMovieResource(unittest.TestCase):
 
         with self.app.app_context():
             db.create_all()
+            set_users()
+
+            # Movies the OMDb sync would have loaded
+            db.session.add(Movie(id="tt0060153", title="Batman: The Movie"))
+            db.session.add(Movie(id="tt0113198", title="Heavyweights"))
+            db.session.commit()
 
     def tearDown(self):
         with self.app.app_context():
@@ -34,6 +46,79 @@ class TestMovieResource(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIsInstance(response.json["movies"], list)
 
+    def test_get_all_movies_with_cursor(self):
+        # Fetch the first page in cursor mode, then follow the next cursor
+        response = self.client.get("/api/v1/movies?limit=1&cursor=")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["movies"][0]["title"], "Batman: The Movie")
+
+        cursor = response.json["next_cursor"]
+        response = self.client.get(f"/api/v1/movies?limit=1&cursor={cursor}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["movies"][0]["title"], "Heavyweights")
+        self.assertIsNone(response.json["next_cursor"])
+
+    def test_get_all_movies_with_invalid_cursor(self):
+        response = self.client.get("/api/v1/movies?cursor=garbage")
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_all_movies_filtered_and_sorted(self):
+        with self.app.app_context():
+            db.session.add(Movie(id="tt0372784", title="Batman Begins", year=2005))
+            db.session.commit()
+
+        response = self.client.get("/api/v1/movies?prefix=Batman&sort=-title")
+        self.assertEqual(response.status_code, 200)
+        titles = [movie["title"] for movie in response.json["movies"]]
+        self.assertEqual(titles, ["Batman: The Movie", "Batman Begins"])
+
+        response = self.client.get("/api/v1/movies?year_from=2000&year_to=2010")
+        titles = [movie["title"] for movie in response.json["movies"]]
+        self.assertEqual(titles, ["Batman Begins"])
+
+    def test_get_all_movies_with_invalid_sort(self):
+        response = self.client.get("/api/v1/movies?sort=poster")
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_movie_facets(self):
+        self.client.post("/api/v1/movies", json={"title": "The Shawshank Redemption"})
+
+        response = self.client.get("/api/v1/movies/facets")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["facets"]["type"], [{"value": None, "count": 1}])
+
+    def test_get_movies_by_ids(self):
+        response = self.client.get("/api/v1/movies/batch?ids=tt0113198,tt0000000")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["movies"][0]["title"], "Heavyweights")
+        self.assertIsNone(response.json["movies"][1])
+        self.assertEqual(response.json["missing"], ["tt0000000"])
+
+    def test_get_movies_by_ids_without_ids(self):
+        response = self.client.get("/api/v1/movies/batch?ids=")
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_all_movies_with_out_of_bounds_args(self):
+        # A huge limit cannot return the whole table
+        response = self.client.get("/api/v1/movies?limit=1000000")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("limit", response.json["message"])
+
+        response = self.client.get("/api/v1/movies?page=0")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("page", response.json["message"])
+
+        response = self.client.get("/api/v1/movies/search?q=bat&limit=101")
+        self.assertEqual(response.status_code, 400)
+
+    def test_add_movie_with_invalid_title(self):
+        response = self.client.post("/api/v1/movies", json={"title": "x" * 101})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("title", response.json["message"])
+
+        response = self.client.post("/api/v1/movies", json={})
+        self.assertEqual(response.status_code, 400)
+
     def test_get_movie_by_title(self):
         # Try to fetch a movie by title that exist
         response = self.client.get("api/v1/movies/title/Batman: The Movie")
@@ -60,6 +145,15 @@ class TestMovieResource(unittest.TestCase):
         # Check that the status code is 404 (Not Found)
         self.assertEqual(response.status_code, 404)
 
+    def test_cache_metrics(self):
+        self.client.get("/api/v1/movies/id/tt0113198")
+        self.client.get("/api/v1/movies/id/tt0113198")
+
+        response = self.client.get("/api/v1/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["movie_cache"]["hits"], 1)
+        self.assertEqual(response.json["movie_cache"]["misses"], 1)
+
     def test_add_movie_to_db(self):
         response = self.client.post(
             "/api/v1/movies", json={"title": "The Shawshank Redemption"}
@@ -112,6 +206,29 @@ class TestMovieResource(unittest.TestCase):
         response = self.client.delete(f"/api/v1/movies/{movie_id}", headers=headers)
         self.assertEqual(response.status_code, 200)
 
+    def test_delete_movie_by_id_does_not_query_user(self):
+        # Login as an admin user and get the access token
+        response = self.client.post(
+            "/api/v1/login", json={"username": "admin", "password": "admin"}
+        )
+        headers = {"Authorization": f"Bearer {response.json['access_token']}"}
+
+        # The admin check reads the role from the token, not the database
+        with patch("brite.utils.decorators.User") as mock_user:
+            response = self.client.delete("/api/v1/movies/tt0113198", headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        mock_user.query.filter_by.assert_not_called()
+
+    def test_delete_movie_by_id_with_token_without_role(self):
+        # Tokens issued before roles were embedded still get checked
+        with self.app.app_context():
+            access_token = create_access_token(identity="user")
+
+        headers = {"Authorization": f"Bearer {access_token}"}
+        response = self.client.delete("/api/v1/movies/tt0113198", headers=headers)
+        self.assertEqual(response.status_code, 403)
+
     def test_delete_movie_by_id_without_authorization(self):
         # Login as a non-admin user
         response = self.client.post(
@@ -149,6 +266,189 @@ class TestMovieResource(unittest.TestCase):
         # Check that the status code is 404 (Not Found)
         self.assertEqual(response.status_code, 404)
 
+    def test_bulk_add_movies(self):
+        response = self.client.post(
+            "/api/v1/movies/bulk",
+            json={"titles": ["Alien", "Heavyweights", "Alien", "", "Brazil"]},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["created"], 2)
+
+        statuses = [result["status"] for result in response.json["results"]]
+        self.assertEqual(statuses, [201, 400, 400, 400, 201])
+
+        movie_id = response.json["results"][4]["movie"]["id"]
+        response = self.client.get(f"/api/v1/movies/id/{movie_id}")
+        self.assertEqual(response.json["movie"]["title"], "Brazil")
+
+    def test_bulk_add_movies_over_limit(self):
+        with patch.dict("os.environ", {"MOVIE_BULK_LIMIT": "1"}):
+            response = self.client.post(
+                "/api/v1/movies/bulk", json={"titles": ["Alien", "Brazil"]}
+            )
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_delete_movies_with_authorization(self):
+        response = self.client.post(
+            "/api/v1/login", json={"username": "admin", "password": "admin"}
+        )
+        headers = {"Authorization": f"Bearer {response.json['access_token']}"}
+
+        response = self.client.delete(
+            "/api/v1/movies/bulk",
+            json={"ids": ["tt0113198", "tt0000000", "tt0060153"]},
+            headers=headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["deleted"], 2)
+        statuses = [result["status"] for result in response.json["results"]]
+        self.assertEqual(statuses, [200, 404, 200])
+
+        response = self.client.get("/api/v1/movies/id/tt0113198")
+        self.assertEqual(response.status_code, 404)
+
+    def test_bulk_delete_movies_without_authorization(self):
+        response = self.client.post(
+            "/api/v1/login", json={"username": "user", "password": "user"}
+        )
+        headers = {"Authorization": f"Bearer {response.json['access_token']}"}
+
+        response = self.client.delete(
+            "/api/v1/movies/bulk", json={"ids": ["tt0113198"]}, headers=headers
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_import_movies(self):
+        response = self.client.post(
+            "/api/v1/login", json={"username": "admin", "password": "admin"}
+        )
+        headers = {"Authorization": f"Bearer {response.json['access_token']}"}
+
+        upload = io.BytesIO(b"title,year\nAlien,1979\nHeavyweights,1995\n")
+        response = self.client.post(
+            "/api/v1/movies/import",
+            data={"file": (upload, "movies.csv")},
+            headers=headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        progress = [json.loads(line) for line in response.data.splitlines()]
+        self.assertEqual(progress[-1]["inserted"], 1)
+        self.assertEqual(progress[-1]["skipped"], 1)
+
+        response = self.client.post(
+            "/api/v1/movies/import?format=ndjson",
+            data=b'{"title": "Brazil"}\n',
+            headers=headers,
+        )
+        progress = [json.loads(line) for line in response.data.splitlines()]
+        self.assertEqual(progress[-1]["inserted"], 1)
+
+        # Bytes that are not UTF-8 are reported instead of ending the stream
+        response = self.client.post(
+            "/api/v1/movies/import?format=ndjson",
+            data=b'{"title":"A"}\n\xff\n',
+            headers=headers,
+        )
+        progress = [json.loads(line) for line in response.data.splitlines()]
+        self.assertEqual(progress[-1]["inserted"], 1)
+        self.assertEqual(progress[-1]["invalid_lines"], [2])
+
+    def test_import_movies_without_authorization(self):
+        response = self.client.post(
+            "/api/v1/login", json={"username": "user", "password": "user"}
+        )
+        headers = {"Authorization": f"Bearer {response.json['access_token']}"}
+
+        response = self.client.post(
+            "/api/v1/movies/import", data=b'{"title": "Brazil"}\n', headers=headers
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_export_movies(self):
+        response = self.client.get("/api/v1/movies/export")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        titles = [json.loads(line)["title"] for line in response.data.splitlines()]
+        self.assertEqual(sorted(titles), ["Batman: The Movie", "Heavyweights"])
+
+    def test_export_movies_csv_gzip(self):
+        response = self.client.get("/api/v1/movies/export?format=csv&gzip=true")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        lines = gzip.decompress(response.data).decode().splitlines()
+        self.assertEqual(lines[0], "id,title,year,type,poster")
+        self.assertEqual(len(lines), 3)
+
+    def test_get_movie_changes(self):
+        response = self.client.post("/api/v1/movies", json={"title": "Alien"})
+        movie = response.json["movie"]
+
+        response = self.client.get("/api/v1/movies/changes?since=0")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["changes"][0]["movie"], movie)
+
+        since = response.json["next_since"]
+        response = self.client.get(f"/api/v1/movies/changes?since={since}")
+        self.assertEqual(response.json["changes"], [])
+
+    def test_get_movie_by_id_not_modified(self):
+        response = self.client.post("/api/v1/movies", json={"title": "Alien"})
+        movie_id = response.json["movie"]["id"]
+
+        response = self.client.get(f"/api/v1/movies/id/{movie_id}")
+        etag = response.headers["ETag"]
+        last_modified = response.headers["Last-Modified"]
+
+        # The movie is not serialized again for a current copy
+        with patch("brite.resources.movie.fetch_movie_by_id") as mock_fetch:
+            response = self.client.get(
+                f"/api/v1/movies/id/{movie_id}", headers={"If-None-Match": etag}
+            )
+            mock_fetch.assert_not_called()
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+
+        response = self.client.get(
+            f"/api/v1/movies/id/{movie_id}",
+            headers={"If-Modified-Since": last_modified},
+        )
+        self.assertEqual(response.status_code, 304)
+
+        # Writes to other movies keep the ETag of this one
+        self.client.post("/api/v1/movies", json={"title": "Aliens"})
+        response = self.client.get(
+            "/api/v1/movies/title/Alien", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_get_missing_movie_ignores_validators(self):
+        # A movie without change-log entries has version 0, which must not match
+        response = self.client.get(
+            "/api/v1/movies/id/nope", headers={"If-None-Match": '"v0"'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get(
+            "/api/v1/movies/id/nope",
+            headers={"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"},
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_all_movies_modified_after_write(self):
+        self.client.post("/api/v1/movies", json={"title": "Alien"})
+        etag = self.client.get("/api/v1/movies").headers["ETag"]
+
+        self.client.post("/api/v1/movies", json={"title": "Aliens"})
+        response = self.client.get("/api/v1/movies", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(len(response.json["movies"]), 4)
+
+        response = self.client.get(
+            "/api/v1/movies", headers={"If-None-Match": response.headers["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+
 
 if __name__ == "__main__":
     unittest.main()
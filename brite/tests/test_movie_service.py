@@ -1,14 +1,34 @@
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
 from brite import create_app, db
+from brite.models.movie import Movie
 from brite.services.movie_service import (
     add_movie,
+    add_movies,
     delete_movie,
+    delete_movies,
     fetch_movie_by_id,
     fetch_movie_by_title,
     fetch_movies,
+    fetch_movies_by_ids,
+    invalidate_movie,
+    movie_cache,
 )
+from brite.utils.cursor import encode_cursor
+
+# A row of the movie columns and the json it is returned as
+ROW = ("tt1", "Test Movie", 2000, "movie", "N/A")
+MOVIE = {
+    "id": "tt1",
+    "title": "Test Movie",
+    "year": 2000,
+    "type": "movie",
+    "poster": "N/A",
+}
 
 
 class TestMovieService(unittest.TestCase):
@@ -27,104 +47,282 @@ class TestMovieService(unittest.TestCase):
             db.session.remove()
             db.drop_all()
 
-    @patch("brite.services.movie_service.Movie")
-    def test_fetch_movies(self, mock_movie):
-        # Mock the Movie.query.order_by().paginate() call
-        mock_paginate = MagicMock()
-        mock_paginate.items = [mock_movie, mock_movie]
-        mock_order_by = MagicMock()
-        mock_order_by.paginate.return_value = mock_paginate
-        mock_query = MagicMock()
-        mock_query.order_by.return_value = mock_order_by
-        mock_movie.query = mock_query
-
-        # Mock the Movie.json() call
-        mock_movie.json.return_value = {"id": 1, "title": "Test Movie"}
+    @patch("brite.services.movie_service.db.session")
+    def test_fetch_movies(self, mock_session):
+        # Mock the rows returned by the listing query
+        mock_session.execute.return_value.all.return_value = [ROW, ROW]
 
         result = fetch_movies(1, 2)
-        expected_result = {
-            "movies": [
-                {"id": 1, "title": "Test Movie"},
-                {"id": 1, "title": "Test Movie"},
-            ]
-        }
+        expected_result = {"movies": [MOVIE, MOVIE]}
 
         self.assertEqual(result, expected_result)
 
-    @patch("brite.services.movie_service.Movie")
-    def test_fetch_movies_no_data(self, mock_movie):
-        # Mock the Movie.query.order_by().paginate() call to return no items
-        mock_paginate = MagicMock()
-        mock_paginate.items = []
-        mock_order_by = MagicMock()
-        mock_order_by.paginate.return_value = mock_paginate
-        mock_query = MagicMock()
-        mock_query.order_by.return_value = mock_order_by
-        mock_movie.query = mock_query
+    @patch("brite.services.movie_service.db.session")
+    def test_fetch_movies_no_data(self, mock_session):
+        # Mock the listing query to return no rows
+        mock_session.execute.return_value.all.return_value = []
 
         result = fetch_movies(1, 2)
         expected_result = {"movies": []}
 
         self.assertEqual(result, expected_result)
 
-    @patch("brite.services.movie_service.Movie")
-    def test_fetch_movie_by_title(self, mock_movie):
-        # Mock the Movie.query.filter_by().first() call
-        mock_filter_by = MagicMock()
-        mock_filter_by.first.return_value = mock_movie
-        mock_query = MagicMock()
-        mock_query.filter_by.return_value = mock_filter_by
-        mock_movie.query = mock_query
+    def test_fetch_movies_with_cursor(self):
+        with self.app.app_context():
+            for number in range(5):
+                db.session.add(Movie(id=f"tt000000{number}", title=f"Movie {number}"))
+            db.session.commit()
 
-        # Mock the Movie.json() call
-        mock_movie.json.return_value = {"id": 1, "title": "Test Movie"}
+            # Walk the catalog two movies at a time, starting with an empty cursor
+            titles, cursor = [], ""
+            while cursor is not None:
+                result = fetch_movies(1, 2, cursor)
+                titles += [movie["title"] for movie in result["movies"]]
+                cursor = result["next_cursor"]
+
+        self.assertEqual(titles, [f"Movie {number}" for number in range(5)])
+
+    def test_fetch_movies_with_invalid_cursor(self):
+        with self.app.app_context():
+            result = fetch_movies(1, 2, "not-a-cursor")
+
+        self.assertEqual(result, ({"message": "Invalid cursor"}, 400))
+
+    def test_fetch_movies_with_malformed_cursor_values(self):
+        with self.app.app_context():
+            for values in ([{"a": 1}, 2], ["Alien"], ["Alien", "tt1", "x"]):
+                cursor = encode_cursor(*values)
+                result = fetch_movies(1, 2, cursor)
+
+                self.assertEqual(result, ({"message": "Invalid cursor"}, 400))
+
+    def test_fetch_movies_filtered_and_sorted(self):
+        with self.app.app_context():
+            db.session.add(Movie(id="tt0000001", title="Alien", year=1979, type="movie"))
+            db.session.add(
+                Movie(id="tt0000002", title="Aliens", year=1986, type="movie")
+            )
+            db.session.add(Movie(id="tt0000003", title="Alf", year=1986, type="series"))
+            db.session.add(
+                Movie(id="tt0000004", title="Brazil", year=1985, type="movie")
+            )
+            db.session.add(
+                Movie(id="tt0000005", title="Manhunter", year=1986, type="movie")
+            )
+            db.session.commit()
+
+            by_year = fetch_movies(1, 10, sort="-year", movie_type="movie")
+            in_range = fetch_movies(1, 10, year_from=1980, year_to=1985)
+            one_year = fetch_movies(1, 10, year_from=1986, year_to=1986)
+            by_prefix = fetch_movies(1, 10, sort="-title", prefix="Ali")
+            walked = fetch_movies(1, 10, "", year_from=1986)
+
+        titles = [movie["title"] for movie in by_year["movies"]]
+        self.assertEqual(titles, ["Manhunter", "Aliens", "Brazil", "Alien"])
+        self.assertEqual([movie["title"] for movie in in_range["movies"]], ["Brazil"])
+        titles = [movie["title"] for movie in one_year["movies"]]
+        self.assertEqual(titles, ["Alf", "Aliens", "Manhunter"])
+        titles = [movie["title"] for movie in by_prefix["movies"]]
+        self.assertEqual(titles, ["Aliens", "Alien"])
+        titles = [movie["title"] for movie in walked["movies"]]
+        self.assertEqual(titles, ["Alf", "Aliens", "Manhunter"])
+
+    def test_fetch_movies_prefix_with_last_code_points(self):
+        top = chr(0x10FFFF)
+        with self.app.app_context():
+            db.session.add(Movie(id="tt0000001", title="A" + top + "x"))
+            db.session.add(Movie(id="tt0000002", title=chr(0xD7FF) + "b"))
+            db.session.add(Movie(id="tt0000003", title="B"))
+            db.session.commit()
+
+            titles = {
+                prefix: [
+                    movie["title"]
+                    for movie in fetch_movies(1, 10, prefix=prefix)["movies"]
+                ]
+                for prefix in ("A" + top, top, chr(0xD7FF))
+            }
+
+        self.assertEqual(titles["A" + top], ["A" + top + "x"])
+        self.assertEqual(titles[top], [])
+        self.assertEqual(titles[chr(0xD7FF)], [chr(0xD7FF) + "b"])
+
+    def test_fetch_movies_with_cursor_and_other_sort(self):
+        with self.app.app_context():
+            result = fetch_movies(1, 2, "", sort="year")
+
+        self.assertEqual(result[1], 400)
+
+    @patch("brite.services.movie_service.db.session")
+    def test_fetch_movie_by_title(self, mock_session):
+        # Mock the row of the lookup query
+        mock_session.execute.return_value.first.return_value = ROW
 
         result = fetch_movie_by_title("Test Movie")
-        expected_result = {"movie": {"id": 1, "title": "Test Movie"}}
+        expected_result = {"movie": MOVIE}
 
         self.assertEqual(result, expected_result)
 
-    @patch("brite.services.movie_service.Movie")
-    def test_fetch_movie_by_title_not_found(self, mock_movie):
-        # Mock the Movie.query.filter_by().first() call to return None
-        mock_filter_by = MagicMock()
-        mock_filter_by.first.return_value = None
-        mock_query = MagicMock()
-        mock_query.filter_by.return_value = mock_filter_by
-        mock_movie.query = mock_query
+    @patch("brite.services.movie_service.db.session")
+    def test_fetch_movie_by_title_not_found(self, mock_session):
+        # Mock the lookup query to return no row
+        mock_session.execute.return_value.first.return_value = None
 
         result = fetch_movie_by_title("Nonexistent Movie")
         expected_result = {"message": "Movie with this title does not exist"}, 404
 
         self.assertEqual(result, expected_result)
 
-    @patch("brite.services.movie_service.Movie")
-    def test_fetch_movie_by_id_found(self, mock_movie):
-        # Mock the Movie.query.get() call
-        mock_query = MagicMock()
-        mock_query.get.return_value = mock_movie
-        mock_movie.query = mock_query
-
-        # Mock the Movie.json() call
-        mock_movie.json.return_value = {"id": 1, "title": "Test Movie"}
+    @patch("brite.services.movie_service.db.session")
+    def test_fetch_movie_by_id_found(self, mock_session):
+        # Mock the row of the lookup query
+        mock_session.execute.return_value.first.return_value = ROW
 
-        result = fetch_movie_by_id(1)
-        expected_result = {"movie": {"id": 1, "title": "Test Movie"}}
+        result = fetch_movie_by_id("tt1")
+        expected_result = {"movie": MOVIE}
 
         self.assertEqual(result, expected_result)
 
-    @patch("brite.services.movie_service.Movie")
-    def test_fetch_movie_by_id_not_found(self, mock_movie):
-        # Mock the Movie.query.get() call to return None
-        mock_query = MagicMock()
-        mock_query.get.return_value = None
-        mock_movie.query = mock_query
+    @patch("brite.services.movie_service.db.session")
+    def test_fetch_movie_by_id_not_found(self, mock_session):
+        # Mock the lookup query to return no row
+        mock_session.execute.return_value.first.return_value = None
 
         result = fetch_movie_by_id(999)
         expected_result = {"message": "Movie with this id does not exist"}, 404
 
         self.assertEqual(result, expected_result)
 
+    @patch("brite.services.movie_service.db.session")
+    def test_fetch_movie_by_id_cached(self, mock_session):
+        mock_session.execute.return_value.first.return_value = ROW
+
+        fetch_movie_by_id("tt1")
+        result = fetch_movie_by_id("tt1")
+
+        # The second lookup, and a lookup by title, are served from the cache
+        self.assertEqual(result, {"movie": MOVIE})
+        self.assertEqual(fetch_movie_by_title("Test Movie"), {"movie": MOVIE})
+        self.assertEqual(mock_session.execute.call_count, 1)
+
+    @patch("brite.services.movie_service.db.session")
+    def test_lookup_racing_a_write_is_not_cached(self, mock_session):
+        def deleted_during_load():
+            # The movie is deleted after the lookup read its row
+            invalidate_movie("tt1", "Test Movie")
+            return ROW
+
+        mock_session.execute.return_value.first.side_effect = deleted_during_load
+
+        self.assertEqual(fetch_movie_by_id("tt1"), {"movie": MOVIE})
+        self.assertIsNone(movie_cache.get(("id", "tt1")))
+        self.assertIsNone(movie_cache.get(("title", "Test Movie")))
+
+    @patch("brite.services.movie_service.db.session")
+    def test_fetch_movie_by_title_coalesces_concurrent_misses(self, mock_session):
+        def slow_first():
+            time.sleep(0.2)
+            return ("tt1", "Hot Movie", None, None, None)
+
+        mock_session.execute.return_value.first.side_effect = slow_first
+
+        barrier = threading.Barrier(20)
+
+        def request():
+            barrier.wait()
+            return fetch_movie_by_title("Hot Movie")
+
+        with ThreadPoolExecutor(max_workers=20) as executor:
+            results = list(executor.map(lambda _: request(), range(20)))
+
+        # 20 concurrent misses for the same title run exactly one query
+        self.assertEqual(mock_session.execute.call_count, 1)
+        self.assertEqual(results, [results[0]] * 20)
+        self.assertEqual(results[0]["movie"]["title"], "Hot Movie")
+
+    def test_fetch_movies_by_ids(self):
+        with self.app.app_context():
+            for number in range(3):
+                db.session.add(Movie(id=f"tt000000{number}", title=f"Movie {number}"))
+            db.session.commit()
+            fetch_movie_by_id("tt0000002")
+
+            with patch.object(db.session, "execute", wraps=db.session.execute) as query:
+                result = fetch_movies_by_ids(
+                    ["tt0000002", "tt9999999", "tt0000000", "tt0000002", "tt0000001"]
+                )
+
+            # The cached movie is not queried again, the others share one query
+            query.assert_called_once()
+            self.assertEqual(movie_cache.get(("id", "tt0000001"))["title"], "Movie 1")
+
+        titles = [movie and movie["title"] for movie in result["movies"]]
+        self.assertEqual(titles, ["Movie 2", None, "Movie 0", "Movie 2", "Movie 1"])
+        self.assertEqual(result["missing"], ["tt9999999"])
+
+    def test_add_movies_in_one_transaction(self):
+        with self.app.app_context():
+            db.session.add(Movie(id="tt0000001", title="Alien"))
+            db.session.commit()
+
+            with patch.object(db.session, "commit", wraps=db.session.commit) as commit:
+                result, status = add_movies(["Alien", "Aliens", "Brazil", "Aliens"])
+
+            commit.assert_called_once()
+            titles = db.session.scalars(db.select(Movie.title).order_by(Movie.title))
+            self.assertEqual(list(titles), ["Alien", "Aliens", "Brazil"])
+
+        self.assertEqual(status, 200)
+        self.assertEqual(result["created"], 2)
+        self.assertEqual(
+            [item["status"] for item in result["results"]], [400, 201, 201, 400]
+        )
+
+    @patch("brite.services.movie_service.generate_id")
+    def test_add_movies_avoids_id_collisions(self, mock_generate_id):
+        # The first ids drawn clash with each other and with a stored movie
+        mock_generate_id.side_effect = ["tt0000001", "tt0000001", "tt0000002", "tt3"]
+        with self.app.app_context():
+            db.session.add(Movie(id="tt0000002", title="Alien"))
+            db.session.commit()
+
+            result, _ = add_movies(["Aliens", "Brazil"])
+
+        ids = sorted(item["movie"]["id"] for item in result["results"])
+        self.assertEqual(ids, ["tt0000001", "tt3"])
+
+    def test_delete_movies(self):
+        with self.app.app_context():
+            for number in range(3):
+                db.session.add(Movie(id=f"tt000000{number}", title=f"Movie {number}"))
+            db.session.commit()
+            fetch_movie_by_id("tt0000001")
+
+            result, status = delete_movies(["tt0000001", "tt0000001", "tt0000009"])
+
+            self.assertEqual(db.session.query(Movie).count(), 2)
+            self.assertEqual(fetch_movie_by_id("tt0000001")[1], 404)
+
+        self.assertEqual(result["deleted"], 1)
+        self.assertEqual([item["status"] for item in result["results"]], [200, 404, 404])
+
+    @patch.dict("os.environ", {"MOVIE_BATCH_LIMIT": "2"})
+    def test_fetch_movies_by_ids_limit(self):
+        with self.app.app_context():
+            self.assertEqual(fetch_movies_by_ids([])[1], 400)
+            self.assertEqual(fetch_movies_by_ids(["a", "b", "c"])[1], 400)
+
+    def test_delete_movie_invalidates_cache(self):
+        with self.app.app_context():
+            db.session.add(Movie(id="tt0000001", title="Cached Movie"))
+            db.session.commit()
+
+            self.assertEqual(fetch_movie_by_id("tt0000001")["movie"]["id"], "tt0000001")
+            delete_movie("tt0000001")
+
+            self.assertEqual(fetch_movie_by_id("tt0000001")[1], 404)
+            self.assertEqual(fetch_movie_by_title("Cached Movie")[1], 404)
+
     @patch("brite.services.movie_service.Movie")
     @patch("brite.utils.database_setup.db.session")
     def test_add_movie_new_title(self, mock_db_session, mock_movie):
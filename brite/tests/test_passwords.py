@@ -0,0 +1,59 @@
+import unittest
+
+from brite.utils.passwords import PasswordHasher
+
+
+class TestPasswordHasher(unittest.TestCase):
+    def test_hash_and_verify_inline(self):
+        hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=0)
+
+        password_hash = hasher.hash("secret")
+
+        self.assertTrue(password_hash.startswith("pbkdf2:sha256:1000$"))
+        self.assertTrue(hasher.verify(password_hash, "secret"))
+        self.assertFalse(hasher.verify(password_hash, "wrong"))
+
+    def test_hash_and_verify_in_pool(self):
+        hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=2)
+        self.addCleanup(hasher.configure, "pbkdf2:sha256:1000", 0)
+
+        password_hash = hasher.hash("secret")
+
+        self.assertTrue(hasher.verify(password_hash, "secret"))
+
+    def test_broken_pool_is_replaced(self):
+        hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=1)
+        self.addCleanup(hasher.configure, "pbkdf2:sha256:1000", 0)
+        password_hash = hasher.hash("secret")
+
+        # Kill the hashing process, as the OOM killer would
+        for process in list(hasher._executor._processes.values()):
+            process.kill()
+            process.join()
+
+        self.assertTrue(hasher.verify(password_hash, "secret"))
+        self.assertTrue(hasher.verify(password_hash, "secret"))
+
+    def test_needs_rehash(self):
+        old = PasswordHasher(method="pbkdf2:sha256:1000")
+        new = PasswordHasher(method="pbkdf2:sha256:2000")
+
+        password_hash = old.hash("secret")
+
+        self.assertFalse(old.needs_rehash(password_hash))
+        self.assertTrue(new.needs_rehash(password_hash))
+
+    def test_stats(self):
+        hasher = PasswordHasher(method="pbkdf2:sha256:1000")
+
+        hasher.verify(hasher.hash("secret"), "secret")
+
+        stats = hasher.stats()
+        self.assertEqual(stats["method"], "pbkdf2:sha256:1000")
+        self.assertEqual(stats["hash"]["count"], 1)
+        self.assertEqual(stats["verify"]["count"], 1)
+        self.assertGreaterEqual(stats["verify"]["max_ms"], stats["verify"]["avg_ms"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, exc, text
+
+from brite import create_app
+from brite.utils.pool import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    dispose_engines,
+    engine_options,
+    pool_stats,
+    track_engines,
+)
+
+
+class TestEngineOptions(unittest.TestCase):
+    def test_sqlite_keeps_the_defaults(self):
+        with patch.dict(os.environ, {"DB_POOL_SIZE": "20"}):
+            self.assertEqual(engine_options("sqlite:///:memory:"), {})
+
+    def test_options_from_the_environment(self):
+        env = {
+            "DB_POOL_SIZE": "20",
+            "DB_MAX_OVERFLOW": "5",
+            "DB_POOL_TIMEOUT": "2.5",
+            "DB_POOL_RECYCLE": "1800",
+            "DB_POOL_PRE_PING": "true",
+            "DB_STATEMENT_TIMEOUT": "5000",
+        }
+        with patch.dict(os.environ, env):
+            options = engine_options("postgresql://user@db/movies")
+
+        self.assertEqual(
+            options,
+            {
+                "poolclass": InstrumentedQueuePool,
+                "pool_size": 20,
+                "max_overflow": 5,
+                "pool_timeout": 2.5,
+                "pool_recycle": 1800,
+                "pool_pre_ping": True,
+                "connect_args": {"options": "-c statement_timeout=5000"},
+            },
+        )
+
+    def test_async_options(self):
+        env = {"DB_POOL_SIZE": "20", "DB_STATEMENT_TIMEOUT": "5000"}
+        with patch.dict(os.environ, env):
+            options = engine_options("postgresql://user@db/movies", use_async=True)
+
+        self.assertEqual(
+            options,
+            {
+                "poolclass": InstrumentedAsyncQueuePool,
+                "pool_size": 20,
+                "connect_args": {"server_settings": {"statement_timeout": "5000"}},
+            },
+        )
+
+    def test_unset_options_are_left_out(self):
+        with patch.dict(os.environ, {"DB_POOL_SIZE": "3"}):
+            options = engine_options("postgresql://user@db/movies")
+
+        self.assertEqual(options, {"poolclass": InstrumentedQueuePool, "pool_size": 3})
+
+
+class TestInstrumentedQueuePool(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.engine = create_engine(
+            f"sqlite:///{self.path}",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=1,
+            pool_timeout=0.1,
+        )
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def test_checkouts_waits_and_overflow(self):
+        first = self.engine.connect()
+        second = self.engine.connect()
+        with self.assertRaises(exc.TimeoutError):
+            self.engine.connect()
+
+        stats = self.engine.pool.stats()
+        self.assertEqual(stats["checkouts"], 3)
+        self.assertEqual(stats["checked_out"], 2)
+        self.assertEqual(stats["overflow"], 1)
+        self.assertEqual(stats["waits"], 1)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertGreaterEqual(stats["checkout_max_ms"], 100)
+
+        second.close()
+        first.close()
+        self.assertEqual(self.engine.pool.stats()["peak_overflow"], 1)
+
+    def test_waiting_checkout_gets_the_returned_connection(self):
+        first = self.engine.connect()
+        second = self.engine.connect()
+        threading.Timer(0.02, second.close).start()
+
+        with self.engine.connect() as third:
+            third.execute(text("SELECT 1"))
+        first.close()
+
+        stats = self.engine.pool.stats()
+        self.assertEqual(stats["waits"], 1)
+        self.assertEqual(stats["timeouts"], 0)
+
+    def test_pool_stats_skips_other_pools(self):
+        other = create_engine("sqlite:///:memory:")
+
+        stats = pool_stats({None: self.engine, "other": other})
+
+        self.assertEqual(list(stats), ["default"])
+
+    def test_dispose_engines_replaces_the_pools(self):
+        pool = self.engine.pool
+        track_engines([self.engine])
+
+        dispose_engines()
+
+        self.assertIsNot(self.engine.pool, pool)
+        self.assertIsInstance(self.engine.pool, InstrumentedQueuePool)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "os.fork is not available")
+    def test_forked_child_gets_a_new_pool(self):
+        track_engines([self.engine])
+        self.engine.connect().close()
+        pool = self.engine.pool
+
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.write(write, b"1" if self.engine.pool is not pool else b"0")
+            os._exit(0)
+        os.waitpid(pid, 0)
+
+        self.assertEqual(os.read(read, 1), b"1")
+        self.assertIs(self.engine.pool, pool)
+
+
+class TestPoolMetrics(unittest.TestCase):
+    def test_metrics_include_the_pools(self):
+        app = create_app()
+
+        response = app.test_client().get("/api/v1/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["database_pools"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
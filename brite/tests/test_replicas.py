@@ -0,0 +1,175 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert, select
+
+from brite import create_app, db
+from brite.models.movie import Movie
+from brite.services.movie_service import movie_cache
+from brite.utils.replicas import STICKY_COOKIE
+
+
+class TestReplicas(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = None
+        movie_cache.clear()
+
+    def tearDown(self):
+        if self.app is not None:
+            with self.app.app_context():
+                db.session.remove()
+                db.engine.dispose()
+            self.app.extensions["brite_replicas"].dispose()
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def start(self, *replicas):
+        urls = ",".join(f"sqlite:///{self.path(name)}" for name in replicas)
+        env = {"DATABASE_URL": f"sqlite:///{self.path('primary.db')}"}
+        with patch.dict(os.environ, {**env, "DATABASE_REPLICA_URLS": urls}):
+            self.app = create_app()
+        self.app.config["TESTING"] = True
+
+        # Replication is simulated, the tests write to every file directly
+        with self.app.app_context():
+            db.create_all()
+            for engine in self.app.extensions["brite_replicas"].engines:
+                if os.path.isdir(os.path.dirname(engine.url.database)):
+                    db.metadata.create_all(engine)
+
+    def engine(self, replica=None):
+        if replica is None:
+            with self.app.app_context():
+                return db.engine
+        return self.app.extensions["brite_replicas"].engines[replica]
+
+    def insert(self, replica, title):
+        with self.engine(replica).begin() as connection:
+            connection.execute(
+                insert(Movie), {"id": title[:10], "title": title, "type": "movie"}
+            )
+
+    def titles(self, replica=None):
+        with self.engine(replica).connect() as connection:
+            return connection.execute(select(Movie.title)).scalars().all()
+
+    def listed(self, response):
+        return [movie["title"] for movie in response.get_json()["movies"]]
+
+    def test_get_requests_read_from_the_replica(self):
+        self.start("replica.db")
+        self.insert(None, "Primary")
+        self.insert(0, "Replica")
+
+        client = self.app.test_client()
+        response = client.get("/api/v1/movies")
+        by_title = client.get("/api/v1/movies/title/Replica")
+
+        self.assertEqual(self.listed(response), ["Replica"])
+        self.assertEqual(by_title.status_code, 200)
+
+    def test_writes_go_to_the_primary(self):
+        self.start("replica.db")
+
+        response = self.app.test_client().post("/api/v1/movies", json={"title": "Heat"})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.titles(), ["Heat"])
+        self.assertEqual(self.titles(0), [])
+
+    def test_reads_stick_to_the_primary_after_a_write(self):
+        self.start("replica.db")
+        client = self.app.test_client()
+
+        client.post("/api/v1/movies", json={"title": "Heat"})
+
+        self.assertEqual(self.listed(client.get("/api/v1/movies")), ["Heat"])
+        self.assertEqual(self.listed(self.app.test_client().get("/api/v1/movies")), [])
+
+    def test_writer_reads_its_delete_past_the_cache(self):
+        self.start("replica.db")
+        self.insert(None, "Heat")
+        self.insert(0, "Heat")
+        with self.app.app_context():
+            token = create_access_token(
+                identity="admin", additional_claims={"role": "admin"}
+            )
+        writer = self.app.test_client()
+
+        response = writer.delete(
+            "/api/v1/movies/Heat", headers={"Authorization": f"Bearer {token}"}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        # The replica lags behind the delete, other clients still see it...
+        reader = self.app.test_client()
+        self.assertEqual(reader.get("/api/v1/movies/id/Heat").status_code, 200)
+        by_ids = reader.get("/api/v1/movies/batch?ids=Heat")
+        self.assertEqual(by_ids.get_json()["missing"], [])
+
+        # ...but the writer reads its own delete
+        self.assertEqual(writer.get("/api/v1/movies/id/Heat").status_code, 404)
+        self.assertEqual(writer.get("/api/v1/movies/title/Heat").status_code, 404)
+
+    def test_replica_reads_fill_the_cache(self):
+        self.start("replica.db")
+        self.insert(0, "Heat")
+
+        client = self.app.test_client()
+        client.get("/api/v1/movies/id/Heat")
+        client.get("/api/v1/movies/batch?ids=Heat")
+
+        # The batch lookup is served by the entry of the first one
+        self.assertEqual(movie_cache.stats()["hits"], 1)
+        self.assertEqual(movie_cache.get(("id", "Heat"))["title"], "Heat")
+
+    def test_pinned_requests_skip_the_cache(self):
+        self.start("replica.db")
+        self.insert(None, "Heat")
+        movie_cache.set(("id", "Heat"), {"id": "Heat", "title": "Stale"})
+
+        client = self.app.test_client()
+        client.set_cookie(STICKY_COOKIE, "1")
+        response = client.get("/api/v1/movies/id/Heat")
+
+        self.assertEqual(response.get_json()["movie"]["title"], "Heat")
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.start("replica.db")
+        self.insert(None, "Primary")
+
+        with self.app.app_context():
+            titles = db.session.execute(select(Movie.title)).scalars().all()
+
+        self.assertEqual(titles, ["Primary"])
+
+    def test_replicas_are_used_in_turn(self):
+        self.start("first.db", "second.db")
+        self.insert(0, "First")
+        self.insert(1, "Second")
+
+        client = self.app.test_client()
+        titles = [self.listed(client.get("/api/v1/movies"))[0] for _ in range(4)]
+
+        self.assertEqual(sorted(titles), ["First", "First", "Second", "Second"])
+
+    def test_reads_fall_back_to_the_primary_when_replicas_are_down(self):
+        self.start(os.path.join("missing", "replica.db"))
+        self.insert(None, "Primary")
+
+        client = self.app.test_client()
+        response = client.get("/api/v1/movies")
+        replicas = client.get("/api/v1/metrics").get_json()["replicas"]
+
+        self.assertEqual(self.listed(response), ["Primary"])
+        self.assertFalse(replicas[0]["healthy"])
+
+
+if __name__ == "__main__":
+    unittest.main()
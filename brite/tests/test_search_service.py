@@ -0,0 +1,270 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import delete, text
+
+from brite import create_app, db
+from brite.models.movie import Movie
+from brite.services import search_service
+from brite.services.change_service import record_changes
+from brite.services.movie_service import add_movie, delete_movie, upsert_movies
+from brite.services.search_service import (
+    InvertedIndex,
+    autocomplete,
+    create_search_index,
+    search_backend,
+    search_movies,
+)
+
+
+class TestSearchService(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+        self.app.config["TESTING"] = True
+
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+            for movie_id, title in [
+                ("tt0000001", "Star Wars"),
+                ("tt0000002", "Star Wars: The Empire Strikes Back"),
+                ("tt0000003", "Amélie"),
+                ("tt0000004", "Lone Star"),
+            ]:
+                db.session.add(Movie(id=movie_id, title=title))
+            db.session.commit()
+            create_search_index()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def titles(self, query, limit=10):
+        return [movie["title"] for movie in search_movies(query, limit)["movies"]]
+
+    def test_search_ranks_matches(self):
+        with self.app.app_context():
+            self.assertEqual(
+                self.titles("star wars"),
+                ["Star Wars", "Star Wars: The Empire Strikes Back"],
+            )
+            self.assertEqual(len(self.titles("star")), 3)
+            self.assertEqual(self.titles("star wars", limit=1), ["Star Wars"])
+
+    def test_search_matches_prefix_and_accents(self):
+        with self.app.app_context():
+            self.assertEqual(self.titles("emp"), ["Star Wars: The Empire Strikes Back"])
+            self.assertEqual(self.titles("amelie"), ["Amélie"])
+
+    def test_search_ignores_query_syntax(self):
+        with self.app.app_context():
+            self.assertEqual(self.titles('"star" OR *'), [])
+            self.assertEqual(self.titles("!!!"), [])
+
+    def test_search_follows_writes(self):
+        with self.app.app_context():
+            self.titles("trek")
+
+            _, status = add_movie("Star Trek")
+            self.assertEqual(status, 201)
+            self.assertEqual(self.titles("trek"), ["Star Trek"])
+
+            delete_movie("tt0000004")
+            self.assertNotIn("Lone Star", self.titles("star"))
+
+    def test_search_without_full_text_index(self):
+        with self.app.app_context():
+            with patch.object(db.engine.dialect, "name", "mysql"), patch.dict(
+                search_service._engine_backends, clear=True
+            ):
+                self.assertEqual(
+                    self.titles("wars"),
+                    ["Star Wars", "Star Wars: The Empire Strikes Back"],
+                )
+
+                add_movie("Star Trek")
+                self.assertEqual(self.titles("trek"), ["Star Trek"])
+
+    def test_requests_do_not_create_the_index(self):
+        with self.app.app_context():
+            db.session.execute(text("DROP TABLE movie_fts"))
+            db.session.commit()
+            search_service._engine_backends.clear()
+
+            self.assertEqual(self.titles("lone"), ["Lone Star"])
+            self.assertEqual(search_backend(), "python")
+            self.assertIsNone(
+                db.session.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE name = 'movie_fts'")
+                ).first()
+            )
+
+            self.assertEqual(create_search_index(), "sqlite")
+            self.assertEqual(self.titles("lone"), ["Lone Star"])
+
+    def test_search_survives_vacuum(self):
+        with self.app.app_context():
+            delete_movie("tt0000001")
+            db.session.execute(text("VACUUM"))
+
+            self.assertEqual(
+                self.titles("star"), ["Lone Star", "Star Wars: The Empire Strikes Back"]
+            )
+
+    def test_search_follows_renames(self):
+        with self.app.app_context():
+            db.session.get(Movie, "tt0000004").title = "Heat"
+            db.session.commit()
+
+            self.assertEqual(self.titles("heat"), ["Heat"])
+            self.assertNotIn("Heat", self.titles("lone"))
+
+    def test_index_of_older_versions_is_replaced(self):
+        with self.app.app_context():
+            for statement in search_service.SQLITE_DROP_INDEX + [
+                "CREATE VIRTUAL TABLE movie_fts USING fts5(title, content='movie')",
+            ]:
+                db.session.execute(text(statement))
+            db.session.commit()
+            search_service._engine_backends.clear()
+
+            self.assertEqual(create_search_index(), "sqlite")
+            self.assertEqual(self.titles("lone"), ["Lone Star"])
+
+    def test_titles_without_tokens_leave_the_index(self):
+        with self.app.app_context():
+            db.session.add(Movie(id="tt0000005", title="!!!"))
+            db.session.get(Movie, "tt0000004").title = "..."
+            db.session.commit()
+            delete_movie("tt0000004")
+            delete_movie("tt0000005")
+
+            count = db.session.execute(text("SELECT count(*) FROM movie_fts"))
+            self.assertEqual(count.scalar(), 3)
+
+    def test_index_with_older_triggers_is_rebuilt(self):
+        with self.app.app_context():
+            db.session.execute(text("DROP TRIGGER movie_fts_delete"))
+            db.session.execute(
+                text(
+                    "CREATE TRIGGER movie_fts_delete AFTER DELETE ON movie BEGIN "
+                    "DELETE FROM movie_fts WHERE rowid IN (SELECT rowid FROM movie_fts "
+                    "WHERE movie_fts MATCH 'title : \"' || old.title || '\"' "
+                    "AND id = old.id); END"
+                )
+            )
+            db.session.get(Movie, "tt0000004").title = "!!!"
+            db.session.commit()
+            delete_movie("tt0000004")
+            search_service._engine_backends.clear()
+
+            self.assertEqual(create_search_index(), "sqlite")
+            count = db.session.execute(text("SELECT count(*) FROM movie_fts"))
+            self.assertEqual(count.scalar(), 3)
+
+    def test_search_endpoint(self):
+        response = self.client.get("/api/v1/movies/search?q=star wars&limit=1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["movies"][0]["title"], "Star Wars")
+
+        response = self.client.get("/api/v1/movies/search")
+        self.assertEqual(response.status_code, 400)
+
+    def test_autocomplete_follows_writes(self):
+        with self.app.app_context():
+            result = autocomplete("star", 10)
+            self.assertEqual(
+                [movie["title"] for movie in result["movies"]],
+                ["Star Wars", "Star Wars: The Empire Strikes Back"],
+            )
+
+            add_movie("Star Trek")
+            delete_movie("tt0000001")
+
+            result = autocomplete("STAR", 10)
+            self.assertEqual(
+                [movie["title"] for movie in result["movies"]],
+                ["Star Trek", "Star Wars: The Empire Strikes Back"],
+            )
+
+    def write_in_another_process(self):
+        # Logged and committed, without the in-process index updates
+        upsert_movies([{"id": "tt0000005", "title": "Star Trek"}])
+        db.session.execute(delete(Movie).where(Movie.id == "tt0000001"))
+        record_changes(deleted=["tt0000001"])
+        db.session.commit()
+
+    def test_autocomplete_follows_the_change_log(self):
+        with self.app.app_context(), patch.dict(
+            os.environ, {"INDEX_SYNC_INTERVAL": "0"}
+        ):
+            autocomplete("star", 10)
+            self.write_in_another_process()
+
+            result = autocomplete("star", 10)
+            self.assertEqual(
+                [movie["title"] for movie in result["movies"]],
+                ["Star Trek", "Star Wars: The Empire Strikes Back"],
+            )
+
+    def test_in_memory_search_follows_the_change_log(self):
+        with self.app.app_context(), patch.dict(
+            os.environ, {"INDEX_SYNC_INTERVAL": "0"}
+        ):
+            with patch.object(db.engine.dialect, "name", "mysql"), patch.dict(
+                search_service._engine_backends, clear=True
+            ):
+                self.titles("star")
+                self.write_in_another_process()
+
+                self.assertEqual(
+                    self.titles("star"),
+                    ["Lone Star", "Star Trek", "Star Wars: The Empire Strikes Back"],
+                )
+
+    def test_autocomplete_endpoint(self):
+        response = self.client.get("/api/v1/movies/autocomplete?q=ame")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json["movies"], [{"id": "tt0000003", "title": "Amélie"}]
+        )
+
+
+class TestInvertedIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = InvertedIndex()
+        self.index.build([("1", "Star Wars"), ("2", "Lone Star"), ("3", "Heat")])
+
+    def test_search(self):
+        self.assertEqual(self.index.search("star", 10), ["1", "2"])
+        self.assertEqual(self.index.search("lone st", 10), ["2"])
+        self.assertEqual(self.index.search("star heat", 10), [])
+
+    def test_add_and_remove(self):
+        self.index.add("4", "Star Trek")
+        self.index.remove("1")
+
+        self.assertEqual(self.index.search("star", 10), ["2", "4"])
+
+    def test_removed_tokens_stop_matching(self):
+        self.index.remove("3")
+        self.index.add("4", "Heathers")
+
+        self.assertEqual(self.index._tokens, ["heathers", "lone", "star", "wars"])
+        self.assertEqual(self.index.search("heat", 10), ["4"])
+
+    def test_ignored_until_built(self):
+        index = InvertedIndex()
+        index.add("1", "Star Wars")
+
+        index.build([])
+
+        self.assertEqual(index.search("star", 10), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy.exc import OperationalError
+
+from brite import create_app, db
+from brite.models.user import User
+from brite.services.seed_service import SeedJob, seed_lock
+
+
+class TestSeedService(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+        self.app.config["TESTING"] = True
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    @patch("brite.services.seed_service.get_movies")
+    def test_seed_command(self, mock_get_movies):
+        runner = self.app.test_cli_runner()
+
+        result = runner.invoke(args=["seed", "--refresh"])
+
+        self.assertEqual(result.exit_code, 0)
+        mock_get_movies.assert_called_once_with(refresh=True)
+        with self.app.app_context():
+            self.assertEqual(User.query.count(), 2)
+
+    @patch("brite.services.seed_service.get_movies")
+    def test_seed_command_skip_movies(self, mock_get_movies):
+        runner = self.app.test_cli_runner()
+
+        result = runner.invoke(args=["seed", "--skip-movies"])
+
+        self.assertEqual(result.exit_code, 0)
+        mock_get_movies.assert_not_called()
+
+    def test_not_ready_before_seeding(self):
+        response = self.client.get("/api/v1/health/ready")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json["status"], "not seeded")
+
+    @patch("brite.services.seed_service.get_movies")
+    def test_background_seed_job(self, mock_get_movies):
+        job = SeedJob(self.app).start()
+        self.app.extensions["brite_seed"] = job
+
+        self.assertTrue(job.done.wait(timeout=30))
+        self.assertEqual(job.state, "ready")
+
+        response = self.client.get("/api/v1/health/ready")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["status"], "ready")
+
+    @patch("brite.services.seed_service.set_users")
+    def test_background_seed_job_failure(self, mock_set_users):
+        mock_set_users.side_effect = OperationalError("INSERT", {}, Exception())
+
+        with patch("builtins.print"):
+            job = SeedJob(self.app).start()
+            self.assertTrue(job.done.wait(timeout=30))
+        self.app.extensions["brite_seed"] = job
+
+        response = self.client.get("/api/v1/health/ready")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json["status"], "failed")
+
+    @patch("brite.services.seed_service.get_movies")
+    def test_failed_seed_job_with_seeded_database(self, mock_get_movies):
+        # Readiness follows the database once the job is done
+        mock_get_movies.side_effect = AssertionError("Set the API_KEY")
+
+        with patch("builtins.print"):
+            job = SeedJob(self.app).start()
+            self.assertTrue(job.done.wait(timeout=30))
+        self.app.extensions["brite_seed"] = job
+
+        self.assertEqual(job.state, "failed")
+        response = self.client.get("/api/v1/health/ready")
+        self.assertEqual(response.status_code, 200)
+
+
+class TestSeedLock(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        url = f"sqlite:///{os.path.join(directory.name, 'brite.db')}"
+
+        with patch.dict(os.environ, {"DATABASE_URL": url}):
+            self.app = create_app()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+    @patch("brite.services.seed_service.get_movies")
+    def test_jobs_seed_one_after_the_other(self, mock_get_movies):
+        with self.app.app_context():
+            with seed_lock():
+                job = SeedJob(self.app).start()
+                self.assertFalse(job.done.wait(timeout=0.5))
+
+        self.assertTrue(job.done.wait(timeout=30))
+        self.assertEqual(job.state, "ready")
+
+    @patch("brite.services.seed_service.get_movies")
+    def test_concurrent_jobs(self, mock_get_movies):
+        jobs = [SeedJob(self.app).start() for _ in range(4)]
+
+        for job in jobs:
+            self.assertTrue(job.done.wait(timeout=30))
+            self.assertEqual(job.state, "ready")
+        with self.app.app_context():
+            self.assertEqual(User.query.count(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from brite.utils.singleflight import AsyncSingleFlight, SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.flight = SingleFlight()
+
+    def run_concurrently(self, count, fn):
+        barrier = threading.Barrier(count)
+
+        def call():
+            barrier.wait()
+            return self.flight.do("key", fn)
+
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            futures = [executor.submit(call) for _ in range(count)]
+        return futures
+
+    def test_concurrent_calls_share_one_run(self):
+        fn = MagicMock(side_effect=lambda: time.sleep(0.2) or "result")
+
+        futures = self.run_concurrently(10, fn)
+
+        self.assertEqual([future.result() for future in futures], ["result"] * 10)
+        self.assertEqual(fn.call_count, 1)
+
+    def test_concurrent_calls_share_the_error(self):
+        def failing():
+            time.sleep(0.2)
+            raise RuntimeError("database is down")
+
+        fn = MagicMock(side_effect=failing)
+
+        futures = self.run_concurrently(5, fn)
+
+        for future in futures:
+            self.assertIsInstance(future.exception(), RuntimeError)
+        self.assertEqual(fn.call_count, 1)
+
+    def test_sequential_calls_run_again(self):
+        fn = MagicMock(return_value="result")
+
+        self.flight.do("key", fn)
+        self.flight.do("key", fn)
+
+        self.assertEqual(fn.call_count, 2)
+
+    def test_different_keys_do_not_wait(self):
+        fn = MagicMock(return_value="result")
+
+        self.flight.do("a", fn)
+        self.flight.do("b", fn)
+
+        self.assertEqual(fn.call_count, 2)
+
+
+class TestAsyncSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_run(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        async def main():
+            return await asyncio.gather(*(flight.do("key", load) for _ in range(10)))
+
+        self.assertEqual(asyncio.run(main()), ["result"] * 10)
+        self.assertEqual(len(calls), 1)
+
+    def test_errors_are_shared_and_not_kept(self):
+        flight = AsyncSingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        async def main():
+            results = await asyncio.gather(
+                *(flight.do("key", fail) for _ in range(3)), return_exceptions=True
+            )
+            return results, flight._tasks
+
+        results, tasks = asyncio.run(main())
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertEqual(tasks, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from brite.utils.title_index import TitleIndex, fold
+
+
+class TestTitleIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = TitleIndex(
+            [
+                ("tt1", "Star Wars"),
+                ("tt2", "Stardust"),
+                ("tt3", "Amélie"),
+                ("tt4", "Heat"),
+                ("tt5", "star"),
+            ]
+        )
+
+    def titles(self, prefix, limit=10):
+        return [movie["title"] for movie in self.index.complete(prefix, limit)]
+
+    def test_fold(self):
+        self.assertEqual(fold("Amélie"), "amelie")
+        self.assertEqual(fold("STRASSE"), fold("straße"))
+
+    def test_complete(self):
+        self.assertEqual(self.titles("sta"), ["star", "Star Wars", "Stardust"])
+        self.assertEqual(self.titles("STAR W"), ["Star Wars"])
+        self.assertEqual(self.titles("ame"), ["Amélie"])
+        self.assertEqual(self.titles("x"), [])
+
+    def test_complete_limit(self):
+        self.assertEqual(self.titles("star", limit=2), ["star", "Star Wars"])
+
+    def test_add_and_remove(self):
+        self.index.add("tt6", "Star Trek")
+        self.index.remove("tt1")
+        self.index.remove("tt9")
+
+        self.assertEqual(self.titles("star "), ["Star Trek"])
+        self.assertEqual(len(self.index), 5)
+
+    def test_add_replaces_the_indexed_title(self):
+        # A lazy load can pick up a movie that is then indexed by its write
+        self.index.add("tt4", "Heat")
+        self.index.add("tt2", "Stardust Memories")
+
+        self.assertEqual(self.titles("heat"), ["Heat"])
+        self.assertEqual(self.titles("stardust"), ["Stardust Memories"])
+        self.assertEqual(len(self.index), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+from flask import Flask
+from werkzeug.exceptions import BadRequest
+
+from brite.utils.validation import Field, Schema
+
+QUERY = Schema(
+    "args",
+    Field("limit", type=int, default=10, minimum=1, maximum=100, help="Bad limit"),
+    Field("sort", default="title", choices=("title", "year")),
+    Field("gzip", type=bool, default=False),
+    Field("q", required=True, help="Search query"),
+)
+
+BODY = Schema(
+    "json",
+    Field("title", required=True, max_length=5),
+    Field("ids", type=list, items=str),
+)
+
+
+class TestValidation(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+
+    def parse(self, schema, path="/", **kwargs):
+        with self.app.test_request_context(path, **kwargs):
+            return schema.parse()
+
+    def errors(self, schema, path="/", **kwargs):
+        with self.assertRaises(BadRequest) as context:
+            self.parse(schema, path, **kwargs)
+        return context.exception.data["message"]
+
+    def test_query_string(self):
+        args = self.parse(QUERY, "/?limit=20&gzip=true&q=star")
+        self.assertEqual(args, {"limit": 20, "sort": "title", "gzip": True, "q": "star"})
+
+    def test_query_string_errors(self):
+        errors = self.errors(QUERY, "/?limit=1000000&sort=poster&gzip=maybe")
+        self.assertEqual(
+            errors,
+            {
+                "limit": "Bad limit",
+                "sort": "Invalid sort",
+                "gzip": "Invalid gzip",
+                "q": "Search query",
+            },
+        )
+        self.assertEqual(self.errors(QUERY, "/?q=a&limit=0"), {"limit": "Bad limit"})
+        self.assertEqual(self.errors(QUERY, "/?q=a&limit=ten"), {"limit": "Bad limit"})
+
+    def test_json_body(self):
+        args = self.parse(BODY, json={"title": "Alien", "ids": ["tt1"], "extra": 1})
+        self.assertEqual(args, {"title": "Alien", "ids": ["tt1"]})
+
+        errors = self.errors(BODY, json={"title": "Aliens", "ids": ["tt1", 2]})
+        self.assertEqual(errors, {"title": "Invalid title", "ids": "Invalid ids"})
+        self.assertEqual(
+            self.errors(BODY, json={"title": 5}), {"title": "Invalid title"}
+        )
+
+    def test_json_body_missing_or_not_an_object(self):
+        self.assertEqual(self.errors(BODY, data="nope"), {"title": "Invalid title"})
+        self.assertEqual(
+            self.errors(BODY, json=["Alien"]), "The request body must be a JSON object"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,356 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+GENERATIONS = 4096
+
+
+class Cache:
+    """
+
+    Front for the cache backend picked when the app is created, so modules
+    can hold on to it before it is configured.
+
+    A backend implements ``get``, ``set``, ``delete``, ``generation``,
+    ``clear`` and ``stats``. Use `LRUCache` for a cache private to the
+    process, or `SharedCache` for one shared by every worker on the host.
+
+    Every delete bumps the generation of the key, so a value loaded before
+    a write is not cached after the write invalidated it. The backend keeps
+    the generations next to the entries, a shared backend shares them too,
+    in `GENERATIONS` slots picked by `slot`, a collision only skips caching
+    a value.
+
+    Parameters:
+        backend: the backend to start with, an empty `LRUCache` by default
+
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or LRUCache()
+
+    def configure(self, backend):
+        """
+        Switches to ``backend``.
+
+        """
+        self.backend = backend
+
+    def generation(self, key):
+        """
+        Returns the generation of ``key``, to read before loading its value
+        and pass to `set` as the guard.
+
+        """
+        return self.backend.generation(key)
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value, guard=None):
+        """
+        Caches ``value`` under ``key``. With a ``guard``, a (key,
+        generation) pair, nothing is cached if the guarded key was deleted
+        since its generation was read.
+
+        """
+        self.backend.set(key, value, guard)
+
+    def delete(self, *keys):
+        self.backend.delete(*keys)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        return self.backend.stats()
+
+
+def slot(key):
+    """
+    Returns the generation slot of ``key``. The hash is stable across
+    processes, unlike ``hash()`` of a string.
+
+    """
+    return zlib.crc32(json.dumps(key, default=repr).encode()) % GENERATIONS
+
+
+def create_cache(backend, maxsize, ttl, path=None):
+    """
+    Builds the cache backend named ``backend``, either "memory" or "shared".
+
+    Parameters:
+        backend: the backend name
+        maxsize: the maximum number of entries
+        ttl: seconds an entry stays valid
+        path: the file of a shared cache, in the temp directory by default
+
+    """
+    if backend == "memory":
+        return LRUCache(maxsize=maxsize, ttl=ttl)
+    if backend == "shared":
+        path = path or os.path.join(tempfile.gettempdir(), "brite-cache.sqlite3")
+        return SharedCache(path, maxsize=maxsize, ttl=ttl)
+    raise ValueError(f"Unknown cache backend {backend!r}")
+
+
+class LRUCache:
+    """
+
+    Thread-safe in-process cache that evicts the least recently used entry
+    once full and drops entries older than ``ttl`` seconds.
+
+    Parameters:
+        maxsize: the maximum number of entries
+        ttl: seconds an entry stays valid
+
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = [0] * GENERATIONS
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expired = 0
+
+    def generation(self, key):
+        return self._generations[slot(key)]
+
+    def get(self, key):
+        """
+        Returns the cached value for ``key``, or None when missing or expired.
+
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, guard=None):
+        """
+        Stores ``value`` under ``key``, evicting the oldest entry when full.
+        Nothing is stored when the (key, generation) ``guard`` is outdated.
+
+        """
+        with self._lock:
+            if guard is not None and self.generation(guard[0]) != guard[1]:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        """
+        Removes ``keys`` from the cache and bumps their generations.
+
+        """
+        with self._lock:
+            for key in keys:
+                self._generations[slot(key)] += 1
+                self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Removes every entry, keeping the counters.
+
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns the size and hit/miss/eviction counters of the cache.
+
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class SharedCache:
+    """
+
+    Cache shared by every process on the host, kept in a SQLite file.
+
+    Entries are JSON encoded, so values must be plain dicts, lists and
+    scalars. Deleting a key removes it for every worker at once, which is how
+    writes in one worker invalidate the entry for all of them. Once full, the
+    entries closest to expiry are evicted. Put ``path`` on a tmpfs such as
+    /dev/shm to keep the file in memory.
+
+    Parameters:
+        path: the SQLite file, shared by the processes using the cache
+        maxsize: the maximum number of entries
+        ttl: seconds an entry stays valid
+
+    """
+
+    def __init__(self, path, maxsize=1024, ttl=300):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expired = 0
+
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        self._connection().execute(
+            "CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)"
+        )
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS generations "
+            "(slot INTEGER PRIMARY KEY, generation INTEGER NOT NULL)"
+        )
+
+    def _connection(self):
+        """
+        Returns the SQLite connection of the calling thread.
+
+        Connections are never reused across a fork, a worker forked from a
+        process that used the cache opens its own.
+
+        """
+        if getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def get(self, key):
+        """
+        Returns the cached value for ``key``, or None when missing or expired.
+
+        """
+        key = json.dumps(key)
+        row = (
+            self._connection()
+            .execute("SELECT value, expires FROM cache WHERE key = ?", (key,))
+            .fetchone()
+        )
+
+        if row is not None and row[1] < time.time():
+            self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._count("expired")
+            row = None
+
+        if row is None:
+            self._count("misses")
+            return None
+
+        self._count("hits")
+        return json.loads(row[0])
+
+    def generation(self, key):
+        row = (
+            self._connection()
+            .execute("SELECT generation FROM generations WHERE slot = ?", (slot(key),))
+            .fetchone()
+        )
+        return 0 if row is None else row[0]
+
+    def set(self, key, value, guard=None):
+        """
+        Stores ``value`` under ``key``, evicting the oldest entries when full.
+
+        With a (key, generation) ``guard``, the generation is checked in the
+        same transaction as the insert, so a delete from another worker
+        either runs before and the value is not stored, or after and removes
+        it.
+
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        with connection:
+            if guard is not None and self.generation(guard[0]) != guard[1]:
+                return
+            connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                (json.dumps(key), json.dumps(value), time.time() + self.ttl),
+            )
+            evicted = connection.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                "ORDER BY expires LIMIT max(0, (SELECT count(*) FROM cache) - ?))",
+                (self.maxsize,),
+            ).rowcount
+        if evicted:
+            self._count("evictions", evicted)
+
+    def delete(self, *keys):
+        """
+        Removes ``keys`` from the cache of every worker and bumps their
+        generations, in one transaction.
+
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        with connection:
+            connection.executemany(
+                "INSERT INTO generations (slot, generation) VALUES (?, 1) "
+                "ON CONFLICT (slot) DO UPDATE SET generation = generation + 1",
+                [(slot(key),) for key in keys],
+            )
+            connection.executemany(
+                "DELETE FROM cache WHERE key = ?", [(json.dumps(key),) for key in keys]
+            )
+
+    def clear(self):
+        """
+        Removes every entry, keeping the counters.
+
+        """
+        self._connection().execute("DELETE FROM cache")
+
+    def stats(self):
+        """
+        Returns the shared size and this worker's hit/miss/eviction counters.
+
+        """
+        size = self._connection().execute("SELECT count(*) FROM cache").fetchone()[0]
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": size,
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,89 @@
+from datetime import timezone
+from functools import wraps
+
+from flask import Response, request
+from werkzeug.http import http_date
+
+
+def last_modified(changed_at):
+    """
+    Returns ``changed_at`` as it appears in a Last-Modified header: in UTC,
+    without microseconds. None stays None.
+
+    """
+    if changed_at is None:
+        return None
+    changed_at = changed_at.replace(microsecond=0)
+    if changed_at.tzinfo is None:
+        changed_at = changed_at.replace(tzinfo=timezone.utc)
+    return changed_at
+
+
+def version_headers(seq, changed_at):
+    """
+    Returns the ETag, Cache-Control and Last-Modified headers of a version.
+
+    """
+    headers = {"ETag": f'"v{seq}"', "Cache-Control": "no-cache"}
+    changed_at = last_modified(changed_at)
+    if changed_at is not None:
+        headers["Last-Modified"] = http_date(changed_at)
+    return headers
+
+
+def not_modified(if_none_match, if_modified_since, seq, changed_at):
+    """
+    Returns whether the client's copy of a version is current.
+
+    Parameters:
+    - if_none_match: the parsed If-None-Match header, a werkzeug ETags.
+    - if_modified_since: the parsed If-Modified-Since header, or None.
+    - seq, changed_at: the version of the resource.
+
+    Returns:
+    - True when the response can be 304 Not Modified. Never for seq 0,
+      which means no change was logged: the resource may not exist.
+    """
+    if not seq:
+        return False
+    if if_none_match:
+        return if_none_match.contains_weak(f"v{seq}")
+    changed_at = last_modified(changed_at)
+    if changed_at is None or if_modified_since is None:
+        return False
+    return changed_at <= if_modified_since
+
+
+def conditional(version):
+    """
+    Decorator adding an ETag and a Last-Modified header to a GET resource,
+    and answering 304 Not Modified without running it when the client's
+    copy is current.
+
+    Parameters:
+    - version: function returning the (seq, changed_at) version of the
+      resource, called with the URL parameters of the request.
+
+    Returns:
+    - The decorated function.
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            seq, changed_at = version(**kwargs)
+            headers = version_headers(seq, changed_at)
+            if not_modified(
+                request.if_none_match, request.if_modified_since, seq, changed_at
+            ):
+                return Response(status=304, headers=headers)
+
+            result = fn(*args, **kwargs)
+            data, status = result if isinstance(result, tuple) else (result, 200)
+            if status != 200:
+                return data, status
+            return data, status, headers
+
+        return wrapper
+
+    return decorator
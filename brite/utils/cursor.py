@@ -0,0 +1,33 @@
+import base64
+import json
+
+
+def encode_cursor(*values):
+    """
+    Encodes the sort key of the last row of a page into an opaque cursor.
+
+    """
+    payload = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor, size=2):
+    """
+    Decodes a cursor built by `encode_cursor` back into its ``size``
+    string values, the (title, id) of a row by default.
+
+    Raises:
+        ValueError: if the cursor was not built by `encode_cursor`, or does
+            not hold ``size`` strings.
+
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (UnicodeError, ValueError) as error:
+        raise ValueError("Invalid cursor") from error
+
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    if not all(isinstance(value, str) for value in values):
+        raise ValueError("Invalid cursor")
+    return values
@@ -1,6 +1,6 @@
 from functools import wraps
 
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask_jwt_extended import get_jwt, get_jwt_identity
 
 from ..models.user import User
 
@@ -9,6 +9,9 @@ def admin_required(fn):
     """
     Decorator function that checks if the current user has an 'admin' role.
 
+    The role is read from the token claims set at login. Tokens issued
+    without a role claim fall back to looking the user up.
+
     Parameters:
     - fn: The function to be decorated.
 
@@ -18,9 +21,12 @@ def admin_required(fn):
 
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        current_user = get_jwt_identity()
-        user = User.query.filter_by(username=current_user).first()
-        if not user or user.role != "admin":
+        role = get_jwt().get("role")
+        if role is None:
+            user = User.query.filter_by(username=get_jwt_identity()).first()
+            role = user.role if user else None
+
+        if role != "admin":
             return {"message": "Admin role required!"}, 403
         return fn(*args, **kwargs)
 
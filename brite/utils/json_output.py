@@ -0,0 +1,29 @@
+import json
+
+from flask import make_response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data):
+    """
+    Encodes ``data`` as compact JSON bytes, with orjson when it is installed.
+
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def output_json(data, code, headers=None):
+    """
+    Flask-RESTful representation writing the responses with `dumps`.
+
+    """
+    response = make_response(dumps(data), code)
+    response.headers.extend(headers or {})
+    response.mimetype = "application/json"
+    return response
@@ -0,0 +1,140 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHasher:
+    """
+
+    Hashes and checks passwords in a bounded process pool, so the CPU-bound
+    work neither blocks the request threads nor holds the GIL.
+
+    Parameters:
+        method: the werkzeug hashing method, e.g. "scrypt" or
+            "pbkdf2:sha256:600000"
+        workers: the number of hashing processes, 0 hashes in the caller
+
+    """
+
+    def __init__(self, method="scrypt", workers=0):
+        self.method = method
+        self.workers = workers
+        self._prefix = None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._timings = {}
+
+    def configure(self, method, workers):
+        """
+        Changes the method and pool size, restarting the pool if they changed.
+
+        """
+        with self._lock:
+            if (method, workers) == (self.method, self.workers):
+                return
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self.method = method
+            self.workers = workers
+            self._prefix = None
+            self._executor = None
+
+    def _pool(self):
+        """
+        Returns the process pool, starting it on first use in this process.
+
+        """
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                context = multiprocessing.get_context(
+                    "forkserver" if os.name == "posix" else "spawn"
+                )
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=context
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _discard(self, executor):
+        """
+        Drops a broken process pool, unless another thread already replaced
+        it, so the next call starts a new one.
+
+        """
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _submit(self, fn, *args):
+        executor = self._pool()
+        try:
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool:
+            # A hashing process died, e.g. killed by the OOM killer: retry
+            # once in a new pool instead of failing every call from now on.
+            self._discard(executor)
+            return self._pool().submit(fn, *args).result()
+
+    def _run(self, operation, fn, *args):
+        start = time.perf_counter()
+        if self.workers:
+            result = self._submit(fn, *args)
+        else:
+            result = fn(*args)
+        self._record(operation, time.perf_counter() - start)
+        return result
+
+    def _record(self, operation, seconds):
+        with self._lock:
+            count, total, peak = self._timings.get(operation, (0, 0.0, 0.0))
+            self._timings[operation] = (count + 1, total + seconds, max(peak, seconds))
+
+    def hash(self, password):
+        """
+        Returns the hash of ``password`` with the configured method.
+
+        """
+        return self._run("hash", generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """
+        Returns True if ``password`` matches ``password_hash``.
+
+        """
+        return self._run("verify", check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """
+        Returns True if ``password_hash`` was made with other parameters than
+        the configured method.
+
+        """
+        if self._prefix is None:
+            self._prefix = self.hash("").split("$", 1)[0]
+        return password_hash.split("$", 1)[0] != self._prefix
+
+    def stats(self):
+        """
+        Returns the configuration and latency of hashing and checking.
+
+        """
+        with self._lock:
+            timings = {
+                operation: {
+                    "count": count,
+                    "avg_ms": total / count * 1000,
+                    "max_ms": peak * 1000,
+                }
+                for operation, (count, total, peak) in self._timings.items()
+            }
+        return {"method": self.method, "workers": self.workers, **timings}
+
+
+password_hasher = PasswordHasher()
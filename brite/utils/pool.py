@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+import weakref
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+_engines = weakref.WeakSet()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+
+    QueuePool recording how long checkouts take, how many of them had to
+    wait for a connection to be returned, how many timed out, and the
+    peak number of overflow connections.
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._checkouts = self._waits = self._timeouts = self._peak_overflow = 0
+        self._checkout_time = self._max_checkout_time = 0.0
+
+    def _do_get(self):
+        waited = (
+            self._max_overflow > -1
+            and self._overflow >= self._max_overflow
+            and self._pool.empty()
+        )
+        timed_out = False
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._stats_lock:
+                self._checkouts += 1
+                self._waits += waited
+                self._timeouts += timed_out
+                self._checkout_time += elapsed
+                self._max_checkout_time = max(self._max_checkout_time, elapsed)
+                self._peak_overflow = max(self._peak_overflow, self._overflow)
+
+    def stats(self):
+        """
+        Returns the size, usage and checkout latency of the pool.
+
+        """
+        with self._stats_lock:
+            checkouts = self._checkouts
+            return {
+                "size": self.size(),
+                "max_overflow": self._max_overflow,
+                "checked_out": self.checkedout(),
+                "overflow": max(self._overflow, 0),
+                "peak_overflow": max(self._peak_overflow, 0),
+                "checkouts": checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "checkout_avg_ms": self._checkout_time / checkouts * 1000
+                if checkouts
+                else 0.0,
+                "checkout_max_ms": self._max_checkout_time * 1000,
+            }
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """
+
+    `InstrumentedQueuePool` for the engines of async drivers.
+
+    """
+
+
+def engine_options(url, use_async=False):
+    """
+    Returns the SQLAlchemy engine options for ``url`` from the environment.
+
+    Only the variables that are set are passed on, the others keep the
+    SQLAlchemy defaults. SQLite keeps its own pools, its connections are
+    files or memory and sizing them does not apply. Pass ``use_async`` for
+    an engine of an async driver.
+
+    Variables:
+        DB_POOL_SIZE: connections kept open per process
+        DB_MAX_OVERFLOW: connections opened on top of them under load
+        DB_POOL_TIMEOUT: seconds to wait for a connection before failing
+        DB_POOL_RECYCLE: seconds after which a connection is replaced
+        DB_POOL_PRE_PING: test connections before using them
+        DB_STATEMENT_TIMEOUT: milliseconds before a Postgres statement is
+            cancelled
+
+    """
+    if url is None:
+        return {}
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        return {}
+
+    options = {
+        "poolclass": InstrumentedAsyncQueuePool if use_async else InstrumentedQueuePool
+    }
+    for name, option, cast in (
+        ("DB_POOL_SIZE", "pool_size", int),
+        ("DB_MAX_OVERFLOW", "max_overflow", int),
+        ("DB_POOL_TIMEOUT", "pool_timeout", float),
+        ("DB_POOL_RECYCLE", "pool_recycle", int),
+    ):
+        if os.getenv(name):
+            options[option] = cast(os.getenv(name))
+    if os.getenv("DB_POOL_PRE_PING"):
+        options["pool_pre_ping"] = os.getenv("DB_POOL_PRE_PING").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+
+    timeout = os.getenv("DB_STATEMENT_TIMEOUT")
+    if timeout and url.get_backend_name() == "postgresql":
+        if use_async:
+            # asyncpg takes the settings directly instead of libpq options
+            settings = {"statement_timeout": str(int(timeout))}
+            options["connect_args"] = {"server_settings": settings}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={int(timeout)}"}
+    return options
+
+
+def pool_stats(engines):
+    """
+    Returns the `InstrumentedQueuePool.stats` of the named ``engines``,
+    skipping the engines with another pool.
+
+    """
+    return {
+        name or "default": engine.pool.stats()
+        for name, engine in engines.items()
+        if isinstance(engine.pool, InstrumentedQueuePool)
+    }
+
+
+def track_engines(engines):
+    """
+    Disposes ``engines`` in the child after the process forks, so a worker
+    never shares the connections its parent opened.
+
+    """
+    _engines.update(engines)
+
+
+def dispose_engines():
+    # close=False leaves the parent's connections open for the parent.
+    for engine in list(_engines):
+        engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=dispose_engines)
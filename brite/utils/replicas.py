@@ -0,0 +1,192 @@
+import itertools
+import os
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, TextualSelect, UpdateBase, create_engine, event, exc, text
+
+from brite.utils.pool import engine_options, pool_stats, track_engines
+
+READ_METHODS = ("GET", "HEAD")
+STICKY_COOKIE = "brite_primary"
+
+
+def replica_urls(urls):
+    """
+    Returns the URLs of the comma separated DATABASE_REPLICA_URLS.
+
+    """
+    return [url.strip() for url in (urls or "").split(",") if url.strip()]
+
+
+class ReplicaSet:
+    """
+
+    Round-robin over the replicas of the primary database, skipping the
+    ones that are down.
+
+    A replica is pinged with ``SELECT 1`` at most once per
+    ``check_interval`` seconds, by the request that picks it when the last
+    check is older than that, and is marked down as soon as one of its
+    connections fails. Reads go to the primary while every replica is down.
+
+    Parameters:
+        primary: the engine of the primary database
+        engines: the engines of the replicas
+        check_interval: seconds between two health checks of a replica
+
+    """
+
+    def __init__(self, primary, engines, check_interval=10):
+        self.primary = primary
+        self.engines = list(engines)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._turns = itertools.count()
+        self._healthy = {engine: True for engine in self.engines}
+        self._checked = {engine: float("-inf") for engine in self.engines}
+        for engine in self.engines:
+            event.listen(engine, "handle_error", self._on_error)
+
+    def choose(self):
+        """
+        Returns the next healthy replica, or None when they are all down.
+
+        """
+        for _ in range(len(self.engines)):
+            engine = self.engines[next(self._turns) % len(self.engines)]
+            if self.is_healthy(engine):
+                return engine
+        return None
+
+    def is_healthy(self, engine):
+        now = time.monotonic()
+        with self._lock:
+            due = now - self._checked[engine] >= self.check_interval
+            if due:
+                self._checked[engine] = now
+        if due:
+            self._healthy[engine] = self.ping(engine)
+        return self._healthy[engine]
+
+    def ping(self, engine):
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except exc.SQLAlchemyError as error:
+            print(f"Replica {engine.url!r} is down: {error}")
+            return False
+        return True
+
+    def _on_error(self, context):
+        if context.is_disconnect or context.connection is None:
+            engine = context.engine
+            if self._healthy.get(engine):
+                print(f"Replica {engine.url!r} is down: {context.original_exception}")
+            self._healthy[engine] = False
+
+    def dispose(self):
+        for engine in self.engines:
+            engine.dispose()
+
+    def stats(self):
+        return [
+            {
+                "url": engine.url.render_as_string(hide_password=True),
+                "healthy": self._healthy[engine],
+                "pool": pool_stats({None: engine}).get("default"),
+            }
+            for engine in self.engines
+        ]
+
+
+class RoutingSession(Session):
+    """
+
+    Session sending the reads of GET and HEAD requests to a replica, and
+    everything else to the primary: writes, flushes, locking selects, text
+    statements without declared columns, and the reads of other requests
+    and of commands.
+
+    A write marks the request, and its response sets a cookie for
+    REPLICA_STICKY_SECONDS so the client keeps reading from the primary,
+    where its own writes are, until the replicas have caught up.
+
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        replicas = current_app.extensions.get("brite_replicas")
+        if bind is not None or replicas is None or engine is not replicas.primary:
+            return engine
+
+        if self._flushing or isinstance(clause, UpdateBase):
+            if has_request_context():
+                g.wrote_primary = True
+            return engine
+        if not isinstance(clause, (Select, TextualSelect)):
+            return engine
+        if getattr(clause, "_for_update_arg", None) is not None:
+            return engine
+        if not reads_from_replica():
+            return engine
+        # One replica per request, so all of its reads see the same state.
+        if "replica" not in g:
+            g.replica = replicas.choose()
+        return g.replica or engine
+
+
+def pinned_to_primary():
+    """
+    Returns whether the current request reads from the primary because it,
+    or a recent request of the same client, wrote to it.
+
+    """
+    return has_request_context() and (
+        bool(g.get("wrote_primary")) or STICKY_COOKIE in request.cookies
+    )
+
+
+def reads_from_replica():
+    """
+    Returns whether the reads of the current request can go to a replica.
+
+    """
+    return (
+        has_request_context()
+        and request.method in READ_METHODS
+        and not pinned_to_primary()
+    )
+
+
+def init_replicas(app, db):
+    """
+    Routes the reads of ``app`` to the replicas of DATABASE_REPLICA_URLS,
+    each with its own engine configured like the primary's.
+
+    """
+    urls = replica_urls(os.getenv("DATABASE_REPLICA_URLS"))
+    if not urls:
+        return
+
+    engines = [create_engine(url, **engine_options(url)) for url in urls]
+    track_engines(engines)
+    with app.app_context():
+        app.extensions["brite_replicas"] = ReplicaSet(
+            db.engine,
+            engines,
+            check_interval=float(os.getenv("REPLICA_CHECK_INTERVAL", 10)),
+        )
+
+    @app.after_request
+    def stick_to_primary(response):
+        if g.get("wrote_primary"):
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=int(os.getenv("REPLICA_STICKY_SECONDS", 10)),
+                httponly=True,
+            )
+        return response
@@ -1,7 +1,6 @@
-from werkzeug.security import generate_password_hash
-
 from ..models.user import User
 from .database_setup import db
+from .passwords import password_hasher
 
 
 def set_users():
@@ -10,7 +9,7 @@ def set_users():
 
     This function creates an admin user with the username 'admin' and a user
     with the username 'user'. It sets their passwords using the
-    `generate_password_hash` function. The admin user is assigned the role of
+    configured `password_hasher`. The admin user is assigned the role of
     'admin' and the regular user is assigned the role of 'user'.
 
     """
@@ -18,12 +17,12 @@ def set_users():
     if User.query.first() is None:
         admin = User(
             username="admin",
-            password_hash=generate_password_hash("admin"),
+            password_hash=password_hasher.hash("admin"),
             role="admin",
         )
 
         user = User(
-            username="user", password_hash=generate_password_hash("user"), role="user"
+            username="user", password_hash=password_hasher.hash("user"), role="user"
         )
 
         db.session.add(admin)
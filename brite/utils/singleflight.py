@@ -0,0 +1,78 @@
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+
+    Coalesces concurrent calls sharing a key: the first caller runs the
+    function while the others wait for it and get the same result, or the
+    same exception.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Returns ``fn(*args, **kwargs)``, unless a call for ``key`` is already
+        running, in which case its result is returned instead.
+
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+
+class AsyncSingleFlight:
+    """
+
+    `SingleFlight` for coroutines running on one event loop: the first
+    caller starts a task and the others await the same task.
+
+    """
+
+    def __init__(self):
+        self._tasks = {}
+
+    async def do(self, key, fn, *args, **kwargs):
+        """
+        Returns ``await fn(*args, **kwargs)``, unless a call for ``key`` is
+        already running, in which case its result is returned instead.
+
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(fn(*args, **kwargs))
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        # Shielded so a caller that is cancelled does not cancel the others.
+        return await asyncio.shield(task)
@@ -0,0 +1,101 @@
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right
+
+
+def fold(value):
+    """
+    Folds ``value`` for case and accent insensitive comparisons.
+
+    """
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+class TitleIndex:
+    """
+
+    Sorted array of folded titles answering prefix queries with bisect.
+
+    The folded titles, titles and ids are kept in three parallel lists
+    rather than a list of tuples, which keeps the index compact. The title
+    of every id is also kept, so a movie is indexed once whatever the order
+    of its adds and removes.
+
+    Parameters:
+        movies: (id, title) pairs to start with
+        seq: the change log position the movies were read at
+
+    """
+
+    def __init__(self, movies=(), seq=0):
+        by_id = {movie_id: title for movie_id, title in movies}
+        entries = sorted(
+            (fold(title), title, movie_id) for movie_id, title in by_id.items()
+        )
+        self._keys = [key for key, _, _ in entries]
+        self._titles = [title for _, title, _ in entries]
+        self._ids = [movie_id for _, _, movie_id in entries]
+        self._by_id = by_id
+        self._lock = threading.Lock()
+        self.seq = seq
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, movie_id, title):
+        """
+        Inserts a movie at its sorted position, replacing its previous title.
+
+        """
+        key = fold(title)
+        with self._lock:
+            self._remove(movie_id)
+            position = bisect_right(self._keys, key)
+            self._keys.insert(position, key)
+            self._titles.insert(position, title)
+            self._ids.insert(position, movie_id)
+            self._by_id[movie_id] = title
+
+    def remove(self, movie_id):
+        """
+        Removes a movie, doing nothing if it is not indexed.
+
+        """
+        with self._lock:
+            self._remove(movie_id)
+
+    def _remove(self, movie_id):
+        title = self._by_id.pop(movie_id, None)
+        if title is None:
+            return
+        key = fold(title)
+        start = bisect_left(self._keys, key)
+        end = bisect_right(self._keys, key, lo=start)
+        for position in range(start, end):
+            if self._ids[position] == movie_id:
+                del self._keys[position]
+                del self._titles[position]
+                del self._ids[position]
+                return
+
+    def complete(self, prefix, limit):
+        """
+        Returns up to ``limit`` movies whose title starts with ``prefix``,
+        in alphabetical order.
+
+        """
+        key = fold(prefix)
+        with self._lock:
+            position = bisect_left(self._keys, key)
+            matches = []
+            while (
+                position < len(self._keys)
+                and len(matches) < limit
+                and self._keys[position].startswith(key)
+            ):
+                matches.append(
+                    {"id": self._ids[position], "title": self._titles[position]}
+                )
+                position += 1
+        return matches
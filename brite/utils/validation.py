@@ -0,0 +1,161 @@
+from flask import request
+from flask_restful import abort
+
+TRUE = ("1", "true", "yes", "on")
+FALSE = ("0", "false", "no", "off")
+
+
+class Field:
+    """
+
+    Declares one request argument of a `Schema`.
+
+    Parameters:
+        name: the name of the argument
+        type: int, str, bool or list, the value is converted or checked
+        required: reject requests without the argument
+        default: the value when the argument is missing
+        choices: the accepted values
+        minimum: the smallest accepted int
+        maximum: the largest accepted int
+        max_length: the longest accepted str or list
+        items: the type every element of a list must have
+        help: the message returned when the value is rejected
+
+    """
+
+    __slots__ = (
+        "name",
+        "type",
+        "required",
+        "default",
+        "choices",
+        "minimum",
+        "maximum",
+        "max_length",
+        "items",
+        "help",
+    )
+
+    def __init__(
+        self,
+        name,
+        type=str,
+        required=False,
+        default=None,
+        choices=None,
+        minimum=None,
+        maximum=None,
+        max_length=None,
+        items=None,
+        help=None,
+    ):
+        self.name = name
+        self.type = type
+        self.required = required
+        self.default = default
+        self.choices = frozenset(choices) if choices is not None else None
+        self.minimum = minimum
+        self.maximum = maximum
+        self.max_length = max_length
+        self.items = items
+        self.help = help or f"Invalid {name}"
+
+    def convert(self, value):
+        """
+        Returns ``value`` as the type of the field, raising ValueError when
+        it cannot be converted. Query strings are converted, JSON values
+        must already have the right type.
+
+        """
+        if self.type is int:
+            if isinstance(value, str):
+                return int(value)
+            if isinstance(value, int) and not isinstance(value, bool):
+                return value
+        elif self.type is bool:
+            if isinstance(value, bool):
+                return value
+            if isinstance(value, str) and value.lower() in TRUE + FALSE:
+                return value.lower() in TRUE
+        elif self.type is list:
+            if isinstance(value, list) and (
+                self.items is None or all(isinstance(item, self.items) for item in value)
+            ):
+                return value
+        elif isinstance(value, self.type):
+            return value
+        raise ValueError(value)
+
+    def parse(self, value):
+        """
+        Returns the converted ``value``, raising ValueError when it is not
+        accepted.
+
+        """
+        value = self.convert(value)
+        if self.choices is not None and value not in self.choices:
+            raise ValueError(value)
+        if self.minimum is not None and value < self.minimum:
+            raise ValueError(value)
+        if self.maximum is not None and value > self.maximum:
+            raise ValueError(value)
+        if self.max_length is not None and len(value) > self.max_length:
+            raise ValueError(value)
+        return value
+
+
+class Schema:
+    """
+
+    Declarative validation of the query string or the JSON body of a
+    request, built once when the resource module is imported.
+
+    Invalid requests are rejected with a 400 response listing the message of
+    every rejected argument, in the same format for all resources.
+
+    Parameters:
+        location: "args" for the query string, "json" for the body
+        fields: the `Field` of every argument
+
+    """
+
+    def __init__(self, location, *fields):
+        self.location = location
+        self.fields = fields
+
+    def source(self):
+        if self.location == "args":
+            return request.args
+        body = request.get_json(silent=True)
+        if body is None:
+            return {}
+        if not isinstance(body, dict):
+            abort(400, message="The request body must be a JSON object")
+        return body
+
+    def parse(self, source=None):
+        """
+        Returns the validated arguments of the current request as a dict,
+        or aborts with 400. ``source`` replaces the arguments of the Flask
+        request, for callers outside of a request context.
+
+        """
+        if source is None:
+            source = self.source()
+        args, errors = {}, {}
+        for field in self.fields:
+            value = source.get(field.name)
+            if value is None:
+                if field.required:
+                    errors[field.name] = field.help
+                args[field.name] = field.default
+                continue
+            try:
+                args[field.name] = field.parse(value)
+            except (TypeError, ValueError):
+                errors[field.name] = field.help
+
+        if errors:
+            abort(400, message=errors)
+        return args
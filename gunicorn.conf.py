@@ -0,0 +1,34 @@
+# Gunicorn settings, read from the environment so the worker layout can be
+# tuned per deployment. Size DB_POOL_SIZE + DB_MAX_OVERFLOW to at least the
+# number of threads: every worker process opens its own pool, so the
+# database sees up to workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+import os
+
+bind = f":{os.getenv('PORT', 8000)}"
+workers = int(os.getenv("WEB_CONCURRENCY", 1))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 0))
+preload_app = os.getenv("GUNICORN_PRELOAD", "").lower() in ("1", "true", "yes")
+seed_on_startup = os.getenv("SEED_ON_STARTUP", "").lower() in ("1", "true", "yes")
+
+# With preload the app, and the SEED_ON_STARTUP thread, are created in the
+# master: the forked workers get the job but not its thread and would report
+# 503 forever. Seed with `flask seed` before starting a preloaded server.
+PRELOAD_ERROR = "Preloading the app cannot be used with SEED_ON_STARTUP"
+if preload_app and seed_on_startup:
+    raise RuntimeError(PRELOAD_ERROR)
+
+
+def on_starting(server):
+    # Also catches --preload given on the command line
+    if server.cfg.preload_app and seed_on_startup:
+        raise RuntimeError(PRELOAD_ERROR)
+
+
+def post_fork(server, worker):
+    # brite.utils.pool already disposes the engines in every forked child,
+    # disposing is idempotent and doing it here logs it per worker.
+    from brite.utils.pool import dispose_engines
+
+    dispose_engines()
+    server.log.info("Worker %s: database pools reset after fork", worker.pid)